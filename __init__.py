@@ -187,6 +187,7 @@ if not retopoflow_is_broken:
             RF_OpenWebTip,
         )
         from .icons import clear_icons
+        from .rfmode.rfprewarm import RFSourcePrewarmer
 
         #Tools
         from .rfmode.rfmode import rfmode_tools
@@ -284,6 +285,7 @@ def unregister():
     if retopoflow_is_broken: return
 
     clear_icons()
+    RFSourcePrewarmer.stop()
 
     del bpy.types.Scene.snapobjects
 
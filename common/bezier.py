@@ -21,6 +21,7 @@ Created by Jonathan Denning, Jonathan Williamson
 
 import math
 
+import numpy as np
 from mathutils import Vector, Matrix
 
 from .maths import Point, Vec
@@ -275,6 +276,21 @@ class CubicBezier:
         b0, b1, b2 = compute_quadratic_weights(t)
         return q0*b0 + q1*b1 + q2*b2
 
+    def eval_array(self, ts):
+        ''' batched eval; ts is (n,) array-like, returns (n,3) numpy array '''
+        ts = np.asarray(ts, dtype=np.float64).reshape(-1, 1)
+        p0, p1, p2, p3 = [np.array(p, dtype=np.float64) for p in (self.p0, self.p1, self.p2, self.p3)]
+        b0, b1, b2, b3 = compute_cubic_weights(ts)
+        return b0*p0 + b1*p1 + b2*p2 + b3*p3
+
+    def eval_derivative_array(self, ts):
+        ''' batched eval_derivative; ts is (n,) array-like, returns (n,3) numpy array '''
+        ts = np.asarray(ts, dtype=np.float64).reshape(-1, 1)
+        p0, p1, p2, p3 = [np.array(p, dtype=np.float64) for p in (self.p0, self.p1, self.p2, self.p3)]
+        q0, q1, q2 = 3*(p1-p0), 3*(p2-p1), 3*(p3-p2)
+        b0, b1, b2 = compute_quadratic_weights(ts)
+        return q0*b0 + q1*b1 + q2*b2
+
     def subdivide(self, iters=1):
         if iters == 0:
             return [self]
@@ -391,6 +407,18 @@ class CubicBezier:
                 bd, bt = d, t
         return bt
 
+    def approximate_ts_at_points_tessellation(self, points):
+        '''
+        batched approximate_t_at_point_tessellation (euclidean distance).
+        points is (n,3) array-like, returns (n,) numpy array
+        '''
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        ts = np.array([t for t, _, _ in self.tessellation], dtype=np.float64)
+        qs = np.array([tuple(q) for _, q, _ in self.tessellation], dtype=np.float64).reshape(-1, 3)
+        if not len(points) or not len(ts): return np.zeros(len(points))
+        d2 = np.sum((points[:,None,:] - qs[None,:,:])**2, axis=2)
+        return ts[np.argmin(d2, axis=1)]
+
     def approximate_totlength_tessellation(self):
         return sum(self.approximate_lengths_tessellation())
 
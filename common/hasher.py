@@ -21,6 +21,8 @@ Created by Jonathan Denning, Jonathan Williamson
 
 from hashlib import md5
 
+import numpy as np
+
 import bpy
 from bmesh.types import BMesh, BMVert, BMEdge, BMFace
 from mathutils import Vector, Matrix
@@ -64,11 +66,14 @@ def hash_object(obj:bpy.types.Object):
     # get object data to act as a hash
     me = obj.data
     counts = (len(me.vertices), len(me.edges), len(me.polygons), len(obj.modifiers))
+    cos = np.empty(len(me.vertices) * 3, dtype=np.float64)
+    me.vertices.foreach_get('co', cos)
+    cos.shape = (len(me.vertices), 3)
     if me.vertices:
-        bbox = (tuple(min(v.co for v in me.vertices)), tuple(max(v.co for v in me.vertices)))
+        bbox = (tuple(cos.min(axis=0).tolist()), tuple(cos.max(axis=0).tolist()))
     else:
         bbox = (None, None)
-    vsum   = tuple(sum((v.co for v in me.vertices), Vector((0,0,0))))
+    vsum   = tuple(cos.sum(axis=0).tolist())
     xform  = tuple(e for l in obj.matrix_world for e in l)
     mods = []
     for mod in obj.modifiers:
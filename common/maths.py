@@ -23,6 +23,7 @@ from math import sqrt, acos, cos, sin
 from typing import List
 
 import bgl
+import numpy as np
 from mathutils import Matrix, Vector, Quaternion
 from bmesh.types import BMVert
 from mathutils.geometry import intersect_line_plane, intersect_point_tri
@@ -696,6 +697,11 @@ class XForm:
             m['imx_d'] = m['mx_d'].inverted()
             m['mx_n'] = m['imx_d'].transposed()
             m['imx_n'] = m['mx_d'].transposed()
+            # numpy copies for the batched (array) conversions below
+            m['np_mx_p'] = np.array([list(r) for r in m['mx_p']], dtype=np.float64)
+            m['np_imx_p'] = np.array([list(r) for r in m['imx_p']], dtype=np.float64)
+            m['np_mx_n'] = np.array([list(r) for r in m['mx_n']], dtype=np.float64)
+            m['np_imx_n'] = np.array([list(r) for r in m['imx_n']], dtype=np.float64)
             d[smat] = m
         return d[smat]
 
@@ -714,6 +720,8 @@ class XForm:
         self.mx_d, self.imx_d = mats['mx_d'], mats['imx_d']
         self.mx_n, self.imx_n = mats['mx_n'], mats['imx_n']
         self.mx_t = mats['mx_t']
+        self.np_mx_p, self.np_imx_p = mats['np_mx_p'], mats['np_imx_p']
+        self.np_mx_n, self.np_imx_n = mats['np_mx_n'], mats['np_imx_n']
 
         self.fn_l2w_typed = {
             Ray: lambda x: self.l2w_ray(x),
@@ -837,6 +845,35 @@ class XForm:
     def w2l_plane(self, plane: Plane) -> Plane:
         return Plane(o=self.w2l_point(plane.o), n=self.w2l_normal(plane.n))
 
+    ##############################################
+    # batched conversions on (n,3) numpy arrays
+
+    def l2w_points(self, ps):
+        m = self.np_mx_p
+        return np.dot(np.asarray(ps, dtype=np.float64).reshape(-1, 3), m[:3,:3].T) + m[:3,3]
+
+    def w2l_points(self, ps):
+        m = self.np_imx_p
+        return np.dot(np.asarray(ps, dtype=np.float64).reshape(-1, 3), m[:3,:3].T) + m[:3,3]
+
+    def l2w_vectors(self, vs):
+        return np.dot(np.asarray(vs, dtype=np.float64).reshape(-1, 3), self.np_mx_p[:3,:3].T)
+
+    def w2l_vectors(self, vs):
+        return np.dot(np.asarray(vs, dtype=np.float64).reshape(-1, 3), self.np_imx_p[:3,:3].T)
+
+    def l2w_normals(self, ns):
+        ns = np.dot(np.asarray(ns, dtype=np.float64).reshape(-1, 3), self.np_mx_n.T)
+        l = np.linalg.norm(ns, axis=1)
+        l[l == 0] = 1
+        return ns / l[:,None]
+
+    def w2l_normals(self, ns):
+        ns = np.dot(np.asarray(ns, dtype=np.float64).reshape(-1, 3), self.np_imx_n.T)
+        l = np.linalg.norm(ns, axis=1)
+        l[l == 0] = 1
+        return ns / l[:,None]
+
     def l2w_bmvert(self, bmv: BMVert) -> Point:
         return Point(self.mx_p * bmv.co)
 
@@ -961,34 +998,67 @@ class Accel2D:
         return Accel2D(verts, edges, [], Point_to_Point2D)
 
     @profiler.profile
-    def __init__(self, verts, edges, faces, Point_to_Point2D):
-        self.verts = list(verts) if verts else []
-        self.edges = list(edges) if edges else []
-        self.faces = list(faces) if faces else []
+    def __init__(self, verts, edges, faces, Point_to_Point2D, bounds=None):
+        '''
+        bounds is an optional (min Point2D, max Point2D) of the binned area,
+        which lets more elements be inserted later (see insert); otherwise
+        bounds are computed from verts
+        '''
+        verts = list(verts) if verts else []
+        self.verts = []
+        self.edges = []
+        self.faces = []
         self.Point_to_Point2D = Point_to_Point2D
-        self.vert_type = type(self.verts[0]) if self.verts else None
-        self.edge_type = type(self.edges[0]) if self.edges else None
-        self.face_type = type(self.faces[0]) if self.faces else None
+        self.vert_type = None
+        self.edge_type = None
+        self.face_type = None
         self.bins = {}
+        self.v2Ds = []
+        self.map_v_v2D = {}
 
-        self.v2Ds = [Point_to_Point2D(v.co) for v in verts]
-        self.map_v_v2D = {v: v2d for (v, v2d) in zip(verts, self.v2Ds)}
-        if self.v2Ds:
-            self.min = Point2D((
-                min(x - 0.001 for (x, _) in self.v2Ds),
-                min(y - 0.001 for (_, y) in self.v2Ds)
-            ))
-            self.max = Point2D((
-                max(x + 0.001 for (x, _) in self.v2Ds),
-                max(y + 0.001 for (_, y) in self.v2Ds)
-            ))
+        if bounds:
+            self.min = Point2D(bounds[0])
+            self.max = Point2D(bounds[1])
+            v2Ds = None
         else:
-            self.min = Point2D((0, 0))
-            self.max = Point2D((1, 1))
+            v2Ds = [Point_to_Point2D(v.co) for v in verts]
+            if v2Ds:
+                self.min = Point2D((
+                    min(x - 0.001 for (x, _) in v2Ds),
+                    min(y - 0.001 for (_, y) in v2Ds)
+                ))
+                self.max = Point2D((
+                    max(x + 0.001 for (x, _) in v2Ds),
+                    max(y + 0.001 for (_, y) in v2Ds)
+                ))
+            else:
+                self.min = Point2D((0, 0))
+                self.max = Point2D((1, 1))
         self.size = self.max - self.min
 
+        self.insert(verts, edges, faces, v2Ds=v2Ds)
+
+    def insert(self, verts, edges, faces, v2Ds=None):
+        '''
+        adds elements to bins.  edges and faces must only use verts that are
+        (or have been) inserted.  v2Ds are optional precomputed projections
+        of verts
+        '''
+        verts = list(verts) if verts else []
+        edges = list(edges) if edges else []
+        faces = list(faces) if faces else []
+        if v2Ds is None: v2Ds = [self.Point_to_Point2D(v.co) for v in verts]
+        self.verts += verts
+        self.edges += edges
+        self.faces += faces
+        if self.vert_type is None and verts: self.vert_type = type(verts[0])
+        if self.edge_type is None and edges: self.edge_type = type(edges[0])
+        if self.face_type is None and faces: self.face_type = type(faces[0])
+        self.v2Ds += v2Ds
+        self.map_v_v2D.update(zip(verts, v2Ds))
+
         pr = profiler.start('inserting verts')
-        for (v, v2d) in zip(verts, self.v2Ds):
+        for (v, v2d) in zip(verts, v2Ds):
             i, j = self.compute_ij(v2d)
             self._put(i, j, v)
         pr.done()
@@ -0,0 +1,478 @@
+'''
+Copyright (C) 2018 CG Cookie
+http://cgcookie.com
+hello@cgcookie.com
+
+Created by Jonathan Denning, Jonathan Williamson
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+'''
+Mesh kernels that work on plain numpy index/coordinate arrays rather than on
+BMesh.  Nothing in here touches bpy/bmesh/mathutils, so these functions can be
+used from worker threads and run outside of Blender.
+
+Conventions:
+- verts: (n,3) float array of vertex positions
+- tris:  (t,3) int array of vertex indices
+- side k of triangle i goes from tris[i,k] to tris[i,(k+1)%3]
+- -1 denotes "no element"
+'''
+
+import numpy as np
+
+
+def triangle_normals(verts, tris):
+    v0, v1, v2 = verts[tris[:,0]], verts[tris[:,1]], verts[tris[:,2]]
+    normals = np.cross(v1 - v0, v2 - v0)
+    l = np.linalg.norm(normals, axis=1)
+    l[l == 0] = 1
+    return (normals / l[:,None]).astype(np.float32)
+
+
+def triangle_adjacency(tris, nverts):
+    '''
+    returns (adjacency, edges, tri_edges)
+    - adjacency: (t,3) index of triangle across side k (-1 if boundary).
+      for non-manifold edges, one of the other triangles is chosen
+    - edges: (e,2) unique edges as sorted vertex index pairs
+    - tri_edges: (t,3) index into edges for side k
+    '''
+    ntris = len(tris)
+    sides = np.stack([tris, np.roll(tris, -1, axis=1)], axis=2).reshape(-1, 2)
+    sides = np.sort(sides, axis=1).astype(np.int64)
+    keys = sides[:,0] * nverts + sides[:,1]
+    ukeys, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    edges = np.stack([ukeys // nverts, ukeys % nverts], axis=1).astype(np.int32)
+    tri_edges = inverse.reshape(ntris, 3).astype(np.int32)
+
+    # pair up consecutive sides that share an edge
+    order = np.argsort(inverse, kind='mergesort')
+    inv_sorted = inverse[order]
+    same = inv_sorted[:-1] == inv_sorted[1:]
+    a, b = order[:-1][same], order[1:][same]
+    adjacency = np.full(ntris * 3, -1, dtype=np.int32)
+    adjacency[a] = b // 3
+    adjacency[b] = a // 3
+    return (adjacency.reshape(ntris, 3), edges, tri_edges)
+
+
+def edge_triangles(tri_edges, nedges):
+    ''' returns (e,) index of a triangle that uses each edge '''
+    edge_tri = np.full(nedges, -1, dtype=np.int32)
+    tri_of_side = np.arange(tri_edges.size, dtype=np.int32) // 3
+    edge_tri[tri_edges.reshape(-1)[::-1]] = tri_of_side[::-1]
+    return edge_tri
+
+
+def vertex_adjacency(nverts, edges):
+    '''
+    returns CSR-style (offsets, neighbors, neighbor_edges), where the verts
+    adjacent to vert i are neighbors[offsets[i]:offsets[i+1]], connected by
+    edges neighbor_edges[offsets[i]:offsets[i+1]]
+    '''
+    nedges = len(edges)
+    src = np.concatenate([edges[:,0], edges[:,1]])
+    dst = np.concatenate([edges[:,1], edges[:,0]])
+    eid = np.concatenate([np.arange(nedges), np.arange(nedges)])
+    order = np.argsort(src, kind='mergesort')
+    offsets = np.zeros(nverts + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=nverts), out=offsets[1:])
+    return (offsets, dst[order].astype(np.int32), eid[order].astype(np.int32))
+
+
+def plane_sides(dists, eps=0.000001):
+    ''' vectorized Plane.side given signed distances '''
+    sides = np.sign(dists).astype(np.int8)
+    sides[np.abs(dists) < eps] = 0
+    return sides
+
+
+def plane_segments(verts, tris, o, n, eps=0.000001, tri_edges=None, nedges=0):
+    '''
+    vectorized Plane.triangle_intersection over all triangles.
+    returns (segments, seg_tris), where segments is (s,2,3) and seg_tris is
+    (s,) index of the triangle that produced each segment.
+    if tri_edges is given, returns (segments, seg_tris, seg_keys) instead; see
+    _segments_from_dists for seg_keys
+    '''
+    o, n = np.asarray(o, dtype=np.float64), np.asarray(n, dtype=np.float64)
+    dists = np.dot(verts, n) - np.dot(o, n)
+    idx = np.arange(len(tris))
+    ret = _segments_from_dists(verts, tris, idx, dists, eps, tri_edges, nedges)
+    return ret if tri_edges is not None else ret[:2]
+
+
+def _segments_from_dists(verts, tris, idx, dists, eps, tri_edges, nedges):
+    '''
+    core of plane_segments.  idx are candidate triangles and dists are signed
+    vertex distances to plane.  seg_keys (s,2) identify where each segment
+    endpoint lies on the mesh, so touching segments share keys: edge index for
+    a crossing, nedges + vertex index for a vertex on the plane
+    '''
+    sides = plane_sides(dists, eps=eps)
+
+    # only consider triangles that are not entirely on one side
+    ts = sides[tris[idx]]
+    keep = np.abs(ts.astype(np.int32).sum(axis=1)) != 3
+    idx = idx[keep]
+    t, ts = tris[idx], ts[keep]
+    td = dists[t]
+    tv = verts[t].astype(np.float64)
+    with_keys = tri_edges is not None
+
+    # candidate points: vertex k (if on plane) and crossing on side k
+    cands = np.empty((len(idx), 6, 3))
+    valid = np.zeros((len(idx), 6), dtype=bool)
+    keys = np.empty((len(idx), 6), dtype=np.int64) if with_keys else None
+    for k in range(3):
+        k1 = (k + 1) % 3
+        cands[:,2*k] = tv[:,k]
+        valid[:,2*k] = ts[:,k] == 0
+        d0, d1 = td[:,k], td[:,k1]
+        denom = np.where(d0 == d1, 1, d0 - d1)
+        f = (d0 / denom)[:,None]
+        cands[:,2*k+1] = tv[:,k] + (tv[:,k1] - tv[:,k]) * f
+        valid[:,2*k+1] = (ts[:,k] * ts[:,k1]) < 0
+        if with_keys:
+            keys[:,2*k] = nedges + t[:,k]
+            keys[:,2*k+1] = tri_edges[idx,k]
+
+    # pack valid candidates to the front
+    order = np.argsort(~valid, axis=1, kind='mergesort')
+    rows = np.arange(len(idx))[:,None]
+    cands = cands[rows, order]
+    if with_keys: keys = keys[rows, order]
+    count = valid.sum(axis=1)
+
+    segs, seg_tris, seg_keys = [], [], []
+    def add(m, i0, i1):
+        segs.append(np.stack([cands[m,i0], cands[m,i1]], axis=1))
+        seg_tris.append(idx[m])
+        if with_keys: seg_keys.append(np.stack([keys[m,i0], keys[m,i1]], axis=1))
+    add(count == 1, 0, 0)                           # one point on plane, other two on same side
+    add(count == 2, 0, 1)                           # typical crossing
+    for (i0, i1) in [(0, 1), (1, 2), (2, 0)]:
+        add(count == 3, i0, i1)                     # triangle lies in plane
+    if not with_keys: return (np.concatenate(segs), np.concatenate(seg_tris))
+    return (np.concatenate(segs), np.concatenate(seg_tris), np.concatenate(seg_keys))
+
+
+def stitch_segments(seg_keys):
+    '''
+    stitches segments into ordered polylines by matching endpoint keys (see
+    plane_segments).  degenerate (single point) segments and duplicates (mesh
+    edge lying in plane is reported by both of its triangles) are skipped, and
+    a polyline is broken wherever more than two segments meet.
+    returns list of (seg_order, closed), where seg_order is a list of
+    (segment index, flipped) in walking order
+    '''
+    key_segs = {}
+    keys = seg_keys.tolist()
+    seen = set()
+    for i,(k0,k1) in enumerate(keys):
+        if k0 == k1: continue
+        k = (k0, k1) if k0 < k1 else (k1, k0)
+        if k in seen:
+            keys[i] = (k0, k0)      # mark as degenerate, so it is skipped below
+            continue
+        seen.add(k)
+        key_segs.setdefault(k0, []).append(i)
+        key_segs.setdefault(k1, []).append(i)
+
+    def next_seg(key, i):
+        # segment continuing through key, other than i
+        segs = key_segs[key]
+        if len(segs) != 2: return None
+        return segs[1] if segs[0] == i else segs[0]
+
+    touched = set()
+    polylines = []
+    def walk(i, key):
+        # walks from segment i out through key.  returns (list of (seg, flipped), closed)
+        ret = []
+        while True:
+            touched.add(i)
+            k0, k1 = keys[i]
+            flipped = (k0 != key)
+            ret.append((i, flipped))
+            key = k0 if flipped else k1
+            j = next_seg(key, i)
+            if j is None: return (ret, False)
+            if j in touched: return (ret, True)
+            i = j
+
+    for i,(k0,k1) in enumerate(keys):
+        if k0 == k1 or i in touched: continue
+        fwd, closed = walk(i, k0)
+        if not closed:
+            # extend other way from start
+            j = next_seg(k0, i)
+            if j is not None and j not in touched:
+                bwd, _ = walk(j, k0)
+                # reverse backward part so it leads into i
+                fwd = [(s, not f) for (s, f) in reversed(bwd)] + fwd
+        polylines.append((fwd, closed))
+    return polylines
+
+
+def polyline_points(segs, seg_order, closed):
+    '''
+    returns (m,3) array of polyline points given segments and seg_order from
+    stitch_segments.  for closed polylines, the first point is not repeated
+    '''
+    idx = np.array([s for (s, _) in seg_order])
+    flipped = np.array([f for (_, f) in seg_order])
+    starts = np.where(flipped[:,None], segs[idx,1], segs[idx,0])
+    if closed: return starts
+    end = segs[idx[-1],0] if flipped[-1] else segs[idx[-1],1]
+    return np.concatenate([starts, end[None,:]])
+
+
+def triangle_side_verts(tris):
+    '''
+    returns (t,3,2) vertex indices of side k of each triangle, which is the
+    edge shared with triangle adjacency[:,k]
+    '''
+    return np.stack([tris, np.roll(tris, -1, axis=1)], axis=2)
+
+
+def plane_dists(verts, o, n):
+    ''' signed distances of all verts to plane (o,n) '''
+    o, n = np.asarray(o, dtype=np.float64), np.asarray(n, dtype=np.float64)
+    return np.dot(verts, n) - np.dot(o, n)
+
+
+def _tri_crosses(verts, side_verts, tri_edges, dists, sides, tri):
+    '''
+    port of Plane.edge_intersection on the three sides of tri, using
+    precomputed vertex dists/sides.  returns list of (side, edge, point)
+    '''
+    crosses = []
+    for k,(i0,i1) in enumerate(side_verts[tri].tolist()):
+        s0, s1 = sides[i0], sides[i1]
+        if abs(s0 + s1) == 2: continue
+        if s0 == 0: p = verts[i0]
+        elif s1 == 0: p = verts[i1]
+        else:
+            d0, d1 = dists[i0], dists[i1]
+            v0 = verts[i0].astype(np.float64)
+            p = v0 + (verts[i1] - v0) * (d0 / (d0 - d1))
+        crosses.append((k, int(tri_edges[tri,k]), tuple(p.tolist())))
+    return crosses
+
+
+def plane_crawl(verts, tris, adjacency, tri_edges, tri_start, o, n, eps=0.000001, side_verts=None, dists=None):
+    '''
+    index-based port of RFMesh._crawl.  walks the triangles crossing plane
+    (o,n) starting at tri_start in both directions.  returns a list of
+    (tri0, edge, tri1, point) where tri0/tri1 is None at a boundary, and the
+    first tri0 is not None only if the crawl closed into a loop.
+    vertex distances to the plane are computed once up front (or passed in as
+    dists), so the walk itself only does table lookups.
+    '''
+    if side_verts is None: side_verts = triangle_side_verts(tris)
+    if dists is None: dists = plane_dists(verts, o, n)
+    sides = plane_sides(dists, eps=eps)
+
+    def crosses(tri):
+        return _tri_crosses(verts, side_verts, tri_edges, dists, sides, tri)
+
+    def walk(tri_current, side, edge, cross, cross1):
+        ret = []
+        while True:
+            tri_next = int(adjacency[tri_current, side])
+            if tri_next < 0:
+                ret.append((tri_current, edge, None, cross))
+                return (ret, False)
+            if tri_next == tri_start:
+                ret.append((tri_current, edge, tri_next, cross1))
+                return (ret, True)
+            ret.append((tri_current, edge, tri_next, cross))
+            crosses_next = crosses(tri_next)
+            if len(crosses_next) != 2:
+                ret.append((tri_current, edge, None, cross))
+                return (ret, False)
+            tri_current = tri_next
+            nxt = next(((k, e, c) for (k, e, c) in crosses_next if e != edge), None)
+            if not nxt:
+                ret.append((tri_current, edge, None, cross))
+                return (ret, False)
+            side, edge, cross = nxt
+
+    crosses_start = crosses(tri_start)
+    if len(crosses_start) != 2: return []
+    (k0, e0, c0), (k1, e1, c1) = crosses_start
+    ret, closed = walk(tri_start, k0, e0, c0, c1)
+    if closed: return ret
+    # go other way
+    ret = [(f1, e, f0, c) for (f0, e, f1, c) in reversed(ret)]
+    ret2, _ = walk(tri_start, k1, e1, c1, c1)
+    return ret + ret2
+
+
+def plane_crawls(verts, tris, adjacency, tri_edges, side_verts, cuts, eps=0.000001, dists=None):
+    '''
+    batched plane_crawl.  cuts is a list of (tri_start, o, n); the vertex
+    distances for all planes are computed in a single matrix product (or
+    passed in as dists, (nverts,len(cuts))).
+    returns list of crawls, one per cut
+    '''
+    if not cuts: return []
+    if dists is None:
+        os_ = np.array([o for (_, o, _) in cuts], dtype=np.float64)
+        ns_ = np.array([n for (_, _, n) in cuts], dtype=np.float64)
+        dists = np.dot(verts, ns_.T) - np.einsum('ij,ij->i', os_, ns_)[None,:]
+    return [
+        plane_crawl(verts, tris, adjacency, tri_edges, tri_start, o, n, eps=eps, side_verts=side_verts, dists=dists[:,i])
+        for i,(tri_start, o, n) in enumerate(cuts)
+    ]
+
+
+def walk_to_plane(verts, tris, offsets, neighbors, neighbor_edges, edge_tri, tri, o, n, dists=None):
+    '''
+    index-based port of the walk in RFMesh.plane_intersection_walk_crawl.
+    walks along edges from tri toward plane (o,n), returning the index of a
+    triangle that touches the plane or None.
+    '''
+    if dists is not None:
+        def sdist(i): return float(dists[i])
+    else:
+        o, n = np.asarray(o, dtype=np.float64), np.asarray(n, dtype=np.float64)
+        od = float(np.dot(o, n))
+        def sdist(i): return float(np.dot(verts[i], n)) - od
+
+    tvs = tris[tri].tolist()
+    ds = [sdist(i) for i in tvs]
+    if max(ds) >= 0 and min(ds) <= 0: return tri
+    idx = min(range(3), key=lambda i: ds[i])
+    v, v_dot, sign = tvs[idx], abs(ds[idx]), (-1 if ds[idx] < 0 else 1)
+    touched = set()
+    while True:
+        touched.add(v)
+        i0, i1 = offsets[v], offsets[v + 1]
+        others = [
+            (ov, oe)
+            for (ov, oe) in zip(neighbors[i0:i1].tolist(), neighbor_edges[i0:i1].tolist())
+            if ov not in touched
+        ]
+        if not others: return None
+        others_dot = [sdist(ov) * sign for (ov, _) in others]
+        i = min(range(len(others)), key=lambda i: others_dot[i])
+        (ov, oe), ov_dot = others[i], others_dot[i]
+        if ov_dot <= 0:
+            # found plane!
+            t = int(edge_tri[oe])
+            return t if t >= 0 else None
+        if ov_dot > v_dot: return None
+        v, v_dot = ov, ov_dot
+
+
+def face_csr(faces):
+    '''
+    returns CSR-style (offsets, corners) of faces given as vertex index
+    sequences, where the verts of face i are corners[offsets[i]:offsets[i+1]]
+    '''
+    counts = np.array([len(face) for face in faces], dtype=np.int64)
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    corners = np.fromiter((i for face in faces for i in face), dtype=np.int64, count=int(offsets[-1]))
+    return (offsets, corners)
+
+
+def _scatter_add(accum, idx, vals):
+    ''' accum[idx] += vals, accumulating repeated indices (faster than np.add.at) '''
+    n = len(accum)
+    for k in range(accum.shape[1]):
+        accum[:,k] += np.bincount(idx, weights=vals[:,k], minlength=n)
+
+
+def _normalized(vecs):
+    l = np.linalg.norm(vecs, axis=1)
+    l[l == 0] = 1
+    return vecs / l[:,None]
+
+
+def relax_displacements(verts, edges, face_offsets, face_corners, strength, edge_length=True, face_radius=True, face_sides=True, face_angles=False):
+    '''
+    computes one step of the Relax brush forces in bulk.  returns (n,3)
+    displacements of verts.
+    - edges: (e,2) edges that are pushed toward their average length
+    - face_offsets, face_corners: CSR faces (see face_csr) that are "squared
+      up" by pushing their verts toward the average distance to the face
+      center (face_radius), toward equal side lengths (face_sides) and toward
+      equal spread around the center (face_angles)
+    '''
+    verts = np.asarray(verts, dtype=np.float64)
+    displace = np.zeros(verts.shape)
+
+    if edge_length and len(edges):
+        e0, e1 = edges[:,0], edges[:,1]
+        vecs = verts[e1] - verts[e0]
+        lens = np.linalg.norm(vecs, axis=1)
+        f = vecs * (0.1 * (lens.mean() - lens) * strength)[:,None]
+        _scatter_add(displace, e0, -f)
+        _scatter_add(displace, e1, f)
+
+    nfaces = len(face_offsets) - 1
+    if nfaces <= 0 or not (face_radius or face_sides or face_angles): return displace
+
+    counts = np.diff(face_offsets)
+    starts = face_offsets[:-1]
+    corner_face = np.repeat(np.arange(nfaces), counts)
+    cnts = counts[corner_face].astype(np.float64)
+    local = np.arange(len(face_corners)) - starts[corner_face]
+    corner_next = starts[corner_face] + (local + 1) % counts[corner_face]
+    c0, c1 = face_corners, face_corners[corner_next]
+
+    cos = verts[c0]
+    ctrs = np.add.reduceat(cos, starts, axis=0) / counts[:,None]
+    rels = cos - ctrs[corner_face]
+
+    if face_radius:
+        rel_lens = np.linalg.norm(rels, axis=1)
+        avg_rel_lens = np.add.reduceat(rel_lens, starts) / counts
+        f = rels * ((avg_rel_lens[corner_face] - rel_lens) * strength)[:,None]
+        _scatter_add(displace, c0, f)
+
+    vecs = verts[c1] - cos
+
+    if face_sides:
+        side_lens = np.linalg.norm(vecs, axis=1)
+        avg_side_lens = np.add.reduceat(side_lens, starts) / counts
+        f = vecs * ((avg_side_lens[corner_face] - side_lens) * strength)[:,None]
+        _scatter_add(displace, c0, -f)
+        _scatter_add(displace, c1, f)
+
+    if face_angles:
+        rels1 = rels[corner_next]
+        fvecs0 = _normalized(np.cross(np.cross(rels, vecs), rels))
+        fvecs1 = _normalized(np.cross(rels1, np.cross(rels1, vecs)))
+        l0, l1 = np.linalg.norm(rels, axis=1), np.linalg.norm(rels1, axis=1)
+        ok = (l0 > 0) & (l1 > 0)
+        cosangles = np.sum(rels * rels1, axis=1) / np.where(ok, l0 * l1, 1)
+        angles = np.arccos(np.clip(cosangles, -1, 1))
+        f_mags = np.where(ok, (0.1 * (2.0 * np.pi / cnts - angles) * strength) / cnts, 0)
+        _scatter_add(displace, c0, -fvecs0 * f_mags[:,None])
+        _scatter_add(displace, c1, -fvecs1 * f_mags[:,None])
+
+    return displace
+
+
+def relax_residual(before, after):
+    ''' returns largest distance moved by a vert between before and after '''
+    if not len(before): return 0.0
+    return float(np.max(np.linalg.norm(after - before, axis=1)))
@@ -0,0 +1,189 @@
+'''
+Copyright (C) 2018 CG Cookie
+http://cgcookie.com
+hello@cgcookie.com
+
+Created by Jonathan Denning, Jonathan Williamson
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+'''
+Software rasterizer for picking: projected faces are rendered into a low
+resolution integer ID buffer (closest face wins), so finding the face under
+a point becomes a buffer lookup.  Like mesharrays, nothing in here touches
+bpy/bmesh/mathutils, so it can be used outside of Blender with synthetic
+meshes and a fixed camera matrix.
+
+Conventions:
+- xys:    (n,2) float array of region (pixel) coordinates; nan if not visible
+- depths: (n,) float array of NDC depths (larger is farther; nan if not
+          visible).  NDC z is affine in screen space, so it interpolates
+          correctly across projected triangles, and unlike clip-space w it
+          varies in orthographic views
+- faces:  list of vert index sequences (tris, quads, ngons)
+- -1 denotes "no face"
+'''
+
+import math
+
+import numpy as np
+
+
+def project_points(persmat, width, height, points):
+    '''
+    projects (n,3) world points with a 4x4 perspective matrix (view3d
+    perspective_matrix) into region coordinates of a width x height region.
+    returns ((n,2) xys, (n,) NDC depths), with nan for points behind view
+    '''
+    persmat = np.asarray(persmat, dtype=np.float64)
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    prj = np.dot(points, persmat[:,:3].T) + persmat[:,3]
+    pw = prj[:,3]
+    front = pw > 0
+    pw = np.where(front, pw, 1.0)
+    hw, hh = width / 2.0, height / 2.0
+    xys = np.stack([hw + hw * prj[:,0] / pw, hh + hh * prj[:,1] / pw], axis=1)
+    depths = prj[:,2] / pw
+    xys[~front] = np.nan
+    depths[~front] = np.nan
+    return (xys, depths)
+
+
+def fan_triangulate(faces):
+    ''' returns ((t,3) tris, (t,) index of face for each tri) '''
+    tris, tri_faces = [], []
+    for i_face,face in enumerate(faces):
+        v0 = face[0]
+        for v1,v2 in zip(face[1:-1], face[2:]):
+            tris.append((v0, v1, v2))
+            tri_faces.append(i_face)
+    return (
+        np.array(tris, dtype=np.int64).reshape(-1, 3),
+        np.array(tri_faces, dtype=np.int64),
+    )
+
+
+def rasterize_ids(xys, depths, tris, ids, width, height, max_samples=1<<21):
+    '''
+    rasterizes triangles (in buffer coordinates) into a (height,width) int
+    buffer, sampling each pixel at its center.  each covered pixel gets the
+    id of the closest triangle; uncovered pixels are -1.
+    triangles are processed in chunks of at most max_samples candidate
+    pixels (bounding box area) to bound memory.
+    '''
+    idbuf = np.full((height, width), -1, dtype=np.int64)
+    zbuf = np.full((height, width), np.inf)
+    if not len(tris): return idbuf
+    idbuf = idbuf.reshape(-1)
+    zbuf = zbuf.reshape(-1)
+
+    p = xys[tris]                       # (t,3,2)
+    z = depths[tris]                    # (t,3)
+    ok = np.all(np.isfinite(p.reshape(-1, 6)), axis=1)
+    with np.errstate(invalid='ignore'):
+        xmin = np.clip(np.ceil(np.min(p[:,:,0], axis=1) - 0.5), 0, width)
+        xmax = np.clip(np.floor(np.max(p[:,:,0], axis=1) - 0.5), -1, width - 1)
+        ymin = np.clip(np.ceil(np.min(p[:,:,1], axis=1) - 0.5), 0, height)
+        ymax = np.clip(np.floor(np.max(p[:,:,1], axis=1) - 0.5), -1, height - 1)
+    nx = np.where(ok, np.maximum(xmax - xmin + 1, 0), 0).astype(np.int64)
+    ny = np.where(ok, np.maximum(ymax - ymin + 1, 0), 0).astype(np.int64)
+    xmin, ymin = np.nan_to_num(xmin).astype(np.int64), np.nan_to_num(ymin).astype(np.int64)
+    counts = nx * ny
+
+    tri_idx = np.nonzero(counts)[0]
+    csum = np.cumsum(counts[tri_idx])
+    start = 0
+    while start < len(tri_idx):
+        base = csum[start-1] if start else 0
+        end = max(start + 1, int(np.searchsorted(csum, base + max_samples, side='right')))
+        chunk = tri_idx[start:end]
+        start = end
+
+        c = counts[chunk]
+        t = np.repeat(chunk, c)
+        local = np.arange(len(t)) - np.repeat(np.cumsum(c) - c, c)
+        px = xmin[t] + local % nx[t]
+        py = ymin[t] + local // nx[t]
+        sx, sy = px + 0.5, py + 0.5
+
+        a, b, d = p[t,0], p[t,1], p[t,2]
+        # edge functions (twice the signed areas)
+        w0 = (b[:,0]-a[:,0]) * (sy-a[:,1]) - (b[:,1]-a[:,1]) * (sx-a[:,0])    # opposite d
+        w1 = (d[:,0]-b[:,0]) * (sy-b[:,1]) - (d[:,1]-b[:,1]) * (sx-b[:,0])    # opposite a
+        w2 = (a[:,0]-d[:,0]) * (sy-d[:,1]) - (a[:,1]-d[:,1]) * (sx-d[:,0])    # opposite b
+        area = w0 + w1 + w2
+        inside = (area != 0) & (
+            ((w0 >= 0) & (w1 >= 0) & (w2 >= 0)) |
+            ((w0 <= 0) & (w1 <= 0) & (w2 <= 0))
+        )
+        if not np.any(inside): continue
+        t, px, py = t[inside], px[inside], py[inside]
+        w0, w1, w2, area = w0[inside], w1[inside], w2[inside], area[inside]
+        zs = (w1 * z[t,0] + w2 * z[t,1] + w0 * z[t,2]) / area
+        pix = py * width + px
+
+        # closest sample wins: write farthest first, so closer samples overwrite
+        closer = zs < zbuf[pix]
+        pix, zs, t = pix[closer], zs[closer], t[closer]
+        order = np.argsort(-zs, kind='mergesort')
+        pix, zs, t = pix[order], zs[order], t[order]
+        zbuf[pix] = zs
+        idbuf[pix] = ids[t]
+
+    return idbuf.reshape(height, width)
+
+
+class PickBuffer:
+    '''
+    ID buffer of faces at scale x region resolution.  ids are indices into
+    the faces list given to the constructor.
+    '''
+
+    def __init__(self, xys, depths, faces, width, height, scale=0.5):
+        self.scale = scale
+        self.width = max(1, int(math.ceil(width * scale)))
+        self.height = max(1, int(math.ceil(height * scale)))
+        xys = np.asarray(xys, dtype=np.float64).reshape(-1, 2) * scale
+        depths = np.asarray(depths, dtype=np.float64).reshape(-1)
+        tris, tri_faces = fan_triangulate(faces)
+        self.buffer = rasterize_ids(xys, depths, tris, tri_faces, self.width, self.height)
+
+    def _pixel(self, xy):
+        x, y = int(math.floor(xy[0] * self.scale)), int(math.floor(xy[1] * self.scale))
+        return (x, y)
+
+    def get(self, xy):
+        ''' returns id of face at region point xy (-1 if none) '''
+        x, y = self._pixel(xy)
+        if x < 0 or y < 0 or x >= self.width or y >= self.height: return -1
+        return int(self.buffer[y, x])
+
+    def get_near(self, xy, radius=1):
+        '''
+        returns ids of faces within radius buffer pixels of region point xy,
+        ordered by buffer distance (id at xy first)
+        '''
+        x, y = self._pixel(xy)
+        x0, x1 = max(0, x - radius), min(self.width, x + radius + 1)
+        y0, y1 = max(0, y - radius), min(self.height, y + radius + 1)
+        if x0 >= x1 or y0 >= y1: return []
+        ys, xs = np.mgrid[y0:y1, x0:x1]
+        ids = self.buffer[y0:y1, x0:x1].reshape(-1)
+        dist2 = ((xs - x)**2 + (ys - y)**2).reshape(-1)
+        order = np.argsort(dist2, kind='mergesort')
+        near = []
+        for i in ids[order].tolist():
+            if i != -1 and i not in near: near.append(i)
+        return near
@@ -241,3 +241,30 @@ class Profiler:
 
 profiler = Profiler()
 set_global(profiler)
+
+
+class PhaseTimer:
+    '''
+    wall-clock timer for a sequence of named phases (ex: startup benchmarks).
+    unlike the profiler, this is always on and very cheap, so results can be
+    reported through dprint or kept around as metrics.
+    '''
+
+    def __init__(self, label):
+        self.label = label
+        self.phases = []
+        self.time_start = self.time_last = time.time()
+
+    def mark(self, phase):
+        now = time.time()
+        self.phases.append((phase, now - self.time_last))
+        self.time_last = now
+
+    def total(self):
+        return self.time_last - self.time_start
+
+    def __str__(self):
+        return '%s: %0.4fs (%s)' % (
+            self.label, self.total(),
+            ', '.join('%s %0.4fs' % (p, t) for (p, t) in self.phases)
+        )
@@ -40,6 +40,7 @@ from . import addon_updater_ops
 from .rfmode.rftool import RFTool
 from .rfmode.rfmode import RFMode
 from .rfmode.rfcontext import RFContext
+from .rfmode.rfprewarm import RFSourcePrewarmer
 
 from .icons import load_icons
 from .common.blender import show_blender_text
@@ -265,6 +266,7 @@ class RF_PT_Panel(Panel):
             box.label('%s (%s)' % (n, human_readable(c)))
 
         sources = RFMode.get_sources()
+        RFSourcePrewarmer.update(sources)
         c = len(sources)
         layout.label('%d Source%s:' % (c, '' if c==1 else 's'))
         box = layout.box()
@@ -117,6 +117,13 @@ class Options:
         'options pos':  9,
 
         'async mesh loading': True,
+        'async source loading': True,   # prepare sources on worker threads, interact as they load
+        'prewarm sources':      False,  # prepare sources in background while Blender is idle, before RF starts
+        'symmetry cache disk':  False,  # store symmetry plane slices of sources in temp folder
+        'symmetry cache dir':   'retopoflow_symmetry',
+        'symmetry cache size':  16,     # max number of (source, target transform) slices kept in memory and on disk
+        'target write-back':    'immediate',    # when to write target to Blender mesh: immediate, throttled, deferred
+        'target write-back hz': 4.0,            # max write-back rate when throttled
 
         'tools autohide':      True,    # should tool's options auto-hide/-show when switching tools?
         'tools autocollapse':  True,    # should tool's options auto-open/-collapse when switching tools?
@@ -145,6 +152,9 @@ class Options:
         'tool strokes collapsed': True,
 
         'select dist':          10,             # pixels away to select
+        'pick buffer scale':    0.5,            # resolution (relative to region) of face picking buffer
+        'visibility time budget': 0.008,        # seconds per tick spent recomputing visibility of target
+        'visibility chunk size':  256,          # verts tested for visibility at a time
         'remove doubles dist':  0.001,
 
         'color theme':          'Green',
@@ -189,6 +199,8 @@ class Options:
         'relax face sides':     True,
         'relax face angles':    False,
         'relax force multiplier': 1.5,
+        'relax max steps':      100,
+        'relax residual':       0.001,
 
         'tweak mask boundary':  False,
         'tweak mask hidden':    True,
@@ -307,6 +319,12 @@ class Options:
         tempdir = get_preferences().filepaths.temporary_directory
         return os.path.join(tempdir, '%s.%s' % (self['backup_filename'], ext))
 
+    def temp_dirpath(self, name):
+        tempdir = get_preferences().filepaths.temporary_directory
+        path = os.path.join(tempdir, name)
+        if not os.path.exists(path): os.makedirs(path)
+        return path
+
 
 def rgba_to_float(r, g, b, a): return (r/255.0, g/255.0, b/255.0, a/255.0)
 class Themes:
@@ -189,6 +189,7 @@ class RFContext(RFContext_Drawing, RFContext_UI, RFContext_Spaces, RFContext_Tar
     @profiler.profile
     def __init__(self, rfmode, starting_tool):
         RFContext.instance = self
+        self.time_start = time.time()
         self.undo = []  # undo stack of causing actions, FSM state, tool states, and rftargets
         self.redo = []  # redo stack of causing actions, FSM state, tool states, and rftargets
         self.rfmode = rfmode
@@ -275,9 +276,10 @@ class RFContext(RFContext_Drawing, RFContext_UI, RFContext_Spaces, RFContext_Tar
                rfsd.replace_opts(source_opts)
 
     def commit(self):
-        pass
+        self.write_back_target()
 
     def end(self):
+        self.write_back_target()
         self._end_rotate_about_active()
         self.unscale_from_unit_box()
         RFContext.instance = None
@@ -347,6 +349,7 @@ class RFContext(RFContext_Drawing, RFContext_UI, RFContext_Spaces, RFContext_Tar
     def undo_push(self, action, repeatable=False):
         # skip pushing to undo if action is repeatable and we are repeating actions
         if repeatable and self.undo and self.undo[-1]['action'] == action: return
+        if options['target write-back'] == 'deferred': self.write_back_target()
         self.undo.append(self._create_state(action))
         while len(self.undo) > self.undo_depth: self.undo.pop(0)     # limit stack size
         self.redo.clear()
@@ -432,6 +435,10 @@ class RFContext(RFContext_Drawing, RFContext_UI, RFContext_Spaces, RFContext_Tar
         self._process_event(context, event)
         self.window_manager.update()
 
+        self._update_sources_loading()
+        self.check_first_interaction()
+
+        # memoized: only recasts when view, mouse, or sources changed
         self.actions.hit_pos,self.actions.hit_norm,_,_ = self.raycast_sources_mouse()
 
         if self.actions.pressed('toggle full area'):
@@ -446,6 +453,7 @@ class RFContext(RFContext_Drawing, RFContext_UI, RFContext_Spaces, RFContext_Tar
             return {}
 
         if self.actions.using('autosave'):
+            self.write_back_target()
             return {'pass'}
 
         if self.actions.pressed('all help'):
@@ -462,6 +470,7 @@ class RFContext(RFContext_Drawing, RFContext_UI, RFContext_Spaces, RFContext_Tar
 
         if event.type == 'TIMER':
             self.check_auto_save()
+            self.step_vis_accel()
             # do not return here!  might need TIMER event in RFTool
 
         try:
@@ -495,6 +504,9 @@ class RFContext(RFContext_Drawing, RFContext_UI, RFContext_Spaces, RFContext_Tar
         try:
             nmode = self.FSM[self.mode]()
             if nmode: self.mode = nmode
+            if self.tool and self.tool.mode == 'main' and options['target write-back'] == 'throttled':
+                # interactive operation (if any) is done; guarantee final sync
+                self.write_back_target()
         except AssertionError as e:
             message,h = debugger.get_exception_info_and_hash()
             print(message)
@@ -74,6 +74,8 @@ class RFContext_Drawing:
             self.fps = self.frames / (ctime - wtime)
             self.fps_list = self.fps_list[1:] + [self.fps]
             self.frames = 0
+            self.mouse_hit_rates = (self.mouse_hit_casts / (ctime - wtime), self.mouse_hit_saved / (ctime - wtime))
+            self.mouse_hit_casts,self.mouse_hit_saved = 0,0
             self.fps_time = ctime
 
         if self.fps >= options['low fps threshold']: self.fps_low_start = ctime
@@ -100,6 +102,13 @@ class RFContext_Drawing:
                 th = self.drawing.get_text_height(count_str)
                 self.drawing.text_draw2D(count_str, Point2D((sw-tw-10,th+10)), (1,1,1,0.25), dropshadow=(0,0,0,0.5), fontsize=12)
 
+            if self.is_sources_loading():
+                loaded,total = self.get_sources_loading_progress()
+                load_str = 'Loading sources: %d / %d' % (loaded, total)
+                tw = self.drawing.get_text_width(load_str)
+                th = self.drawing.get_text_height(load_str)
+                self.drawing.text_draw2D(load_str, Point2D(((sw-tw)/2,sh-th-10)), (1,1,1,0.75), dropshadow=(0,0,0,0.5), fontsize=12)
+
             if options['visualize fps'] and self.actions.region:
                 bgl.glEnable(bgl.GL_BLEND)
                 pr = profiler.start('fps postpixel')
@@ -155,6 +164,7 @@ class RFContext_Drawing:
 
             pr = profiler.start('window manager draw postpixel')
             self.window_debug_fps.set_label('FPS: %0.2f' % self.fps)
+            self.window_debug_raycasts.set_label('Mouse raycasts: %0.1f/s (%0.1f/s saved)' % self.mouse_hit_rates)
             self.window_debug_save.set_label('Time: %0.0f' % (self.time_to_save or float('inf')))
             self.window_manager.draw_postpixel(self.actions.context)
             pr.done()
@@ -19,11 +19,16 @@ Created by Jonathan Denning, Jonathan Williamson
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 '''
 
+import os
+import math
+import time
+import numpy as np
 from mathutils import Vector
 from itertools import chain
+from collections import OrderedDict
 from .rfmesh import RFMesh, RFVert, RFEdge, RFFace, RFSource, RFTarget
 from .rfmesh_render import RFMeshRender
-from ..common.utils import iter_pairs
+from ..common.utils import iter_pairs, UniqueCounter
 from ..common.maths import (
     Point, Vec, Direction, Normal,
     Point2D, Vec2D, Direction2D,
@@ -33,8 +38,9 @@ from ..common.maths import (
 )
 from ..common.profiler import profiler
 from ..common.debug import dprint
+from ..common.hasher import Hasher
 from ..common.decorators import stats_wrapper
-from ..options import visualization
+from ..options import visualization, options
 
 
 class RFContext_Sources:
@@ -45,30 +51,183 @@ class RFContext_Sources:
     @profiler.profile
     def _init_sources(self):
         ''' find all valid source objects, which are mesh objects that are visible and not active '''
-        self.rfsources = [RFSource.new(src) for src in self.get_sources()]
-        self.sources_bbox = BBox.merge([rfs.get_bbox() for rfs in self.rfsources])
-        dprint('%d sources found' % len(self.rfsources))
+        self.rfsources = []
+        self.rfsources_draw = []
+        self.rfsources_all = []         # includes sources still loading (only obj-level functions are safe!)
+        self.rfsources_loading = []
+        self.rfsources_count = 0
+        self.sources_bbox = BBox()
+        self.sources_version = UniqueCounter.next()
+        self.mouse_hit = (None,None,None,None)
+        self.mouse_hit_key = None
+        self.mouse_hit_casts = 0        # mouse raycasts performed since last reset
+        self.mouse_hit_saved = 0        # mouse raycasts skipped since last reset
+        self.mouse_hit_rates = (0,0)    # (casts, saved) per second
+        self.time_to_first_interaction = None
+        objs = self.get_sources()
+        dprint('%d sources found' % len(objs))
+        self.rfsources_count = len(objs)
+        if options['async source loading']:
+            loading = [RFSource.new_async(obj, self.executor) for obj in objs]
+            self.rfsources_all = [rfsource for (rfsource,_) in loading]
+            self.rfsources_loading = list(loading)
+            self._update_sources_loading()
+        else:
+            for obj in objs: self._add_source(RFSource.new(obj))
+            self.rfsources_all = list(self.rfsources)
+
+    def _add_source(self, rfsource):
         opts = visualization.get_source_settings()
-        self.rfsources_draw = [RFMeshRender.new(rfs, opts) for rfs in self.rfsources]
+        self.rfsources.append(rfsource)
+        self.rfsources_draw.append(RFMeshRender.new(rfsource, opts))
+        self.sources_bbox = BBox.merge([rfs.get_bbox() for rfs in self.rfsources])
+        self.sources_version = UniqueCounter.next()
+        self.accel_recompute = True     # visibility changes with new source
+
+    def _update_sources_loading(self):
+        ''' moves any sources that finished loading on worker threads into rfsources '''
+        if not self.rfsources_loading: return
+        done = [(rfsource,future) for (rfsource,future) in self.rfsources_loading if future.done()]
+        if not done: return
+        for rfsource,future in done:
+            self.rfsources_loading.remove((rfsource,future))
+            try:
+                self._add_source(future.result())
+            except Exception as e:
+                # drop source that failed to load, but keep RetopoFlow running
+                name = rfsource.obj.name
+                print('ERROR: caught exception while loading source "%s" ' % name + str(e))
+                self.rfsources_all.remove(rfsource)
+                self.rfsources_count -= 1
+                self.alert_user(
+                    title='Could not load source',
+                    message='Source "%s" failed to load and will be ignored.\n\n%s' % (name, str(e)),
+                    level='warning',
+                )
+        if not self.rfsources_loading:
+            dprint('All %d sources loaded' % len(self.rfsources))
+            self._init_sources_symmetry()
+
+    def get_sources_loading_progress(self):
+        ''' returns (loaded, total) '''
+        return (len(self.rfsources), self.rfsources_count)
+
+    def is_sources_loading(self):
+        return bool(self.rfsources_loading)
+
+    def check_first_interaction(self):
+        '''
+        records time from RetopoFlow start until the user can first interact with
+        at least one source (time-to-first-interaction metric)
+        '''
+        if self.time_to_first_interaction is not None or not self.rfsources: return
+        self.time_to_first_interaction = time.time() - self.time_start
+        dprint('Time to first interaction: %0.4fs (%d/%d sources loaded)' % (
+            self.time_to_first_interaction, len(self.rfsources), self.rfsources_count
+        ))
+
+    ###################################################
+    # symmetry plane slices
+    #
+    # slicing every source by the target's symmetry planes and building the
+    # Accel2D structures is expensive, but only depends on the source geometry
+    # and the target transform.  slices are cached per (source, target matrix)
+    # in memory and (optionally) on disk, and the accels are cached for the
+    # most recent combination of sources and target matrix.  both slice caches
+    # keep only the 'symmetry cache size' most recently used entries, since
+    # every source edit or target transform creates a new key.
+
+    symmetry_slices_cache = OrderedDict()   # (source stable hash, target key) -> {'xy','xz','yz': (s,2,3) target-local segments}, least recently used first
+    symmetry_accel_cache = None     # (key, (xy_accel, xz_accel, yz_accel))
+
+    def _symmetry_target_key(self):
+        hasher = Hasher()
+        hasher.add(tuple(self.rftarget.xform.np_mx_p.flatten().tolist()))
+        return hasher.get_hash()
+
+    def _symmetry_slices_path(self, key):
+        dirpath = options.temp_dirpath(options['symmetry cache dir'])
+        return os.path.join(dirpath, '%s_%s.npz' % key)
+
+    def _prune_symmetry_slices(self):
+        ''' drops least recently used slices from memory and disk cache '''
+        # always keep room for current sources, so they do not evict each other
+        size = max(1, options['symmetry cache size'], len(self.rfsources))
+        cache = RFContext_Sources.symmetry_slices_cache
+        while len(cache) > size: cache.popitem(last=False)
+        if not options['symmetry cache disk']: return
+        try:
+            dirpath = options.temp_dirpath(options['symmetry cache dir'])
+            paths = [os.path.join(dirpath, fn) for fn in os.listdir(dirpath) if fn.endswith('.npz')]
+            paths.sort(key=os.path.getmtime, reverse=True)
+            for path in paths[size:]: os.remove(path)
+        except Exception as e:
+            print('ERROR: caught exception while pruning symmetry slices ' + str(e))
+
+    def _get_symmetry_slices(self, rfsource, target_key):
+        key = (rfsource.get_stable_hash(), target_key)
+        cache = RFContext_Sources.symmetry_slices_cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        use_disk = options['symmetry cache disk']
+        if use_disk:
+            try:
+                path = self._symmetry_slices_path(key)
+                if os.path.exists(path):
+                    with np.load(path) as data:
+                        cache[key] = {axes: data[axes] for axes in ['xy', 'xz', 'yz']}
+                    os.utime(path)      # mark as recently used, see _prune_symmetry_slices
+                    self._prune_symmetry_slices()
+                    dprint('Loaded symmetry slices of "%s" from disk' % rfsource.get_obj_name())
+                    return cache[key]
+            except Exception as e:
+                print('ERROR: caught exception while loading symmetry slices ' + str(e))
+
+        w2l_points = self.rftarget.xform.w2l_points
+        def slice_local(plane):
+            segs = rfsource.plane_intersection_segments(plane)
+            return w2l_points(segs.reshape(-1, 3)).reshape(-1, 2, 3)
+        slices = {
+            'xy': slice_local(self.rftarget.get_xy_plane()),
+            'xz': slice_local(self.rftarget.get_xz_plane()),
+            'yz': slice_local(self.rftarget.get_yz_plane()),
+        }
+        cache[key] = slices
+
+        if use_disk:
+            try:
+                np.savez(self._symmetry_slices_path(key), **slices)
+            except Exception as e:
+                print('ERROR: caught exception while saving symmetry slices ' + str(e))
+        self._prune_symmetry_slices()
+        return slices
 
     @profiler.profile
     def _init_sources_symmetry(self):
-        xyplane,xzplane,yzplane = self.rftarget.get_xy_plane(),self.rftarget.get_xz_plane(),self.rftarget.get_yz_plane()
-        w2l_point = self.rftarget.w2l_point
-        rfsources_xyplanes = [e for rfs in self.rfsources for e in rfs.plane_intersection(xyplane)]
-        rfsources_xzplanes = [e for rfs in self.rfsources for e in rfs.plane_intersection(xzplane)]
-        rfsources_yzplanes = [e for rfs in self.rfsources for e in rfs.plane_intersection(yzplane)]
-
-        def gen_accel(edges, Point_to_Point2D):
-            nonlocal w2l_point
-            edges = [(w2l_point(v0), w2l_point(v1)) for (v0, v1) in edges]
+        target_key = self._symmetry_target_key()
+        key = (tuple(rfs.get_stable_hash() for rfs in self.rfsources), target_key)
+        cached = RFContext_Sources.symmetry_accel_cache
+        if cached and cached[0] == key:
+            self.rftarget.set_symmetry_accel(*cached[1])
+            return
+
+        slices = [self._get_symmetry_slices(rfs, target_key) for rfs in self.rfsources]
+
+        def gen_accel(axes, Point_to_Point2D):
+            segs = [s[axes] for s in slices if len(s[axes])]
+            segs = np.concatenate(segs).tolist() if segs else []
+            edges = [(Point(p0), Point(p1)) for (p0, p1) in segs]
             return Accel2D.simple_edges(edges, Point_to_Point2D)
 
-        self.rftarget.set_symmetry_accel(
-            gen_accel(rfsources_xyplanes, lambda p:Point2D((p.x,p.y))),
-            gen_accel(rfsources_xzplanes, lambda p:Point2D((p.x,p.z))),
-            gen_accel(rfsources_yzplanes, lambda p:Point2D((p.y,p.z))),
+        accels = (
+            gen_accel('xy', lambda p:Point2D((p.x,p.y))),
+            gen_accel('xz', lambda p:Point2D((p.x,p.z))),
+            gen_accel('yz', lambda p:Point2D((p.y,p.z))),
         )
+        RFContext_Sources.symmetry_accel_cache = (key, accels)
+        self.rftarget.set_symmetry_accel(*accels)
 
     ###################################################
     # snap settings
@@ -104,6 +263,9 @@ class RFContext_Sources:
 
     def raycast_sources_Point2D(self, xy:Point2D):
         if xy is None: return None,None,None,None
+        mouse = self.actions.mouse
+        if mouse is not None and xy[0] == mouse[0] and xy[1] == mouse[1]:
+            return self.raycast_sources_mouse()
         return self.raycast_sources_Ray(self.Point2D_to_Ray(xy))
 
     def raycast_sources_Point2D_all(self, xy:Point2D):
@@ -111,7 +273,26 @@ class RFContext_Sources:
         return self.raycast_sources_Ray_all(self.Point2D_to_Ray(xy))
 
     def raycast_sources_mouse(self):
-        return self.raycast_sources_Point2D(self.actions.mouse)
+        '''
+        raycast at mouse.  hit is memoized per (view, mouse, sources, snap
+        settings), so events that do not change these (and tools that raycast
+        the mouse again) do not recast
+        '''
+        xy = self.actions.mouse
+        if xy is None: return None,None,None,None
+        key = (
+            tuple(self.get_view_version()),
+            (xy[0], xy[1]),
+            self.sources_version,
+            tuple(sorted(self.snap_sources.items())),
+        )
+        if key == self.mouse_hit_key:
+            self.mouse_hit_saved += 1
+        else:
+            self.mouse_hit = self.raycast_sources_Ray(self.Point2D_to_Ray(xy))
+            self.mouse_hit_key = key
+            self.mouse_hit_casts += 1
+        return self.mouse_hit
 
     def raycast_sources_Point(self, xyz:Point):
         if xyz is None: return None,None,None,None
@@ -119,6 +300,55 @@ class RFContext_Sources:
         return self.raycast_sources_Point2D(xy)
 
 
+    ###################################################
+    # batched ray casting functions
+    # these return numpy arrays (points, normals, indices, dists), where a
+    # miss has nan point/normal, index -1, and dist inf
+
+    @profiler.profile
+    def raycast_sources_Rays(self, origins, directions, maxdists=None):
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        count = len(origins)
+        bp = np.full((count, 3), np.nan)
+        bn = np.full((count, 3), np.nan)
+        bi = np.full(count, -1, dtype=np.int64)
+        bd = np.full(count, np.inf)
+        for rfsource in self.rfsources:
+            if not self.get_rfsource_snap(rfsource): continue
+            hp,hn,hi,hd = rfsource.raycast_batch(origins, directions, maxdists)
+            closer = hd < bd
+            bp[closer],bn[closer],bi[closer],bd[closer] = hp[closer],hn[closer],hi[closer],hd[closer]
+        return (bp,bn,bi,bd)
+
+    def raycast_sources_Point2Ds(self, xys):
+        ''' xys is a list of Point2D (None entries are treated as misses) or an (n,2) array '''
+        if type(xys) is not np.ndarray:
+            nan = float('nan')
+            xys = [(nan,nan) if xy is None else tuple(xy) for xy in xys]
+        origins,directions = self.Point2Ds_to_Rays(xys)
+        return self.raycast_sources_Rays(origins, directions)
+
+    def raycast_sources_Point2Ds_Points(self, xys):
+        ''' batched raycast that returns a list of Point (None if ray missed) '''
+        return self.hits_to_Points(self.raycast_sources_Point2Ds(xys)[0])
+
+    def raycast_sources_Points(self, xyzs):
+        return self.raycast_sources_Point2Ds(self.Points_to_Point2Ds(xyzs))
+
+    @staticmethod
+    def hits_to_Points(points, normals=None):
+        '''
+        converts batched results into a list of Point (or None on miss),
+        or a list of (Point, Normal) pairs if normals are given
+        '''
+        if normals is None:
+            return [None if math.isnan(p[0]) else Point(p) for p in points.tolist()]
+        return [
+            (None,None) if math.isnan(p[0]) else (Point(p),Normal(n))
+            for (p,n) in zip(points.tolist(), normals.tolist())
+        ]
+
+
     ###################################################
     # nearest surface point (snapping) functions
 
@@ -131,6 +361,21 @@ class RFContext_Sources:
                 bp,bn,bi,bd = hp,hn,hi,hd
         return (bp,bn,bi,bd)
 
+    def nearest_sources_Points(self, points, max_dist=float('inf')):
+        ''' batched nearest_sources_Point; returns numpy arrays as raycast_sources_Rays does '''
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        count = len(points)
+        bp = np.full((count, 3), np.nan)
+        bn = np.full((count, 3), np.nan)
+        bi = np.full(count, -1, dtype=np.int64)
+        bd = np.full(count, np.inf)
+        for rfsource in self.rfsources:
+            if not self.get_rfsource_snap(rfsource): continue
+            hp,hn,hi,hd = rfsource.nearest_batch(points, max_dist=max_dist)
+            closer = hd < bd
+            bp[closer],bn[closer],bi[closer],bd[closer] = hp[closer],hn[closer],hi[closer],hd[closer]
+        return (bp,bn,bi,bd)
+
 
     ###################################################
     # plane intersection
@@ -149,6 +394,39 @@ class RFContext_Sources:
         else:
             return bo.plane_intersection_crawl(ray, plane)
 
+    @profiler.profile
+    def plane_intersection_crawls(self, rays, planes, walk=False):
+        '''
+        batched plane_intersection_crawl: rays are cast against all sources at
+        once, and the crawls for each source are done together
+        '''
+        count = len(rays)
+        if not count: return []
+        origins = [tuple(ray.o) for ray in rays]
+        directions = [tuple(ray.d) for ray in rays]
+        maxdists = [ray.max for ray in rays]
+        best_dist = np.full(count, np.inf)
+        best_tri = np.full(count, -1, dtype=np.int64)
+        best_src = [None] * count
+        for rfsource in self.rfsources:
+            if not self.get_rfsource_snap(rfsource): continue
+            _,_,indices,dists = rfsource.raycast_batch(origins, directions, maxdists)
+            closer = np.nonzero(dists < best_dist)[0]
+            best_dist[closer] = dists[closer]
+            best_tri[closer] = indices[closer]
+            for i in closer.tolist(): best_src[i] = rfsource
+
+        crawls = [None if walk else [] for _ in range(count)]
+        for rfsource in set(s for s in best_src if s is not None):
+            idxs = [i for i in range(count) if best_src[i] is rfsource]
+            rets = rfsource.plane_intersection_crawls(
+                [int(best_tri[i]) for i in idxs],
+                [planes[i] for i in idxs],
+                walk=walk,
+            )
+            for i,ret in zip(idxs, rets): crawls[i] = ret
+        return crawls
+
     def plane_intersections_crawl(self, plane:Plane):
         return [crawl for rfsource in self.rfsources for crawl in rfsource.plane_intersections_crawl(plane) if self.get_rfsource_snap(rfsource)]
 
@@ -156,12 +434,35 @@ class RFContext_Sources:
     ###################################################
     # visibility testing
 
+    @profiler.profile
+    def is_visible_points(self, points, xys=None):
+        '''
+        batched is_visible (without normal test).  points is an (n,3) array,
+        xys optional precomputed Points_to_Point2Ds(points).
+        returns (n,) bool array
+        '''
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if xys is None: xys = self.Points_to_Point2Ds(points)
+        w,h = self.actions.size
+        with np.errstate(invalid='ignore'):
+            vis = (xys[:,0] >= 0) & (xys[:,0] <= w) & (xys[:,1] >= 0) & (xys[:,1] <= h)
+        if not self.rfsources: return vis     # nothing (yet) to occlude
+        idx = np.nonzero(vis)[0]
+        if not len(idx): return vis
+        max_dist_offset = self.sources_bbox.get_min_dimension()*0.01 + 0.0008
+        origins,directions = self.Point2Ds_to_Rays(xys[idx])
+        maxdists = np.linalg.norm(origins - points[idx], axis=1) - max_dist_offset
+        _,_,_,dists = self.raycast_sources_Rays(origins, directions, maxdists)
+        vis[idx] = ~np.isfinite(dists)
+        return vis
+
     @profiler.profile
     def is_visible(self, point:Point, normal:Normal):
         p2D = self.Point_to_Point2D(point)
         if not p2D: return False
         if p2D.x < 0 or p2D.x > self.actions.size[0]: return False
         if p2D.y < 0 or p2D.y > self.actions.size[1]: return False
+        if not self.rfsources: return True     # nothing (yet) to occlude
         max_dist_offset = self.sources_bbox.get_min_dimension()*0.01 + 0.0008
         ray = self.Point_to_Ray(point, max_dist_offset=-max_dist_offset)
         if not ray: return False
@@ -20,6 +20,7 @@ Created by Jonathan Denning, Jonathan Williamson
 '''
 
 import bpy
+import numpy as np
 
 from mathutils import Matrix, Vector
 from bpy_extras.view3d_utils import location_3d_to_region_2d, region_2d_to_vector_3d
@@ -116,6 +117,88 @@ class RFContext_Spaces:
         return abs(xy.y - pt2D.y)
 
 
+    #############################################
+    # batched conversions
+    # these mirror the bpy_extras.view3d_utils functions used above, but work
+    # on (n,2) / (n,3) numpy arrays and share the matrix setup across calls
+
+    def _get_projection(self):
+        rgn, r3d = self.actions.region, self.actions.r3d
+        persmat = r3d.perspective_matrix
+        key = (
+            tuple(v for r in persmat for v in r),
+            rgn.width, rgn.height,
+            r3d.is_perspective, r3d.view_perspective,
+        )
+        proj = getattr(self, '_projection', None)
+        if proj is None or proj['key'] != key:
+            tonp = lambda m: np.array([list(r) for r in m], dtype=np.float64)
+            proj = {
+                'key': key,
+                'w': rgn.width, 'h': rgn.height,
+                'persp': r3d.is_perspective,
+                'camera': r3d.view_perspective == 'CAMERA',
+                'persmat': tonp(persmat),
+                'persinv': tonp(persmat.inverted()),
+                'viewinv': tonp(r3d.view_matrix.inverted()),
+            }
+            self._projection = proj
+        return proj
+
+    @profiler.profile
+    def Point2Ds_to_Rays(self, xys):
+        '''
+        batched Point2D_to_Ray.  xys is an (n,2) array-like (rows of nan are allowed)
+        returns (origins, directions) as (n,3) numpy arrays
+        '''
+        proj = self._get_projection()
+        xys = np.asarray(xys, dtype=np.float64).reshape(-1, 2)
+        count = len(xys)
+        w, h = proj['w'], proj['h']
+        persinv, viewinv = proj['persinv'], proj['viewinv']
+        dx = 2.0 * xys[:,0] / w - 1.0
+        dy = 2.0 * xys[:,1] / h - 1.0
+        if proj['persp']:
+            out = np.stack([dx, dy, np.full(count, -0.5)], axis=1)
+            pw = np.dot(out, persinv[3,:3]) + persinv[3,3]
+            d = (np.dot(out, persinv[:3,:3].T) + persinv[:3,3]) / pw[:,None] - viewinv[:3,3]
+            o = np.tile(viewinv[:3,3], (count, 1))
+        else:
+            d = np.tile(-viewinv[:3,2], (count, 1))
+            o = dx[:,None] * persinv[:3,0] + dy[:,None] * persinv[:3,1] + persinv[:3,3]
+            if not proj['camera']: o -= persinv[:3,2]
+        l = np.linalg.norm(d, axis=1)
+        l[l == 0] = 1
+        return (o, d / l[:,None])
+
+    def Points_to_Point2Ds(self, xyzs):
+        '''
+        batched Point_to_Point2D.  xyzs is an (n,3) array-like
+        returns (n,2) numpy array, where points behind view are nan
+        '''
+        return self.Points_to_Point2Ds_depths(xyzs)[0]
+
+    @profiler.profile
+    def Points_to_Point2Ds_depths(self, xyzs):
+        '''
+        same as Points_to_Point2Ds, but also returns (n,) numpy array of NDC
+        depths (z/w, so also valid in ortho views), where larger is farther
+        '''
+        proj = self._get_projection()
+        xyzs = np.asarray(xyzs, dtype=np.float64).reshape(-1, 3)
+        persmat = proj['persmat']
+        prj = np.dot(xyzs, persmat[:,:3].T) + persmat[:,3]
+        pw = prj[:,3]
+        front = pw > 0
+        pw = np.where(front, pw, 1.0)
+        hw, hh = proj['w'] / 2.0, proj['h'] / 2.0
+        xys = np.stack([hw + hw * prj[:,0] / pw, hh + hh * prj[:,1] / pw], axis=1)
+        depths = prj[:,2] / pw
+        xys[~front] = np.nan
+        depths[~front] = np.nan
+        return (xys, depths)
+
+
     #############################################
     # return camera up and right vectors
 
@@ -19,12 +19,15 @@ Created by Jonathan Denning, Jonathan Williamson
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 '''
 
+import math
 import time
 from itertools import chain
+import numpy as np
 from mathutils import Vector
 from ..common.debug import dprint
 from ..common.profiler import profiler
 from ..common.utils import iter_pairs
+from ..common.pickbuffer import PickBuffer
 from ..common.maths import Point, Vec, Direction, Normal, Ray, XForm
 from ..common.maths import Point2D, Vec2D, Direction2D, Accel2D
 from .rfmesh import RFMesh, RFVert, RFEdge, RFFace
@@ -56,6 +59,17 @@ class RFContext_Target:
         self.accel_vis_edges = None
         self.accel_vis_faces = None
         self.accel_vis_accel = None
+        self.accel_vis_job = None
+        self.accel_vis_step = 0
+        self.accel_vis_done = 0
+        self.pick_buffer = None
+        self.pick_buffer_key = None
+        self.pick_buffer_faces = None
+        self.proj_verts = None
+        self.proj_verts_key = None
+        self.proj_verts_patched = False
+        self.accel_nearest_memo = {}
+        self.accel_nearest_memo_key = None
 
     #########################################
     # acceleration structures
@@ -64,6 +78,12 @@ class RFContext_Target:
 
     @profiler.profile
     def get_vis_accel(self, force=False):
+        '''
+        returns Accel2D of visible target geometry.  after the target or view
+        changes, visibility is recomputed progressively (see _vis_job_start),
+        so the accel (and accel_vis_verts, _edges, _faces) might only be
+        partially complete.  force=True finishes recomputing before returning.
+        '''
         target_version = self.get_target_version(selection=False)
         view_version = self.get_view_version()
 
@@ -82,60 +102,315 @@ class RFContext_Target:
         if force or recompute:
             self.accel_target_version = target_version
             self.accel_view_version = view_version
-            self.accel_vis_verts = self.visible_verts()
-            self.accel_vis_edges = self.visible_edges(verts=self.accel_vis_verts)
-            self.accel_vis_faces = self.visible_faces(verts=self.accel_vis_verts)
-            self.accel_vis_accel = Accel2D(self.accel_vis_verts, self.accel_vis_edges, self.accel_vis_faces, self.get_point2D)
+            self._vis_job_start()
         else:
             self.accel_vis_verts = { bmv for bmv in self.accel_vis_verts if bmv.is_valid } if self.accel_vis_verts is not None else None
             self.accel_vis_edges = { bme for bme in self.accel_vis_edges if bme.is_valid } if self.accel_vis_edges is not None else None
             self.accel_vis_faces = { bmf for bmf in self.accel_vis_faces if bmf.is_valid } if self.accel_vis_faces is not None else None
 
+        if self.accel_vis_job:
+            self._vis_job_step(float('inf') if force else options['visibility time budget'])
+
         return self.accel_vis_accel
 
+    def step_vis_accel(self):
+        ''' continues progressive visibility computation (called on modal ticks) '''
+        if not self.accel_vis_job: return
+        if self.accel_defer_recomputing or self.nav: return
+        self._vis_job_step(options['visibility time budget'])
+
+    @profiler.profile
+    def _vis_job_start(self):
+        '''
+        starts computing visibility of target verts.  using the projected
+        verts cache, off-screen verts are dropped, and the rest are ordered by
+        distance to mouse, so verts near the mouse are tested first.
+        '''
+        pv = self.get_projected_verts()
+        bmvs,cos,xys = pv['bmvs'],pv['cos'],pv['xys']
+        w,h = self.actions.size
+        with np.errstate(invalid='ignore'):
+            idx = np.nonzero((xys[:,0] >= 0) & (xys[:,0] <= w) & (xys[:,1] >= 0) & (xys[:,1] <= h))[0]
+        mx,my = self.actions.mouse if self.actions.mouse else (w / 2, h / 2)
+        idx = idx[np.argsort((xys[idx,0] - mx)**2 + (xys[idx,1] - my)**2, kind='mergesort')]
+        self.accel_vis_job = {
+            'bmvs': [bmvs[i] for i in idx.tolist()],
+            'cos': cos[idx],
+            'xys': xys[idx],
+            'next': 0,
+            'visible': set(),       # visible BMVerts found so far
+        }
+        self.accel_vis_verts = set()
+        self.accel_vis_edges = set()
+        self.accel_vis_faces = set()
+        self.accel_vis_accel = Accel2D([], [], [], self.get_point2D, bounds=((0,0), (w,h)))
+        self.accel_vis_step += 1
+
+    @profiler.profile
+    def _vis_job_step(self, budget):
+        '''
+        tests chunks of verts until budget (seconds) is spent.  after each
+        chunk, the new visible verts and the edges and faces that just became
+        fully visible are added, so the accel is always consistent.
+        '''
+        job = self.accel_vis_job
+        if not job: return
+        time_stop = time.time() + budget
+        chunk = options['visibility chunk size']
+        rftarget = self.rftarget
+        wrap_bmvert,wrap_bmedge,wrap_bmface = rftarget._wrap_bmvert,rftarget._wrap_bmedge,rftarget._wrap_bmface
+        bmvs,visible = job['bmvs'],job['visible']
+        while job['next'] < len(bmvs):
+            i0 = job['next']
+            i1 = min(i0 + chunk, len(bmvs))
+            job['next'] = i1
+            vis = self.is_visible_points(job['cos'][i0:i1], xys=job['xys'][i0:i1]).tolist()
+            nbmvs,v2Ds = [],[]
+            for bmv,v,xy in zip(bmvs[i0:i1], vis, job['xys'][i0:i1].tolist()):
+                if not v or not bmv.is_valid: continue
+                nbmvs.append(bmv)
+                v2Ds.append(Point2D(xy))
+            visible.update(nbmvs)
+            nbmes = {bme for bmv in nbmvs for bme in bmv.link_edges if all(v in visible for v in bme.verts)}
+            nbmfs = {bmf for bmv in nbmvs for bmf in bmv.link_faces if all(v in visible for v in bmf.verts)}
+            verts = [wrap_bmvert(bmv) for bmv in nbmvs]
+            edges = [wrap_bmedge(bme) for bme in nbmes]
+            faces = [wrap_bmface(bmf) for bmf in nbmfs]
+            self.accel_vis_verts.update(verts)
+            self.accel_vis_edges.update(edges)
+            self.accel_vis_faces.update(faces)
+            self.accel_vis_accel.insert(verts, edges, faces, v2Ds=v2Ds)
+            self.accel_vis_step += 1
+            if time.time() > time_stop: break
+        if job['next'] >= len(bmvs):
+            self.accel_vis_job = None
+            self.accel_vis_done += 1
+
+    def _get_accel_nearest_memo(self, xy):
+        '''
+        memo of accel_nearest2D_* results at xy.  memo is cleared whenever xy,
+        target, view, or visible geometry (see get_vis_accel) changes
+        '''
+        vis_accel = self.get_vis_accel()
+        if not vis_accel: return None
+        key = (tuple(xy), self.get_target_version(selection=False), tuple(self.get_view_version()), self.accel_vis_step)
+        if self.accel_nearest_memo_key != key:
+            self.accel_nearest_memo = {}
+            self.accel_nearest_memo_key = key
+        return self.accel_nearest_memo
+
+    def _accel_nearest2D_candidates(self, memo, xy, max_dist):
+        ''' visible verts, edges, and faces binned near xy (all if max_dist is None) '''
+        mkey = ('candidates', max_dist)
+        if mkey not in memo:
+            if not max_dist:
+                memo[mkey] = (self.accel_vis_verts, self.accel_vis_edges, self.accel_vis_faces)
+            else:
+                vis_accel = self.accel_vis_accel
+                vert_type,edge_type,face_type = vis_accel.vert_type,vis_accel.edge_type,vis_accel.face_type
+                near = vis_accel.get(xy, max_dist)
+                memo[mkey] = (
+                    {g for g in near if type(g) is vert_type},
+                    {g for g in near if type(g) is edge_type},
+                    {g for g in near if type(g) is face_type},
+                )
+        return memo[mkey]
+
     @profiler.profile
     def accel_nearest2D_vert(self, point=None, max_dist=None, verts=None):
         xy = self.get_point2D(point or self.actions.mouse)
-        vis_accel = self.get_vis_accel()
-        if not vis_accel: return None,None
+        memo = self._get_accel_nearest_memo(xy)
+        if memo is None: return None,None
 
         max_dist = self.drawing.scale(max_dist)
 
-        if not verts:
-            if not max_dist:
-                verts = self.accel_vis_verts
-            else:
-                verts = vis_accel.get_verts(xy, max_dist)
+        if verts:
+            return self.rftarget.nearest2D_bmvert_Point2D(xy, self.get_BMVert_to_Point2D(), verts=verts, max_dist=max_dist)
 
-        return self.rftarget.nearest2D_bmvert_Point2D(xy, self.Point_to_Point2D, verts=verts, max_dist=max_dist)
+        mkey = ('vert', max_dist)
+        if mkey not in memo or (memo[mkey][0] and not memo[mkey][0].is_valid):
+            verts,_,_ = self._accel_nearest2D_candidates(memo, xy, max_dist)
+            memo[mkey] = self.rftarget.nearest2D_bmvert_Point2D(xy, self.get_BMVert_to_Point2D(), verts=verts, max_dist=max_dist)
+        return memo[mkey]
 
     @profiler.profile
     def accel_nearest2D_edge(self, point=None, max_dist=None):
         xy = self.get_point2D(point or self.actions.mouse)
-        vis_accel = self.get_vis_accel()
-        if not vis_accel: return None,None
+        memo = self._get_accel_nearest_memo(xy)
+        if memo is None: return None,None
 
-        if not max_dist:
-            edges = self.accel_vis_edges
-        else:
-            max_dist = self.drawing.scale(max_dist)
-            edges = vis_accel.get_edges(xy, max_dist)
+        if max_dist: max_dist = self.drawing.scale(max_dist)
 
-        return self.rftarget.nearest2D_bmedge_Point2D(xy, self.Point_to_Point2D, edges=edges, max_dist=max_dist)
+        mkey = ('edge', max_dist)
+        if mkey not in memo or (memo[mkey][0] and not memo[mkey][0].is_valid):
+            _,edges,_ = self._accel_nearest2D_candidates(memo, xy, max_dist)
+            memo[mkey] = self.rftarget.nearest2D_bmedge_Point2D(xy, self.get_BMVert_to_Point2D(), edges=edges, max_dist=max_dist)
+        return memo[mkey]
+
+    @profiler.profile
+    def get_pick_buffer(self):
+        '''
+        face ID buffer of visible faces (see common/pickbuffer.py).  rebuilt
+        once each time visible faces finish recomputing (see get_vis_accel).
+        returns None while visibility is still being recomputed, so callers
+        fall back to the (partial) Accel2D candidates rather than rasterizing
+        all visible faces again after every step
+        '''
+        if not self.get_vis_accel(): return None
+        if self.accel_vis_job: return None
+        key = self.accel_vis_done
+        if self.pick_buffer is None or self.pick_buffer_key != key:
+            faces = [bmf for bmf in self.accel_vis_faces if bmf.is_valid]
+            pv = self.get_projected_verts()
+            index,unwrap = pv['index'],self.rftarget._unwrap
+            faces = [bmf for bmf in faces if all(unwrap(bmv) in index for bmv in bmf.verts)]
+            findices = [[index[unwrap(bmv)] for bmv in bmf.verts] for bmf in faces]
+            w,h = self.actions.size
+            self.pick_buffer = PickBuffer(pv['xys'], pv['depths'], findices, w, h, scale=options['pick buffer scale'])
+            self.pick_buffer_faces = faces
+            self.pick_buffer_key = key
+        return self.pick_buffer
 
     @profiler.profile
     def accel_nearest2D_face(self, point=None, max_dist=None):
         xy = self.get_point2D(point or self.actions.mouse)
-        vis_accel = self.get_vis_accel()
-        if not vis_accel: return None
+        memo = self._get_accel_nearest_memo(xy)
+        if memo is None: return None
+
+        if max_dist: max_dist = self.drawing.scale(max_dist)
+
+        mkey = ('face', max_dist)
+        if mkey not in memo or (memo[mkey] and not memo[mkey].is_valid):
+            pick = self.get_pick_buffer()
+            if pick:
+                # faces in buffer near xy (closest first) are checked exactly
+                faces = [self.pick_buffer_faces[i] for i in pick.get_near(xy)]
+                faces = [bmf for bmf in faces if bmf.is_valid]
+            else:
+                _,_,faces = self._accel_nearest2D_candidates(memo, xy, max_dist)
+            memo[mkey] = self.rftarget.nearest2D_bmface_Point2D(xy, self.get_BMVert_to_Point2D(), faces=faces) #, max_dist=max_dist)
+        return memo[mkey]
+
+    @profiler.profile
+    def accel_nearest2D(self, point=None, max_dist=None):
+        '''
+        nearest visible vert, edge, and face to point (default: mouse), sharing
+        one Accel2D lookup.  returns ((vert,dist), (edge,dist), face), where
+        missing elements are None.  results are memoized per point, target
+        version, and view version, so repeated calls (also through the
+        accel_nearest2D_* functions) are free
+        '''
+        return (
+            self.accel_nearest2D_vert(point=point, max_dist=max_dist),
+            self.accel_nearest2D_edge(point=point, max_dist=max_dist),
+            self.accel_nearest2D_face(point=point, max_dist=max_dist),
+        )
 
-        if not max_dist:
-            faces = self.accel_vis_faces
-        else:
-            max_dist = self.drawing.scale(max_dist)
-            faces = vis_accel.get_faces(xy, max_dist)
 
-        return self.rftarget.nearest2D_bmface_Point2D(xy, self.Point_to_Point2D, faces=faces) #, max_dist=max_dist)
+    #########################################
+    # projected verts cache
+
+    @profiler.profile
+    def get_projected_verts(self):
+        '''
+        screen-space positions of all target verts in current view, shared by
+        the 2D queries.  returns dict with
+            'bmvs':   list of BMVerts
+            'index':  BMVert -> row
+            'cos':    (n,3) world positions
+            'xys':    (n,2) region positions (nan if behind view)
+            'depths': (n,) NDC depths (nan if behind view)
+            'p2ds':   list of Point2D (None if behind view)
+        rebuilt with one batched projection when view or target changes.
+        verts moved through set*_vert(s) functions below are patched instead,
+        and the patched cache is carried over the next dirty() (see dirty).
+        '''
+        key = (self.get_target_version(selection=False), tuple(self.get_view_version()))
+        if self.proj_verts is None or self.proj_verts_key != key:
+            rftarget = self.rftarget
+            bmvs = [bmv for bmv in rftarget.bme.verts if bmv.is_valid]
+            cos = rftarget.xform.l2w_points([tuple(bmv.co) for bmv in bmvs])
+            xys,depths = self.Points_to_Point2Ds_depths(cos)
+            self.proj_verts = {
+                'bmvs': bmvs,
+                'index': {bmv:i for (i,bmv) in enumerate(bmvs)},
+                'cos': cos,
+                'xys': xys,
+                'depths': depths,
+                'p2ds': [None if math.isnan(x) else Point2D((x,y)) for (x,y) in xys.tolist()],
+            }
+            self.proj_verts_key = key
+            self.proj_verts_patched = False
+        return self.proj_verts
+
+    def get_BMVert_to_Point2D(self):
+        ''' returns function that looks up projected BMVert in cache '''
+        pv = self.get_projected_verts()
+        index,p2ds = pv['index'],pv['p2ds']
+        l2w_point,Point_to_Point2D = self.rftarget.xform.l2w_point,self.Point_to_Point2D
+        def BMVert_to_Point2D(bmv):
+            i = index.get(bmv, None)
+            if i is None: return Point_to_Point2D(l2w_point(bmv.co))   # not in cache (new vert)
+            return p2ds[i]
+        return BMVert_to_Point2D
+
+    def Vert_to_Point2D(self, vert:RFVert):
+        return self.get_BMVert_to_Point2D()(self.rftarget._unwrap(vert))
+
+    def Verts_to_Point2Ds(self, verts):
+        ''' list of Point2D (or None if behind view) of verts '''
+        BMVert_to_Point2D,unwrap = self.get_BMVert_to_Point2D(),self.rftarget._unwrap
+        return [BMVert_to_Point2D(unwrap(v)) for v in verts]
+
+    @profiler.profile
+    def is_visible_verts(self, verts):
+        ''' batched is_visible (with normal test) of verts.  returns list of bools '''
+        pv = self.get_projected_verts()
+        index,unwrap = pv['index'],self.rftarget._unwrap
+        bmvs = [unwrap(v) for v in verts]
+        idx = [index.get(bmv, None) for bmv in bmvs]
+        if not bmvs: return []
+        if any(i is None for i in idx):
+            # vert is not in cache (new vert)
+            l2w_point,l2w_normal = self.rftarget.xform.l2w_point,self.rftarget.xform.l2w_normal
+            return [self.is_visible(l2w_point(bmv.co), l2w_normal(bmv.normal)) for bmv in bmvs]
+        idx = np.array(idx, dtype=np.int64)
+        xys = pv['xys'][idx]
+        vis = self.is_visible_points(pv['cos'][idx], xys=xys)
+        normals = self.rftarget.xform.l2w_normals([tuple(bmv.normal) for bmv in bmvs])
+        _,directions = self.Point2Ds_to_Rays(xys)
+        with np.errstate(invalid='ignore'):
+            vis &= np.sum(normals * directions, axis=1) < 0
+        return vis.tolist()
+
+    def _patch_projected_verts(self, verts, target_version):
+        '''
+        reprojects moved verts in cache.  target_version is the (non-selection)
+        version of target before verts moved, so cache is only kept if it was
+        current before the move.
+        '''
+        pv = self.proj_verts
+        if pv is None: return
+        view_version = tuple(self.get_view_version())
+        if self.proj_verts_key != (target_version, view_version): return
+        index,unwrap = pv['index'],self.rftarget._unwrap
+        bmvs = [unwrap(v) for v in verts]
+        idx = [index.get(bmv, None) for bmv in bmvs]
+        if any(i is None for i in idx):
+            # vert is not in cache, so rebuild on next use
+            self.proj_verts = None
+            return
+        cos = self.rftarget.xform.l2w_points([tuple(bmv.co) for bmv in bmvs])
+        xys,depths = self.Points_to_Point2Ds_depths(cos)
+        idx = np.array(idx, dtype=np.int64)
+        pv['cos'][idx] = cos
+        pv['xys'][idx] = xys
+        pv['depths'][idx] = depths
+        p2ds = pv['p2ds']
+        for i,(x,y) in zip(idx.tolist(), xys.tolist()):
+            p2ds[i] = None if math.isnan(x) else Point2D((x,y))
+        self.proj_verts_key = (self.get_target_version(selection=False), view_version)
+        self.proj_verts_patched = True
 
 
     #########################################
@@ -149,50 +424,50 @@ class RFContext_Target:
     def nearest2D_vert(self, point=None, max_dist=None, verts=None):
         xy = self.get_point2D(point or self.actions.mouse)
         if max_dist: max_dist = self.drawing.scale(max_dist)
-        return self.rftarget.nearest2D_bmvert_Point2D(xy, self.Point_to_Point2D, verts=verts, max_dist=max_dist)
+        return self.rftarget.nearest2D_bmvert_Point2D(xy, self.get_BMVert_to_Point2D(), verts=verts, max_dist=max_dist)
 
     @profiler.profile
     def nearest2D_verts(self, point=None, max_dist:float=10, verts=None):
         xy = self.get_point2D(point or self.actions.mouse)
         max_dist = self.drawing.scale(max_dist)
-        return self.rftarget.nearest2D_bmverts_Point2D(xy, max_dist, self.Point_to_Point2D, verts=verts)
+        return self.rftarget.nearest2D_bmverts_Point2D(xy, max_dist, self.get_BMVert_to_Point2D(), verts=verts)
 
     @profiler.profile
     def nearest2D_edge(self, point=None, max_dist=None, edges=None):
         xy = self.get_point2D(point or self.actions.mouse)
         if max_dist: max_dist = self.drawing.scale(max_dist)
-        return self.rftarget.nearest2D_bmedge_Point2D(xy, self.Point_to_Point2D, edges=edges, max_dist=max_dist)
+        return self.rftarget.nearest2D_bmedge_Point2D(xy, self.get_BMVert_to_Point2D(), edges=edges, max_dist=max_dist)
 
     @profiler.profile
     def nearest2D_edges(self, point=None, max_dist:float=10, edges=None):
         xy = self.get_point2D(point or self.actions.mouse)
         if max_dist: max_dist = self.drawing.scale(max_dist)
-        return self.rftarget.nearest2D_bmedges_Point2D(xy, max_dist, self.Point_to_Point2D, edges=edges)
+        return self.rftarget.nearest2D_bmedges_Point2D(xy, max_dist, self.get_BMVert_to_Point2D(), edges=edges)
 
     # TODO: implement max_dist
     @profiler.profile
     def nearest2D_face(self, point=None, max_dist=None, faces=None):
         xy = self.get_point2D(point or self.actions.mouse)
         if max_dist: max_dist = self.drawing.scale(max_dist)
-        return self.rftarget.nearest2D_bmface_Point2D(xy, self.Point_to_Point2D, faces=faces)
+        return self.rftarget.nearest2D_bmface_Point2D(xy, self.get_BMVert_to_Point2D(), faces=faces)
 
     # TODO: fix this function! Izzza broken
     @profiler.profile
     def nearest2D_faces(self, point=None, max_dist:float=10, faces=None):
         xy = self.get_point2D(point or self.actions.mouse)
         if max_dist: max_dist = self.drawing.scale(max_dist)
-        return self.rftarget.nearest2D_bmfaces_Point2D(xy, self.Point_to_Point2D, faces=faces)
+        return self.rftarget.nearest2D_bmfaces_Point2D(xy, self.get_BMVert_to_Point2D(), faces=faces)
 
     ####################
     # REWRITE BELOW!!! #
     ####################
 
     def nearest2D_face_Point2D(self, point:Point2D, faces=None):
-        return self.rftarget.nearest2D_bmface_Point2D(point, self.Point_to_Point2D, faces=faces)
+        return self.rftarget.nearest2D_bmface_Point2D(point, self.get_BMVert_to_Point2D(), faces=faces)
 
     def nearest2D_face_point(self, point):
         xy = self.get_point2D(point)
-        return self.rftarget.nearest2D_bmface_Point2D(xy, self.Point_to_Point2D)
+        return self.rftarget.nearest2D_bmface_Point2D(xy, self.get_BMVert_to_Point2D())
 
     def nearest2D_face_mouse(self):
         return self.nearest2D_face_point(self.actions.mouse)
@@ -200,7 +475,7 @@ class RFContext_Target:
     def nearest2D_face_point(self, point):
         # if max_dist: max_dist = self.drawing.scale(max_dist)
         xy = self.get_point2D(point)
-        return self.rftarget.nearest2D_bmface_Point2D(xy, self.Point_to_Point2D)
+        return self.rftarget.nearest2D_bmface_Point2D(xy, self.get_BMVert_to_Point2D())
 
 
     ########################################
@@ -240,14 +515,19 @@ class RFContext_Target:
 
     @profiler.profile
     def visible_verts(self):
-        return self.rftarget.visible_verts(self.is_visible)
+        pv = self.get_projected_verts()
+        vis = self.is_visible_points(pv['cos'], xys=pv['xys']).tolist()
+        wrap_bmvert = self.rftarget._wrap_bmvert
+        return { wrap_bmvert(bmv) for (bmv,v) in zip(pv['bmvs'], vis) if v and bmv.is_valid }
 
     @profiler.profile
     def visible_edges(self, verts=None):
+        if verts is None: verts = self.visible_verts()
         return self.rftarget.visible_edges(self.is_visible, verts=verts)
 
     @profiler.profile
     def visible_faces(self, verts=None):
+        if verts is None: verts = self.visible_verts()
         return self.rftarget.visible_faces(self.is_visible, verts=verts)
 
 
@@ -362,28 +642,46 @@ class RFContext_Target:
         xyz,norm,_,_ = self.nearest_sources_Point(vert.co)
         vert.co = xyz
         vert.normal = norm
+        self._patch_projected_verts([vert], self.get_target_version(selection=False))
 
     def snap2D_vert(self, vert:RFVert):
-        xy = self.Point_to_Point2D(vert.co)
+        xy = self.Vert_to_Point2D(vert)
         xyz,norm,_,_ = self.raycast_sources_Point2D(xy)
         if xyz is None: return
         vert.co = xyz
         vert.normal = norm
+        self._patch_projected_verts([vert], self.get_target_version(selection=False))
 
     def offset2D_vert(self, vert:RFVert, delta_xy:Vec2D):
-        xy = self.Point_to_Point2D(vert.co) + delta_xy
+        xy = self.Vert_to_Point2D(vert) + delta_xy
         xyz,norm,_,_ = self.raycast_sources_Point2D(xy)
         if xyz is None: return
         vert.co = xyz
         vert.normal = norm
+        self._patch_projected_verts([vert], self.get_target_version(selection=False))
 
     def set2D_vert(self, vert:RFVert, xy:Point2D):
         xyz,norm,_,_ = self.raycast_sources_Point2D(xy)
         if xyz is None: return
         vert.co = xyz
         vert.normal = norm
+        self._patch_projected_verts([vert], self.get_target_version(selection=False))
         return xyz
 
+    def set2D_verts(self, verts, xys):
+        ''' batched set2D_vert; verts whose ray misses the sources are left in place '''
+        points,normals,_,_ = self.raycast_sources_Point2Ds(xys)
+        target_version = self.get_target_version(selection=False)
+        self.rftarget.set_cos(verts, points, normals=normals)
+        self._patch_projected_verts(verts, target_version)
+
+    def set_verts_co(self, verts, points, normals=None, snap=True):
+        ''' batched setting of vert positions, optionally snapping them to the sources '''
+        nearest = self.nearest_sources_Points if snap else None
+        target_version = self.get_target_version(selection=False)
+        self.rftarget.set_cos(verts, points, normals=normals, snap=nearest)
+        self._patch_projected_verts(verts, target_version)
+
     def set2D_crawl_vert(self, vert:RFVert, xy:Point2D):
         hits = self.raycast_sources_Point2D_all(xy)
         if not hits: return
@@ -392,6 +690,7 @@ class RFContext_Target:
         p,n,_,_ = min(hits, key=lambda hit:(hit[0]-co).length)
         vert.co = p
         vert.normal = n
+        self._patch_projected_verts([vert], self.get_target_version(selection=False))
 
 
     def new_vert_point(self, xyz:Point):
@@ -413,13 +712,25 @@ class RFContext_Target:
     def new_face(self, verts):
         return self.rftarget.new_face(verts)
 
+    def new_verts_faces(self, points, faces, verts=None):
+        '''
+        bulk version of new_vert_point and new_face.  points are snapped to
+        the sources (points too far away are not created).  see
+        RFTarget.new_geometry for how faces index into verts and new verts.
+        '''
+        xyzs,norms,_,_ = self.nearest_sources_Points(points)
+        return self.rftarget.new_geometry(xyzs, norms, faces, verts=verts)
+
+    def new2D_verts_faces(self, xys, faces, verts=None):
+        ''' bulk version of new2D_vert_point and new_face (see new_verts_faces) '''
+        xyzs,norms,_,_ = self.raycast_sources_Point2Ds(xys)
+        return self.rftarget.new_geometry(xyzs, norms, faces, verts=verts)
+
     def bridge_vertloop(self, vloop0, vloop1, connected):
         assert len(vloop0) == len(vloop1), "loops must have same vertex counts"
-        faces = []
-        for pair0,pair1 in zip(iter_pairs(vloop0, connected), iter_pairs(vloop1, connected)):
-            v00,v01 = pair0
-            v10,v11 = pair1
-            faces += [self.new_face((v00,v01,v11,v10))]
+        n = len(vloop0)
+        faces = [(i0,i1,n+i1,n+i0) for (i0,i1) in iter_pairs(list(range(n)), connected)]
+        _,faces = self.rftarget.new_geometry([], [], faces, verts=list(vloop0)+list(vloop1))
         return faces
 
     def holes_fill(self, edges, sides):
@@ -437,13 +748,32 @@ class RFContext_Target:
     def remove_duplicate_bmfaces(self, vert):
         return self.rftarget.remove_duplicate_bmfaces(vert)
 
+    def clean_duplicate_bmedges_region(self, verts):
+        return self.rftarget.clean_duplicate_bmedges_region(verts)
+
+    def clean_duplicates(self, verts):
+        return self.rftarget.clean_duplicates(verts)
+
     ###################################################
 
     def ensure_lookup_tables(self):
         self.rftarget.ensure_lookup_tables()
 
     def dirty(self):
+        # tools mark target dirty after every modal step (RFTool.dirty_when_done),
+        # which would throw away projected verts cache even when the step only
+        # moved verts through the set*_vert(s) functions that patch it.  keep
+        # cache if it was patched since last dirty, target did not change in
+        # between, and no verts were added or removed.
+        pv = self.proj_verts
+        keep = (
+            pv is not None and self.proj_verts_patched and
+            self.proj_verts_key[0] == self.get_target_version(selection=False) and
+            len(self.rftarget.bme.verts) == len(pv['bmvs'])
+        )
         self.rftarget.dirty()
+        self.proj_verts_patched = False
+        if keep: self.proj_verts_key = (self.get_target_version(selection=False), self.proj_verts_key[1])
 
     def get_target_version(self, selection=True):
         return self.rftarget.get_version(selection=selection)
@@ -483,6 +813,13 @@ class RFContext_Target:
     def get_selected_faces(self):
         return self.rftarget.get_selected_faces()
 
+    def write_back_target(self):
+        ''' forces sync of target object with RFTarget, regardless of write-back policy '''
+        self.rftarget.write_back()
+
+    def get_selection_counts(self):
+        return self.rftarget.get_selection_counts()
+
     def any_verts_selected(self):
         return self.rftarget.any_verts_selected()
 
@@ -757,6 +757,15 @@ class RFContext_UI:
         info_adv.add(UI_Checkbox('Debug Actions', *optgetset('debug actions'), tooltip="Print actions (except MOUSEMOVE) to console"))
         info_adv.add(UI_Checkbox('Instrument', *optgetset('instrument'), tooltip="Enable to record all of your actions to a text block. CAUTION: will slow down responsiveness!"))
         info_adv.add(UI_Checkbox('Async Loading', *optgetset('async mesh loading'), tooltip="Load meshes asynchronously"))
+        info_adv.add(UI_Checkbox('Pre-warm Sources', *optgetset('prewarm sources'), tooltip="Prepare sources in the background while Blender is idle, so RetopoFlow starts faster"))
+        info_adv.add(UI_Checkbox('Cache Symmetry on Disk', *optgetset('symmetry cache disk'), tooltip="Store symmetry plane slices of sources in Blender's temporary folder, so they are reused across sessions"))
+        opt_writeback = info_adv.add(UI_Options(*optgetset('target write-back'), vertical=False))
+        opt_writeback.set_label('Write-Back:')
+        opt_writeback.add_option('Immediate', value='immediate', tooltip='Update target mesh in Blender after every change')
+        opt_writeback.add_option('Throttled', value='throttled', tooltip='Update target mesh in Blender at most a few times per second while editing, and when done editing')
+        opt_writeback.add_option('Deferred', value='deferred', tooltip='Update target mesh in Blender only on save, undo push, and exit')
+        opt_writeback.set_option(options['target write-back'])
+        info_adv.add(UI_Number('Write-Back Rate', *optgetset('target write-back hz', setwrap=lambda v:min(60,max(0.1,v))), tooltip='Maximum number of target mesh updates per second when throttled'))
 
         ui_save = info_adv.add(UI_Collapsible('Auto Save', collapsed=True))
         self.window_debug_save = ui_save.add(UI_Label('Time: inf', tooltip="Seconds until auto save is triggered (based on Blender settings)"))
@@ -764,6 +773,7 @@ class RFContext_UI:
 
         ui_lowfps = info_adv.add(UI_Collapsible('FPS Options', collapsed=True))
         self.window_debug_fps = ui_lowfps.add(UI_Label('FPS: 0.00'))
+        self.window_debug_raycasts = ui_lowfps.add(UI_Label('Mouse raycasts: 0.0/s (0.0/s saved)'))
         ui_lowfps.add(UI_Checkbox('Chart', *optgetset('visualize fps'), tooltip='Enable to visualize FPS in chart'))
         ui_lowfps.add(UI_Checkbox('Perform Check', *optgetset('low fps warn'), tooltip='Enable low FPS checking'))
         ui_lowfps.add(UI_Number('Threshold', *optgetset('low fps threshold', setwrap=lambda v:min(60,max(1,v))), tooltip='Set low FPS threshold'))
@@ -21,6 +21,10 @@ Created by Jonathan Denning, Jonathan Williamson
 
 import math
 import copy
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+
+import numpy as np
 
 import bpy
 import bmesh
@@ -38,11 +42,13 @@ from mathutils.geometry import normal as compute_normal, intersect_point_tri
 from ..common.maths import Point, Normal
 from ..common.maths import Point2D
 from ..common.maths import Ray, XForm, BBox, Plane
-from ..common.hasher import hash_object
-from ..common.utils import min_index, UniqueCounter
+from ..common.hasher import hash_object, Hasher
+from ..common import mesharrays
+from ..common.utils import min_index, UniqueCounter, iter_pairs
 from ..common.decorators import stats_wrapper, blender_version_wrapper
 from ..common.debug import dprint
-from ..common.profiler import profiler
+from ..common.profiler import profiler, PhaseTimer
+from ..options import options
 
 from .rfmesh_wrapper import (
     BMElemWrapper, RFVert, RFEdge, RFFace, RFEdgeSequence
@@ -74,28 +80,15 @@ class RFMesh():
         deform=False, bme=None, triangulate=False,
         selection=True, keepeme=False
     ):
-        pr = profiler.start('checking for NaNs')
-        hasnan = any(
-            math.isnan(v)
-            for emv in obj.data.vertices
-            for v in emv.co
-        )
-        pr2 = profiler.start('validating mesh data')
-        if hasnan:
-            dprint('Mesh data contains NaN in vertex coordinate!')
-            dprint('Cleaning mesh')
-            obj.data.validate(verbose=True, clean_customdata=False)
-        else:
-            # cleaning mesh quietly
-            obj.data.validate(verbose=False, clean_customdata=False)
-        pr2.done()
-        pr.done()
+        timer = PhaseTimer('RFMesh setup "%s"' % obj.name)
+        self._validate_mesh(obj, timer)
 
         pr = profiler.start('setup init')
         self.obj = obj
         self.xform = XForm(self.obj.matrix_world)
         self.hash = hash_object(self.obj)
         pr.done()
+        timer.mark('hash')
 
         if bme is not None:
             self.bme = bme
@@ -107,35 +100,131 @@ class RFMesh():
                 settings='PREVIEW'
             )
             self.eme.update()
-            self.bme = bmesh.new()
-            self.bme.from_mesh(self.eme)
+            timer.mark('to_mesh')
+
+            if selection:
+                pr2 = profiler.start('copying selection')
+                # copy selection from editmesh in bulk (from_mesh carries it into bmesh)
+                self._copy_selection(self.obj.data, self.eme)
+                pr2.done()
+                timer.mark('selection')
+
+            if triangulate:
+                pr2 = profiler.start('triangulating')
+                tmesh = self._triangulated_mesh(self.eme)
+                timer.mark('triangulate')
+                self.bme = bmesh.new()
+                self.bme.from_mesh(tmesh)
+                bpy.data.meshes.remove(tmesh)
+                pr2.done()
+            else:
+                self.bme = bmesh.new()
+                self.bme.from_mesh(self.eme)
+            timer.mark('bmesh')
+
             if not keepeme:
                 del self.eme
                 self.eme = None
             pr.done()
 
             if selection:
-                pr = profiler.start('copying selection')
                 self.bme.select_mode = {'FACE', 'EDGE', 'VERT'}
-                # copy selection from editmesh
-                for bmf, emf in zip(self.bme.faces, self.obj.data.polygons):
-                    bmf.select = emf.select
-                for bme, eme in zip(self.bme.edges, self.obj.data.edges):
-                    bme.select = eme.select
-                for bmv, emv in zip(self.bme.verts, self.obj.data.vertices):
-                    bmv.select = emv.select
-                pr.done()
             else:
                 self.deselect_all()
 
-        if triangulate:
-            self.triangulate()
-
         pr = profiler.start('setup finishing')
         self.selection_center = Point((0, 0, 0))
+        self._topology_cache = {}
+        self._topology_cache_limit = 1024
         self.store_state()
         self.dirty()
         pr.done()
+        timer.mark('finishing')
+
+        self.setup_timer = timer
+        dprint(str(timer))
+
+    @staticmethod
+    def _validate_mesh(obj, timer):
+        pr = profiler.start('checking for NaNs')
+        cos = np.empty(len(obj.data.vertices) * 3, dtype=np.float32)
+        obj.data.vertices.foreach_get('co', cos)
+        hasnan = bool(np.isnan(cos).any())
+        del cos
+        timer.mark('nan scan')
+        pr2 = profiler.start('validating mesh data')
+        if hasnan:
+            dprint('Mesh data contains NaN in vertex coordinate!')
+            dprint('Cleaning mesh')
+            obj.data.validate(verbose=True, clean_customdata=False)
+        else:
+            # cleaning mesh quietly
+            obj.data.validate(verbose=False, clean_customdata=False)
+        pr2.done()
+        pr.done()
+        timer.mark('validate')
+
+    @staticmethod
+    def _copy_selection(src, dst):
+        for attr in ['polygons', 'edges', 'vertices']:
+            esrc, edst = getattr(src, attr), getattr(dst, attr)
+            nsrc, ndst = len(esrc), len(edst)
+            sel_src = np.zeros(nsrc, dtype=bool)
+            esrc.foreach_get('select', sel_src)
+            if nsrc != ndst:
+                # counts differ (should not happen w/o modifiers), so match up by index
+                sel_dst = np.zeros(ndst, dtype=bool)
+                n = min(nsrc, ndst)
+                sel_dst[:n] = sel_src[:n]
+                sel_src = sel_dst
+            edst.foreach_set('select', sel_src)
+
+    @blender_version_wrapper('<', '2.80')
+    def _get_triangles(self, mesh):
+        # tessfaces are tris and quads (ngons are already split), where
+        # triangles have v4 == 0 (Blender rotates quads so that v4 != 0)
+        mesh.calc_tessface()
+        count = len(mesh.tessfaces)
+        faces = np.empty(count * 4, dtype=np.int32)
+        mesh.tessfaces.foreach_get('vertices_raw', faces)
+        faces.shape = (count, 4)
+        quads = faces[faces[:,3] != 0]
+        return np.concatenate([
+            faces[faces[:,3] == 0][:,:3],
+            quads[:,[0,1,2]],
+            quads[:,[0,2,3]],
+        ])
+    @blender_version_wrapper('>=', '2.80')
+    def _get_triangles(self, mesh):
+        mesh.calc_loop_triangles()
+        count = len(mesh.loop_triangles)
+        tris = np.empty(count * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get('vertices', tris)
+        tris.shape = (count, 3)
+        return tris
+
+    def _triangulated_mesh(self, mesh):
+        '''
+        builds a temporary triangulated copy of mesh with bulk foreach_set calls.
+        caller is responsible for removing it from bpy.data.meshes
+        '''
+        nverts = len(mesh.vertices)
+        cos = np.empty(nverts * 3, dtype=np.float32)
+        mesh.vertices.foreach_get('co', cos)
+        tris = self._get_triangles(mesh)
+        ntris = len(tris)
+        dprint('%d triangles from %d faces' % (ntris, len(mesh.polygons)))
+
+        tmesh = bpy.data.meshes.new('RetopoFlow triangulated')
+        tmesh.vertices.add(nverts)
+        tmesh.vertices.foreach_set('co', cos)
+        tmesh.loops.add(ntris * 3)
+        tmesh.loops.foreach_set('vertex_index', tris.ravel())
+        tmesh.polygons.add(ntris)
+        tmesh.polygons.foreach_set('loop_start', np.arange(0, ntris * 3, 3, dtype=np.int32))
+        tmesh.polygons.foreach_set('loop_total', np.full(ntris, 3, dtype=np.int32))
+        tmesh.update(calc_edges=True)
+        return tmesh
 
     ##########################################################
 
@@ -553,6 +642,15 @@ class RFMesh():
     def _unwrap(self, elem):
         return elem if not hasattr(elem, 'bmelem') else elem.bmelem
 
+    def _set_select(self, elem, select):
+        bmelem = self._unwrap(elem)
+        bmelem.select = select
+        self._selection_track(bmelem, select)
+
+    # selection index hooks (see RFTarget)
+    def _selection_track(self, bmelem, select): pass
+    def selection_invalidate(self): pass
+
 
     ##########################################################
 
@@ -566,6 +664,70 @@ class RFMesh():
         d_w = (ray.o - p_w).length
         return (p_w,n_w,i,d_w)
 
+    # worker pool for background preparation of sources (see RFSource.new_async).
+    # created on first use, so importing does not start idle threads
+    executor = None
+
+    @staticmethod
+    def get_executor():
+        if RFMesh.executor is None: RFMesh.executor = ThreadPoolExecutor()
+        return RFMesh.executor
+
+    @profiler.profile
+    def raycast_batch(self, origins, directions, maxdists=None):
+        '''
+        batched version of raycast.  origins and directions are (n,3) world
+        space arrays, maxdists is an optional (n,) array (default: inf).
+        returns (points, normals, indices, dists) as numpy arrays, where misses
+        have points/normals set to nan, indices set to -1, and dists set to inf.
+        '''
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+        count = len(origins)
+        if maxdists is None: maxdists = np.full(count, np.inf)
+        else: maxdists = np.asarray(maxdists, dtype=np.float64).reshape(-1)
+
+        points = np.full((count, 3), np.nan)
+        normals = np.full((count, 3), np.nan)
+        indices = np.full(count, -1, dtype=np.int64)
+        dists = np.full(count, np.inf)
+        valid = np.all(np.isfinite(origins), axis=1) & np.all(np.isfinite(directions), axis=1)
+        idx = np.nonzero(valid)[0]
+        if not len(idx): return (points, normals, indices, dists)
+
+        # convert rays to local space (see XForm.w2l_ray)
+        o_l = self.xform.w2l_points(origins[idx])
+        d_l = self.xform.w2l_vectors(directions[idx])
+        l = np.linalg.norm(d_l, axis=1)
+        l[l == 0] = 1
+        m_l = maxdists[idx] * l
+        d_l /= l[:,None]
+
+        # BVHTree.ray_cast holds the GIL, so the casts are not split across threads
+        ray_cast = self.get_bvh().ray_cast
+        hits = [ray_cast(o, d, m) for (o, d, m) in zip(o_l.tolist(), d_l.tolist(), m_l.tolist())]
+
+        hit = np.array([h[0] is not None for h in hits], dtype=bool)
+        if not np.any(hit): return (points, normals, indices, dists)
+        idx = idx[hit]
+        hits = [h for h in hits if h[0] is not None]
+        p_l = np.array([tuple(h[0]) for h in hits], dtype=np.float64)
+        n_l = np.array([tuple(h[1]) for h in hits], dtype=np.float64)
+        i_l = np.array([h[2] for h in hits], dtype=np.int64)
+
+        # ignore hits outside of bbox (see raycast)
+        bbox = self.get_bbox()
+        if bbox.min and bbox.max:
+            inside = np.all((p_l >= np.array(bbox.min) - 1) & (p_l <= np.array(bbox.max) + 1), axis=1)
+            idx, p_l, n_l, i_l = idx[inside], p_l[inside], n_l[inside], i_l[inside]
+
+        p_w = self.xform.l2w_points(p_l)
+        points[idx] = p_w
+        normals[idx] = self.xform.l2w_normals(n_l)
+        indices[idx] = i_l
+        dists[idx] = np.linalg.norm(origins[idx] - p_w, axis=1)
+        return (points, normals, indices, dists)
+
     def raycast_all(self, ray:Ray):
         l2w_point,l2w_normal = self.xform.l2w_point,self.xform.l2w_normal
         ray_local = self.xform.w2l_ray(ray)
@@ -597,6 +759,35 @@ class RFMesh():
         d = (point - p).length
         return (p,n,i,d)
 
+    def nearest_batch(self, points, max_dist=float('inf')):
+        '''
+        batched version of nearest.  points is an (n,3) world space array.
+        returns (points, normals, indices, dists) as numpy arrays, where misses
+        (and nan input points) have points/normals set to nan, indices set
+        to -1, and dists set to inf.
+        '''
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        count = len(points)
+        h_p = np.full((count, 3), np.nan)
+        h_n = np.full((count, 3), np.nan)
+        h_i = np.full(count, -1, dtype=np.int64)
+        h_d = np.full(count, np.inf)
+        idx = np.nonzero(np.all(np.isfinite(points), axis=1))[0]
+        if not len(idx): return (h_p, h_n, h_i, h_d)
+
+        find_nearest = self.get_bvh().find_nearest
+        hits = [find_nearest(p, max_dist) for p in self.xform.w2l_points(points[idx]).tolist()]
+        hit = np.array([h[0] is not None for h in hits], dtype=bool)
+        if not np.any(hit): return (h_p, h_n, h_i, h_d)
+        idx = idx[hit]
+        hits = [h for h in hits if h[0] is not None]
+        p_w = self.xform.l2w_points([tuple(h[0]) for h in hits])
+        h_p[idx] = p_w
+        h_n[idx] = self.xform.l2w_normals([tuple(h[1]) for h in hits])
+        h_i[idx] = [h[2] for h in hits]
+        h_d[idx] = np.linalg.norm(points[idx] - p_w, axis=1)
+        return (h_p, h_n, h_i, h_d)
+
     def nearest_bmvert_Point(self, point:Point, verts=None):
         if verts is None:
             verts = [bmv for bmv in self.bme.verts if bmv.is_valid]
@@ -653,7 +844,7 @@ class RFMesh():
             nearest += [(self._wrap_bmedge(bme), dist)]
         return nearest
 
-    def nearest2D_bmverts_Point2D(self, xy:Point2D, dist2D:float, Point_to_Point2D, verts=None):
+    def nearest2D_bmverts_Point2D(self, xy:Point2D, dist2D:float, BMVert_to_Point2D, verts=None):
         # TODO: compute distance from camera to point
         # TODO: sort points based on 3d distance
         if verts is None:
@@ -662,14 +853,14 @@ class RFMesh():
             verts = [self._unwrap(bmv) for bmv in verts if bmv.is_valid]
         nearest = []
         for bmv in verts:
-            p2d = Point_to_Point2D(self.xform.l2w_point(bmv.co))
+            p2d = BMVert_to_Point2D(bmv)
             if p2d is None: continue
             if (p2d - xy).length > dist2D: continue
             d3d = 0
             nearest += [(self._wrap_bmvert(bmv), d3d)]
         return nearest
 
-    def nearest2D_bmvert_Point2D(self, xy:Point2D, Point_to_Point2D, verts=None, max_dist=None):
+    def nearest2D_bmvert_Point2D(self, xy:Point2D, BMVert_to_Point2D, verts=None, max_dist=None):
         if not max_dist or max_dist < 0: max_dist = float('inf')
         # TODO: compute distance from camera to point
         # TODO: sort points based on 3d distance
@@ -677,10 +868,9 @@ class RFMesh():
             verts = [bmv for bmv in self.bme.verts if bmv.is_valid]
         else:
             verts = [self._unwrap(bmv) for bmv in verts if bmv.is_valid]
-        l2w_point = self.xform.l2w_point
         bv,bd = None,None
         for bmv in verts:
-            p2d = Point_to_Point2D(l2w_point(bmv.co))
+            p2d = BMVert_to_Point2D(bmv)
             if p2d is None: continue
             d2d = (xy - p2d).length
             if d2d > max_dist: continue
@@ -688,18 +878,17 @@ class RFMesh():
         if bv is None: return (None,None)
         return (self._wrap_bmvert(bv),bd)
 
-    def nearest2D_bmedges_Point2D(self, xy:Point2D, dist2D:float, Point_to_Point2D, edges=None, shorten=0.01):
+    def nearest2D_bmedges_Point2D(self, xy:Point2D, dist2D:float, BMVert_to_Point2D, edges=None, shorten=0.01):
         # TODO: compute distance from camera to point
         # TODO: sort points based on 3d distance
         if edges is None:
             edges = [bme for bme in self.bme.edges if bme.is_valid]
         else:
             edges = [self._unwrap(bme) for bme in edges if bme.is_valid]
-        l2w_point = self.xform.l2w_point
         nearest = []
         dist2D2 = dist2D**2
         s0,s1 = shorten/2,1-shorten/2
-        proj = lambda bmv: Point_to_Point2D(l2w_point(bmv.co))
+        proj = BMVert_to_Point2D
         for bme in edges:
             v0,v1 = proj(bme.verts[0]),proj(bme.verts[1])
             l = v0.distance_to(v1)
@@ -713,17 +902,16 @@ class RFMesh():
             nearest.append((self._wrap_bmedge(bme), math.sqrt(dist2)))
         return nearest
 
-    def nearest2D_bmedge_Point2D(self, xy:Point2D, Point_to_Point2D, edges=None, shorten=0.01, max_dist=None):
+    def nearest2D_bmedge_Point2D(self, xy:Point2D, BMVert_to_Point2D, edges=None, shorten=0.01, max_dist=None):
         if not max_dist or max_dist < 0: max_dist = float('inf')
         if edges is None:
             edges = [bme for bme in self.bme.edges if bme.is_valid]
         else:
             edges = [self._unwrap(bme) for bme in edges if bme.is_valid]
-        l2w_point = self.xform.l2w_point
         be,bd,bpp = None,None,None
         for bme in edges:
-            bmv0 = Point_to_Point2D(l2w_point(bme.verts[0].co))
-            bmv1 = Point_to_Point2D(l2w_point(bme.verts[1].co))
+            bmv0 = BMVert_to_Point2D(bme.verts[0])
+            bmv1 = BMVert_to_Point2D(bme.verts[1])
             if bmv0 is None or bmv1 is None: continue
             diff = bmv1 - bmv0
             l = diff.length
@@ -740,7 +928,7 @@ class RFMesh():
         if be is None: return (None,None)
         return (self._wrap_bmedge(be), (xy-bpp).length)
 
-    def nearest2D_bmfaces_Point2D(self, xy:Point2D, Point_to_Point2D, faces=None):
+    def nearest2D_bmfaces_Point2D(self, xy:Point2D, BMVert_to_Point2D, faces=None):
         # TODO: compute distance from camera to point
         # TODO: sort points based on 3d distance
         if faces is None:
@@ -749,7 +937,7 @@ class RFMesh():
             faces = [self._unwrap(bmf) for bmf in faces if bmf.is_valid]
         nearest = []
         for bmf in faces:
-            pts = [Point_to_Point2D(self.xform.l2w_point(bmv.co)) for bmv in bmf.verts]
+            pts = [BMVert_to_Point2D(bmv) for bmv in bmf.verts]
             pts = [pt for pt in pts if pt]
             pt0 = pts[0]
             # TODO: Get dist?
@@ -764,7 +952,7 @@ class RFMesh():
         #return (self._wrap_bmvert(bv),bd)
         return nearest
 
-    def nearest2D_bmface_Point2D(self, xy:Point2D, Point_to_Point2D, faces=None):
+    def nearest2D_bmface_Point2D(self, xy:Point2D, BMVert_to_Point2D, faces=None):
         # TODO: compute distance from camera to point
         # TODO: sort points based on 3d distance
         if faces is None:
@@ -773,7 +961,7 @@ class RFMesh():
             faces = [self._unwrap(bmf) for bmf in faces if bmf.is_valid]
         bv,bd = None,None
         for bmf in faces:
-            pts = [Point_to_Point2D(self.xform.l2w_point(bmv.co)) for bmv in bmf.verts]
+            pts = [BMVert_to_Point2D(bmv) for bmv in bmf.verts]
             pts = [pt for pt in pts if pt]
             if len(pts) < 3: continue
             pt0 = pts[0]
@@ -788,7 +976,6 @@ class RFMesh():
         #return (self._wrap_bmvert(bv),bd)
         return None
 
-
     ##########################################################
 
     def _visible_verts(self, is_visible):
@@ -885,8 +1072,8 @@ class RFMesh():
                 selems.update(e for e in elem.edges if not (set(e.verts)&elems))
         selems = selems - elems
         selems = { e for e in selems if e.select }
-        for elem in nelems: elem.select = False
-        for elem in selems: elem.select = True
+        for elem in nelems: self._set_select(elem, False)
+        for elem in selems: self._set_select(elem, True)
         if subparts:
             nelems = set()
             for elem in elems:
@@ -908,7 +1095,7 @@ class RFMesh():
                         if any(f.select for f in bmv.link_faces): continue
                         nelems.add(bmv)
             for elem in nelems:
-                elem.select = False
+                self._set_select(elem, False)
         self.dirty(selectionOnly=True)
 
     def select(self, elems, supparts=True, subparts=True, only=True):
@@ -928,21 +1115,75 @@ class RFMesh():
                     nelems.update(e for e in elem.verts)
                     nelems.update(e for e in elem.edges)
             elems = nelems
-        for elem in elems: elem.select = True
+        for elem in elems: self._set_select(elem, True)
         if supparts:
             for elem in elems:
                 t = type(elem)
                 if t is not BMVert and t is not RFVert: continue
                 for bme in elem.link_edges:
                     if all(bmv.select for bmv in bme.verts):
-                        bme.select = True
+                        self._set_select(bme, True)
                 for bmf in elem.link_faces:
                     if all(bmv.select for bmv in bmf.verts):
-                        bmf.select = True
+                        self._set_select(bmf, True)
         self.dirty(selectionOnly=True)
 
+    ##########################################################
+    # quad topology cache
+    #
+    # results of the topology walks below (edge loops, quad strips) are
+    # cached per starting BMEdge.  an entry stays valid across target
+    # changes until the topology around it changes: the footprint of an
+    # entry (walked edges, their verts, and the faces around those verts)
+    # must still be valid, with same vert valences and face sizes.  walks
+    # that pick edges by direction (irregular verts) are not re-checked
+    # when verts only move.
+
+    def _topology_cache_get(self, kind, bme):
+        entry = self._topology_cache.get((kind, bme), None)
+        if entry is None: return None
+        version = self.get_version(selection=False)
+        if entry[0] != version:
+            _,_,bmes,bmvs,vsig,bmfs,fsig = entry
+            valid = (
+                all(e.is_valid for e in bmes) and
+                all(v.is_valid for v in bmvs) and
+                all(f.is_valid for f in bmfs) and
+                vsig == tuple((len(v.link_edges), len(v.link_faces)) for v in bmvs) and
+                fsig == tuple(len(f.verts) for f in bmfs)
+            )
+            if not valid:
+                del self._topology_cache[(kind, bme)]
+                return None
+            entry[0] = version
+        return entry[1]
+
+    def _topology_cache_set(self, kind, bme, value, bmes):
+        cache = self._topology_cache
+        if len(cache) >= self._topology_cache_limit:
+            cache = { k:e for (k,e) in cache.items() if k[1].is_valid }
+            self._topology_cache = cache
+            self._topology_cache_limit = max(1024, 2 * len(cache))
+        bmes = tuple(bmes) + (bme,)
+        bmvs = tuple({ bmv for bme_ in bmes for bmv in bme_.verts })
+        bmfs = tuple({ bmf for bmv in bmvs for bmf in bmv.link_faces })
+        cache[(kind, bme)] = [
+            self.get_version(selection=False), value,
+            bmes,
+            bmvs, tuple((len(v.link_edges), len(v.link_faces)) for v in bmvs),
+            bmfs, tuple(len(f.verts) for f in bmfs),
+        ]
+        return value
+
     def get_quadwalk_edgesequence(self, edge):
         bme = self._unwrap(edge)
+        edges = self._topology_cache_get('quadwalk', bme)
+        if edges is None:
+            edges = tuple(self._walk_quadwalk(bme))
+            self._topology_cache_set('quadwalk', bme, edges, edges)
+        return RFEdgeSequence(list(edges))
+
+    def _walk_quadwalk(self, bme):
         touched = set()
         edges = []
         def crawl(bme0, bmv01):
@@ -963,7 +1204,7 @@ class RFMesh():
             # did not loop back around, so go other direction
             edges.reverse()
             crawl(bme, bme.verts[1])
-        return RFEdgeSequence(edges)
+        return edges
 
     def _crawl_quadstrip_next(self, bme0, bmf0):
         bmes = set(bmf0.edges) - { bme for bmv in bme0.verts for bme in bmv.link_edges }
@@ -977,18 +1218,22 @@ class RFMesh():
         bmv10,bmv11 = bme1.verts
         return ((bmv01.co - bmv00.co).dot(bmv11.co - bmv10.co)) < 0
 
-    def _crawl_quadstrip_to_loopend(self, bme_start, bmf_start=None):
+    def _crawl_quadstrip_to_loopend(self, bme_start, bmf_start=None, path=False):
         '''
         returns tuple (bme, flipped, bmf, looped) where bme is
         1. at one end of a quad strip (looped == False), or
         2. bme is bme0 because quad strip is loop (looped == True)
         bmf is the next face going back (for retracing)
         flipped indicates if bme is revered wrt to bme_start
+        if path is True, list of crawled BMEdges (bme_start to bme) is appended
         '''
 
+        crawled = [bme_start]
+        ret = lambda *r: (r + (crawled,)) if path else r
+
         # choose one of the faces
         if not bmf_start: bmf_start = next(iter(bme_start.link_faces), None)
-        if not bmf_start: return (None, False, None, False)
+        if not bmf_start: return ret(None, False, None, False)
 
         bme0,bmf0,flipped = bme_start,bmf_start,False
         touched = set() # just in case!
@@ -1012,40 +1257,62 @@ class RFMesh():
             if not bme1:
                 # bmf0 is not None, but couldn't find bme1, means that we bmf0 is not a quad
                 bmf_prev = next(iter(set(bme0.link_faces) - { bmf0 }), None)
-                return (bme0, flipped, bmf_prev, False)
+                return ret(bme0, flipped, bmf_prev, False)
             if self._are_edges_flipped(bme0, bme1): flipped = not flipped
             if not bmf1:
                 # hit end of quad-strip
-                return (bme1, flipped, bmf0, False)
+                crawled.append(bme1)
+                return ret(bme1, flipped, bmf0, False)
             if bme1 == bme_start:
                 # looped back around
-                return (bme_start, False, bmf_start, True)
+                return ret(bme_start, False, bmf_start, True)
+            crawled.append(bme1)
             bme0,bmf0 = bme1,bmf1
         # somehow we wrapped back around!?
         assert False, "Unexpected topology"
 
+    def _get_quadstrip(self, bme):
+        '''
+        returns (cached) tuple (strip, path, looped), where strip is the
+        sequence of BMEdges as iter_quadstrip visits them, and path is the
+        sequence of BMEdges from bme to start of strip (for flipped)
+        '''
+        quadstrip = self._topology_cache_get('quadstrip', bme)
+        if quadstrip is None:
+            bme_end,_,bmf,looped,path = self._crawl_quadstrip_to_loopend(bme, path=True)
+            strip = []
+            if bme_end:
+                bme_cur,bme_start = bme_end,bme_end
+                while True:
+                    if bmf: bme_next,bmf_next = self._crawl_quadstrip_next(bme_cur, bmf)
+                    strip.append(bme_cur)
+                    if not bmf: break
+                    if not bme_next: break
+                    if bme_next == bme_start: break
+                    bme_cur,bmf = bme_next,bmf_next
+            quadstrip = (tuple(strip), tuple(path), looped)
+            self._topology_cache_set('quadstrip', bme, quadstrip, strip + path)
+        return quadstrip
+
     def is_quadstrip_looped(self, edge):
         edge = self._unwrap(edge)
-        _,_,_,looped = self._crawl_quadstrip_to_loopend(edge)
+        _,_,looped = self._get_quadstrip(edge)
         return looped
 
     def iter_quadstrip(self, edge):
-        # crawl around until either 1) loop back around, or 2) hit end
-        # then, go back the other direction
-        # note: the bmesh may change while crawling!
+        # strip is walked (or found in cache) before yielding anything, so
+        # the bmesh may change while iterating!
+        # flipped is computed as we go, from current vert positions
         edge = self._unwrap(edge)
-        bme,flipped,bmf,looped = self._crawl_quadstrip_to_loopend(edge)
-        if not bme: return
-        bme_start = bme
-        while True:
-            # find next bme and bmf, in case bmesh is edited!
-            if bmf: bme_next,bmf_next = self._crawl_quadstrip_next(bme, bmf)
+        strip,path,looped = self._get_quadstrip(edge)
+        if not strip: return
+        flipped = False
+        if not looped:
+            for bme0,bme1 in zip(path[:-1], path[1:]):
+                if self._are_edges_flipped(bme0, bme1): flipped = not flipped
+        for bme,bme_next in zip(strip, strip[1:] + (None,)):
             yield (self._wrap_bmedge(bme), flipped)
-            if not bmf: break
-            if not bme_next: break
-            if bme_next == bme_start: break
-            if self._are_edges_flipped(bme, bme_next): flipped = not flipped
-            bme,bmf = bme_next,bmf_next
+            if bme_next and self._are_edges_flipped(bme, bme_next): flipped = not flipped
 
     def get_face_loop(self, edge):
         is_looped = self.is_quadstrip_looped(edge)
@@ -1053,6 +1320,16 @@ class RFMesh():
         return (edges, is_looped)
 
     def get_edge_loop(self, edge):
+        bme = self._unwrap(edge)
+        eloop = self._topology_cache_get('edgeloop', bme)
+        if eloop is None:
+            edges,loop = self._walk_edge_loop(self._wrap_bmedge(bme))
+            bmes = tuple(self._unwrap(e) for e in edges)
+            eloop = self._topology_cache_set('edgeloop', bme, (bmes, loop), bmes)
+        bmes,loop = eloop
+        return ([self._wrap_bmedge(e) for e in bmes], loop)
+
+    def _walk_edge_loop(self, edge):
         touched = set()
         edges = [edge]
 
@@ -1098,14 +1375,22 @@ class RFMesh():
         return (edges, loop)
 
     def get_inner_edge_loop(self, edge):
-        # returns edge loop that follows the inside, boundary
         bme = self._unwrap(edge)
+        eloop = self._topology_cache_get('inneredgeloop', bme)
+        if eloop is None:
+            edges,loop = self._walk_inner_edge_loop(bme)
+            eloop = self._topology_cache_set('inneredgeloop', bme, (tuple(edges), loop), edges)
+        bmes,loop = eloop
+        return ([self._wrap_bmedge(e) for e in bmes], loop)
+
+    def _walk_inner_edge_loop(self, bme):
+        # returns edge loop (BMEdges) that follows the inside, boundary
         if len(bme.link_faces) != 1: return ([], False)
         touched = set()
         edges = []
         def crawl(bme0, bmv01):
             nonlocal edges
-            if bme0 not in touched: edges += [self._wrap_bmedge(bme0)]
+            if bme0 not in touched: edges += [bme0]
             if bmv01 in touched: return True
             touched.add(bmv01)
             touched.add(bme0)
@@ -1126,39 +1411,70 @@ class RFMesh():
         for bmv in self.bme.verts: bmv.select = True
         for bme in self.bme.edges: bme.select = True
         for bmf in self.bme.faces: bmf.select = True
+        self.selection_invalidate()
         self.dirty(selectionOnly=True)
 
     def select_toggle(self):
-        sel = False
-        sel |= any(bmv.select for bmv in self.bme.verts)
-        sel |= any(bme.select for bme in self.bme.edges)
-        sel |= any(bmf.select for bmf in self.bme.faces)
-        if sel: self.deselect_all()
-        else:   self.select_all()
+        if self.any_selected(): self.deselect_all()
+        else:                   self.select_all()
 
 
 class RFSource(RFMesh):
     '''
     RFSource is a source object for RetopoFlow.  Source objects
     are the high-resolution meshes being retopologized.
+
+    Sources are never edited, so rather than keeping a BMesh around, RFSource
+    holds a compact read-only representation in numpy arrays (float32 vertex
+    positions and normals, int32 triangles, triangle adjacency and normals).
+    The BVH and all plane crawling work directly on these arrays.
     '''
 
     __cache = {}
+    __pending = {}      # data name -> (hash, rfsource, future) still building on a worker
+
+    @staticmethod
+    def cache_is_valid(obj:bpy.types.Object, hashed=None):
+        ''' True if a cached (or currently building) RFSource matches obj '''
+        name = obj.data.name
+        hashed = hashed if hashed is not None else hash_object(obj)
+        if name in RFSource.__pending and RFSource.__pending[name][0] == hashed: return True
+        return name in RFSource.__cache and RFSource.__cache[name].hash == hashed
+
+    @staticmethod
+    def cache_invalidate(name):
+        ''' drops cached RFSource for mesh data name so its memory can be freed '''
+        RFSource.__cache.pop(name, None)
+
+    @staticmethod
+    def cache_names():
+        return set(RFSource.__cache.keys()) | set(RFSource.__pending.keys())
 
     @staticmethod
     @profiler.profile
     def new(obj:bpy.types.Object):
         assert type(obj) is bpy.types.Object and type(obj.data) is bpy.types.Mesh, 'obj must be mesh object'
 
+        # wait on source that is already building (ex: pre-warming)
+        name = obj.data.name
+        pending = RFSource.__pending.get(name, None)
+        if pending and pending[0] == hash_object(obj):
+            try:
+                pending[2].result()
+            except Exception as e:
+                print('ERROR: caught exception while waiting on pre-warmed source ' + str(e))
+                if RFSource.__pending.get(name, None) is pending: del RFSource.__pending[name]
+                RFSource.__cache.pop(name, None)
+
         # check cache
         rfsource = None
-        if obj.data.name in RFSource.__cache:
+        if name in RFSource.__cache:
             # does cache match current state?
-            rfsource = RFSource.__cache[obj.data.name]
+            rfsource = RFSource.__cache[name]
             hashed = hash_object(obj)
             #print(str(rfsource.hash))
             #print(str(hashed))
-            if rfsource.hash != hashed:
+            if rfsource.hash != hashed or not RFSource._validate_cached(obj, rfsource):
                 rfsource = None
         if not rfsource:
             # need to (re)generate RFSource object
@@ -1166,19 +1482,331 @@ class RFSource(RFMesh):
             rfsource = RFSource()
             del RFSource.creating
             rfsource.__setup__(obj)
-            RFSource.__cache[obj.data.name] = rfsource
+            RFSource.__cache[name] = rfsource
 
-        src = RFSource.__cache[obj.data.name]
+        src = RFSource.__cache[name]
 
         return src
 
+    @staticmethod
+    def _validate_cached(obj:bpy.types.Object, rfsource):
+        '''
+        pre-warmed sources are built without validating the mesh, because
+        validating can change user data and should only happen once RetopoFlow
+        starts.  validates obj now (main thread) and returns False if that
+        changed the mesh, so rfsource no longer matches it
+        '''
+        if rfsource.validated: return True
+        RFMesh._validate_mesh(obj, PhaseTimer('RFSource validate "%s"' % obj.name))
+        if hash_object(obj) != rfsource.hash: return False
+        rfsource.validated = True
+        return True
+
+    @staticmethod
+    @profiler.profile
+    def new_async(obj:bpy.types.Object, executor, validate=True):
+        '''
+        same as new(), but returns (rfsource, future), where rfsource is not
+        ready to use until future is done.  mesh data is extracted from
+        Blender here on the main thread (bpy is not thread-safe), while the
+        heavier work (adjacency, normals, bbox, BVH) is done on the executor.
+        pass validate=False to leave obj.data untouched (ex: pre-warming); the
+        mesh is then validated when the source is requested with validate=True
+        '''
+        assert type(obj) is bpy.types.Object and type(obj.data) is bpy.types.Mesh, 'obj must be mesh object'
+
+        name = obj.data.name
+        hashed = hash_object(obj)
+        pending = RFSource.__pending.get(name, None)
+        if pending and pending[0] == hashed:
+            if not validate or pending[1].validated: return (pending[1], pending[2])
+            if RFSource._validate_cached(obj, pending[1]): return (pending[1], pending[2])
+            hashed = hash_object(obj)
+        rfsource = RFSource.__cache.get(name, None)
+        if rfsource and rfsource.hash == hashed and (not validate or RFSource._validate_cached(obj, rfsource)):
+            future = Future()
+            future.set_result(rfsource)
+            return (rfsource, future)
+
+        RFSource.creating = True
+        rfsource = RFSource()
+        del RFSource.creating
+        arrays = rfsource._setup_extract(obj, validate=validate)
+        future = Future()
+        def build():
+            if not future.set_running_or_notify_cancel(): return
+            try:
+                rfsource._setup_build(arrays)
+                rfsource.get_bbox()
+                rfsource._build_bvh()
+                rfsource.setup_timer.mark('bvh')
+                RFSource.__cache[name] = rfsource
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(rfsource)
+            finally:
+                if RFSource.__pending.get(name, (None, None))[1] is rfsource:
+                    del RFSource.__pending[name]
+        # register as pending before submitting, so build cannot finish (and
+        # try to unregister) before it is registered
+        RFSource.__pending[name] = (rfsource.hash, rfsource, future)
+        executor.submit(build)
+        return (rfsource, future)
+
+    @staticmethod
+    def from_arrays(obj:bpy.types.Object, arrays):
+        '''
+        creates RFSource from data previously returned by to_arrays() (ex: when
+        loaded from disk), skipping mesh evaluation and triangulation
+        '''
+        RFSource.creating = True
+        rfsource = RFSource()
+        del RFSource.creating
+        rfsource.__setup__(obj, arrays=arrays)
+        RFSource.__cache[obj.data.name] = rfsource
+        return rfsource
+
     def __init__(self):
         assert hasattr(RFSource, 'creating'), 'Do not create new RFSource directly!  Use RFSource.new()'
 
-    def __setup__(self, obj:bpy.types.Object):
-        super().__setup__(obj, deform=True, triangulate=True, selection=False, keepeme=True)
+    @profiler.profile
+    def __setup__(self, obj:bpy.types.Object, arrays=None):
+        arrays = self._setup_extract(obj, arrays=arrays)
+        self._setup_build(arrays)
+
+    def _setup_extract(self, obj:bpy.types.Object, arrays=None, validate=True):
+        ''' reads everything needed from Blender.  must run on main thread '''
+        timer = PhaseTimer('RFSource setup "%s"' % obj.name)
+        if arrays is None and validate: self._validate_mesh(obj, timer)
+        self.validated = validate or arrays is not None
+
+        self.obj = obj
+        self.xform = XForm(self.obj.matrix_world)
+        self.hash = hash_object(self.obj)
+        self.bme = None
+        self.eme = None
         self.symmetry = set()
-        self.ensure_lookup_tables()
+        timer.mark('hash')
+
+        if arrays is None:
+            pr = profiler.start('evaluated mesh > arrays')
+            eme = self.obj.to_mesh(
+                scene=bpy.context.scene,
+                apply_modifiers=True,
+                settings='PREVIEW'
+            )
+            eme.update()
+            timer.mark('to_mesh')
+            nverts = len(eme.vertices)
+            verts = np.empty(nverts * 3, dtype=np.float32)
+            vnormals = np.empty(nverts * 3, dtype=np.float32)
+            eme.vertices.foreach_get('co', verts)
+            eme.vertices.foreach_get('normal', vnormals)
+            verts.shape = (nverts, 3)
+            vnormals.shape = (nverts, 3)
+            tris = self._get_triangles(eme).astype(np.int32)
+            bpy.data.meshes.remove(eme)
+            timer.mark('triangulate')
+            pr.done()
+            arrays = {'verts': verts, 'vnormals': vnormals, 'tris': tris}
+
+        self.store_state()
+        self.setup_timer = timer
+        return arrays
+
+    def _setup_build(self, arrays):
+        '''
+        builds derived data from arrays.  does not touch bpy, so can run on a
+        worker thread.  note: profiler must not be used here (not thread-safe)
+        '''
+        timer = self.setup_timer
+        self._set_arrays(arrays)
+        timer.mark('adjacency')
+
+        self.selection_center = Point((0, 0, 0))
+        self.dirty()
+        timer.mark('finishing')
+        dprint(str(timer))
+
+    def _set_arrays(self, arrays):
+        self.verts = arrays['verts']
+        self.vnormals = arrays['vnormals']
+        self.tris = arrays['tris']
+        nverts = len(self.verts)
+        if 'adjacency' in arrays:
+            self.adjacency = arrays['adjacency']
+            self.edges = arrays['edges']
+            self.tri_edges = arrays['tri_edges']
+            self.tri_normals = arrays['tri_normals']
+        else:
+            self.adjacency, self.edges, self.tri_edges = mesharrays.triangle_adjacency(self.tris, nverts)
+            self.tri_normals = mesharrays.triangle_normals(self.verts, self.tris)
+        self.side_verts = mesharrays.triangle_side_verts(self.tris)
+        dprint('%d verts, %d edges, %d triangles' % (nverts, len(self.edges), len(self.tris)))
+
+    def to_arrays(self):
+        ''' returns a dict of numpy arrays that fully describes this source (see from_arrays) '''
+        return {
+            'verts': self.verts,
+            'vnormals': self.vnormals,
+            'tris': self.tris,
+            'adjacency': self.adjacency,
+            'edges': self.edges,
+            'tri_edges': self.tri_edges,
+            'tri_normals': self.tri_normals,
+        }
+
+    def get_vertex_adjacency(self):
+        ''' lazily built, only needed when walking to a plane '''
+        if not hasattr(self, 'vert_adjacency'):
+            self.vert_adjacency = mesharrays.vertex_adjacency(len(self.verts), self.edges)
+            self.edge_tri = mesharrays.edge_triangles(self.tri_edges, len(self.edges))
+        return self.vert_adjacency
+
+    ##########################################################
+
+    def ensure_lookup_tables(self): pass
+    def deselect_all(self): pass
+
+    @profiler.profile
+    def get_bvh(self):
+        if not hasattr(self, 'bvh'): self._build_bvh()
+        return self.bvh
+
+    def _build_bvh(self):
+        self.bvh = BVHTree.FromPolygons(self.verts.tolist(), self.tris.tolist(), all_triangles=True)
+
+    def get_bbox(self):
+        if not hasattr(self, 'bbox'):
+            if len(self.verts):
+                self.bbox = BBox(from_coords=[self.verts.min(axis=0).tolist(), self.verts.max(axis=0).tolist()])
+            else:
+                self.bbox = BBox()
+        return self.bbox
+
+    @profiler.profile
+    def get_kdtree(self):
+        if not hasattr(self, 'kdt'):
+            self.kdt = KDTree(len(self.verts))
+            for i, co in enumerate(self.verts.tolist()):
+                self.kdt.insert(co, i)
+            self.kdt.balance()
+        return self.kdt
+
+    def get_geometry_counts(self):
+        return (len(self.verts), len(self.edges), len(self.tris))
+
+    def get_vert_count(self): return len(self.verts)
+    def get_edge_count(self): return len(self.edges)
+    def get_face_count(self): return len(self.tris)
+
+    ##########################################################
+
+    def _plane_local(self, plane:Plane):
+        plane_local = self.xform.w2l_plane(plane)
+        return (tuple(plane_local.o), tuple(plane_local.n))
+
+    def _crawl_to_world(self, ret):
+        l2w_point = self.xform.l2w_point
+        return [(f0,e,f1,l2w_point(Point(c))) for (f0,e,f1,c) in ret]
+
+    @profiler.profile
+    def plane_intersection(self, plane:Plane):
+        segs = self.plane_intersection_segments(plane).reshape(-1, 3).tolist()
+        return [(Point(p0), Point(p1)) for (p0, p1) in zip(segs[0::2], segs[1::2])]
+
+    def plane_intersection_segments(self, plane:Plane):
+        ''' same as plane_intersection, but returns (s,2,3) array of world-space segments '''
+        o,n = self._plane_local(plane)
+        segs,_ = mesharrays.plane_segments(self.verts, self.tris, o, n)
+        return self.xform.l2w_points(segs.reshape(-1, 3)).reshape(-1, 2, 3)
+
+    def get_stable_hash(self):
+        '''
+        returns hash_object as a hex string that is stable across Blender
+        sessions (hash(obj) is replaced with the mesh data name)
+        '''
+        if not hasattr(self, '_stable_hash'):
+            hasher = Hasher()
+            hasher.add(self.obj.data.name)
+            for i,h in enumerate(self.hash):
+                if i == 4: continue     # hash(obj) changes between sessions
+                hasher.add(h)
+            self._stable_hash = hasher.get_hash()
+        return self._stable_hash
+
+    @profiler.profile
+    def plane_intersection_crawl(self, ray:Ray, plane:Plane):
+        ray = self.xform.w2l_ray(ray)
+        _,_,i,_ = self.get_bvh().ray_cast(ray.o, ray.d, ray.max)
+        if i is None: return []
+        return self.plane_intersection_crawls([i], [plane])[0]
+
+    @profiler.profile
+    def plane_intersection_walk_crawl(self, ray:Ray, plane:Plane):
+        ray = self.xform.w2l_ray(ray)
+        _,_,i,_ = self.get_bvh().ray_cast(ray.o, ray.d, ray.max)
+        if i is None: return None
+        return self.plane_intersection_crawls([i], [plane], walk=True)[0]
+
+    @profiler.profile
+    def plane_intersection_crawls(self, tris, planes, walk=False):
+        '''
+        batched plane_intersection_crawl / plane_intersection_walk_crawl,
+        starting from triangle indices (ex: from raycast_batch) rather than rays.
+        vertex distances for all planes are computed in one pass, and each crawl
+        walks the precomputed triangle adjacency.
+        returns list of crawls ([] if crawl fails, or None if walk fails)
+        '''
+        local = [self._plane_local(plane) for plane in planes]
+        os_ = np.array([o for (o,_) in local], dtype=np.float64).reshape(-1, 3)
+        ns_ = np.array([n for (_,n) in local], dtype=np.float64).reshape(-1, 3)
+        dists = np.dot(self.verts, ns_.T) - np.einsum('ij,ij->i', os_, ns_)[None,:]
+        if walk: offsets,neighbors,neighbor_edges = self.get_vertex_adjacency()
+        cuts = []
+        for idx,(i,(o,n)) in enumerate(zip(tris, local)):
+            if walk:
+                i = mesharrays.walk_to_plane(self.verts, self.tris, offsets, neighbors, neighbor_edges, self.edge_tri, i, o, n, dists=dists[:,idx])
+            cuts.append((i, o, n))
+        rets = mesharrays.plane_crawls(
+            self.verts, self.tris, self.adjacency, self.tri_edges, self.side_verts,
+            [cut for cut in cuts if cut[0] is not None],
+            dists=dists[:,[idx for (idx,cut) in enumerate(cuts) if cut[0] is not None]],
+        )
+        rets = iter(rets)
+        return [
+            (None if walk else []) if i is None else self._crawl_to_world(next(rets))
+            for (i,_,_) in cuts
+        ]
+
+    @profiler.profile
+    def plane_intersections_crawl(self, plane:Plane):
+        o,n = self._plane_local(plane)
+        sliced = mesharrays.plane_segments(self.verts, self.tris, o, n, tri_edges=self.tri_edges, nedges=len(self.edges))
+        return self._slices_to_crawls(*sliced)
+
+    def _slices_to_crawls(self, segs, seg_tris, seg_keys):
+        ''' converts stitched slices into the crawl format of plane_intersection_crawl '''
+        nedges = len(self.edges)
+        seg_tris = seg_tris.tolist()
+        crawls = []
+        for (seg_order, closed) in mesharrays.stitch_segments(seg_keys):
+            pts = mesharrays.polyline_points(segs, seg_order, closed).tolist()
+            tris = [seg_tris[i] for (i, _) in seg_order]
+            keys = [int(seg_keys[i, 1 if flipped else 0]) for (i, flipped) in seg_order]
+            if not closed:
+                i, flipped = seg_order[-1]
+                keys.append(int(seg_keys[i, 0 if flipped else 1]))
+                tris_prev, tris_next = [None] + tris, tris + [None]
+            else:
+                tris_prev, tris_next = tris[-1:] + tris[:-1], tris
+            crawl = [
+                (t0, (k if k < nedges else None), t1, c)
+                for (t0, k, t1, c) in zip(tris_prev, keys, tris_next, pts)
+            ]
+            crawls.append(self._crawl_to_world(crawl))
+        return crawls
 
 
 
@@ -1246,6 +1874,8 @@ class RFTarget(RFMesh):
             self.displace_mod.show_render = False
             self.displace_mod.show_viewport = False
         self.editmesh_version = None
+        self.editmesh_time = 0
+        self._selection = None
         self.xy_symmetry_accel = xy_symmetry_accel
         self.xz_symmetry_accel = xz_symmetry_accel
         self.yz_symmetry_accel = yz_symmetry_accel
@@ -1256,6 +1886,96 @@ class RFTarget(RFMesh):
         self.xz_symmetry_accel = xz_symmetry_accel
         self.yz_symmetry_accel = yz_symmetry_accel
 
+    ##########################################################
+    # selection index
+    #
+    # sets of selected BMVerts, BMEdges, and BMFaces, kept up to date by
+    # select(), deselect(), and RFVert/RFEdge/RFFace.select, so that selection
+    # queries cost O(selected) rather than a scan over the whole target.
+    # operations that can change selection in other ways (dissolve, merge,
+    # split, ...) call selection_invalidate(), and the index is rebuilt with a
+    # single scan on the next query.  undo restores a copy with no index.
+
+    def selection_invalidate(self):
+        self._selection = None
+        BMElemWrapper.mark_stale()
+
+    def _selection_index(self):
+        if self._selection is None:
+            self._selection = {
+                BMVert: {bmv for bmv in self.bme.verts if bmv.select},
+                BMEdge: {bme for bme in self.bme.edges if bme.select},
+                BMFace: {bmf for bmf in self.bme.faces if bmf.select},
+            }
+        return self._selection
+
+    def _selection_track(self, bmelem, select):
+        if self._selection is None: return
+        sel = self._selection
+        t = type(bmelem)
+        if bmelem.select: sel[t].add(bmelem)
+        else: sel[t].discard(bmelem)
+        if t is BMVert: return
+        # BMesh flushes selection of an edge or face to its verts (and edges),
+        # both when selecting and deselecting, so read back their flags
+        subs = list(bmelem.verts) if t is BMEdge else list(bmelem.verts) + list(bmelem.edges)
+        for sub in subs:
+            if sub.select: sel[type(sub)].add(sub)
+            else: sel[type(sub)].discard(sub)
+
+    def selection_index_matches(self):
+        '''
+        debug check: True if selection index agrees with a full scan of the
+        BMesh selection flags (index is rebuilt if it was invalidated)
+        '''
+        sel = self._selection_index()
+        return all(
+            {e for e in sel[t] if e.is_valid} == {e for e in elems if e.select}
+            for (t, elems) in [(BMVert, self.bme.verts), (BMEdge, self.bme.edges), (BMFace, self.bme.faces)]
+        )
+
+    def _selection_prune(self):
+        ''' drops removed elements from index '''
+        BMElemWrapper.mark_stale()
+        if self._selection is None: return
+        for sel in self._selection.values():
+            sel.difference_update([e for e in sel if not e.is_valid])
+
+    def get_selected_verts(self):
+        return {self._wrap_bmvert(bmv) for bmv in self._selection_index()[BMVert] if bmv.is_valid}
+    def get_selected_edges(self):
+        return {self._wrap_bmedge(bme) for bme in self._selection_index()[BMEdge] if bme.is_valid}
+    def get_selected_faces(self):
+        return {self._wrap_bmface(bmf) for bmf in self._selection_index()[BMFace] if bmf.is_valid}
+
+    def get_selection_counts(self):
+        self._selection_prune()
+        sel = self._selection_index()
+        return (len(sel[BMVert]), len(sel[BMEdge]), len(sel[BMFace]))
+
+    def any_verts_selected(self):
+        return any(bmv.is_valid for bmv in self._selection_index()[BMVert])
+    def any_edges_selected(self):
+        return any(bme.is_valid for bme in self._selection_index()[BMEdge])
+    def any_faces_selected(self):
+        return any(bmf.is_valid for bmf in self._selection_index()[BMFace])
+
+    def get_selection_center(self):
+        v,c = Vector(),0
+        for bmv in self._selection_index()[BMVert]:
+            if not bmv.is_valid: continue
+            v += bmv.co
+            c += 1
+        if c: self.selection_center = v / c
+        return self.xform.l2w_point(self.selection_center)
+
+    def deselect_all(self):
+        for sel in self._selection_index().values():
+            for bmelem in sel:
+                if bmelem.is_valid: bmelem.select = False
+            sel.clear()
+        self.dirty(selectionOnly=True)
+
     def get_point_symmetry(self, point, from_world=True):
         if from_world: point = self.xform.w2l_point(point)
         px,py,pz = point
@@ -1307,6 +2027,29 @@ class RFTarget(RFMesh):
         if to_world: point = self.xform.l2w_point(point)
         return point
 
+    def symmetry_real_points(self, points):
+        '''
+        batched symmetry_real on an (n,3) array of local points.  only points
+        near an enabled symmetry plane need the (per point) clamping; the
+        rest are passed through.  nan rows are ignored.
+        '''
+        if not self.symmetry: return points
+        threshold = self.symmetry_threshold * self.unit_scaling_factor / 2.0
+        near = np.zeros(len(points), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            if 'x' in self.symmetry: near |= points[:,0] <= threshold
+            if 'y' in self.symmetry: near |= points[:,1] >= threshold
+            if 'z' in self.symmetry: near |= points[:,2] <= threshold
+        idx = np.nonzero(near)[0]
+        if not len(idx): return points
+        points = np.array(points)
+        symmetry_real = self.symmetry_real
+        points[idx] = [
+            tuple(symmetry_real(Point(p), from_world=False, to_world=False))
+            for p in points[idx].tolist()
+        ]
+        return points
+
     def __deepcopy__(self, memo):
         '''
         custom deepcopy method, because BMesh and BVHTree are not copyable
@@ -1344,15 +2087,28 @@ class RFTarget(RFMesh):
 
     def clean(self):
         super().clean()
+        BMElemWrapper.prune()
+        if self.editmesh_version == self.get_version(): return
+        policy = options['target write-back']
+        if policy == 'deferred': return
+        if policy == 'throttled':
+            hz = max(0.1, options['target write-back hz'])
+            if time.time() - self.editmesh_time < 1.0 / hz: return
+        self.write_back()
+
+    @profiler.profile
+    def write_back(self):
+        '''
+        writes BMesh (with selection) and modifier settings to target object.
+        no-op if object is already in sync.  clean() calls this according to
+        the 'target write-back' policy; RFContext forces it on commit, save,
+        and undo push, and when an interactive operation finishes.
+        '''
         if self.editmesh_version == self.get_version(): return
         self.editmesh_version = self.get_version()
+        self.editmesh_time = time.time()
         self.bme.to_mesh(self.obj.data)
-        for bmv,emv in zip(self.bme.verts, self.obj.data.vertices):
-            emv.select = bmv.select
-        for bme,eme in zip(self.bme.edges, self.obj.data.edges):
-            eme.select = bme.select
-        for bmf,emf in zip(self.bme.faces, self.obj.data.polygons):
-            emf.select = bmf.select
+        self._write_back_selection()
         self.mirror_mod.use_x = 'x' in self.symmetry
         self.mirror_mod.use_y = 'y' in self.symmetry
         self.mirror_mod.use_z = 'z' in self.symmetry
@@ -1361,6 +2117,21 @@ class RFTarget(RFMesh):
         self.mirror_mod.merge_threshold = self.symmetry_threshold
         self.displace_mod.strength = self.displace_strength
 
+    def _write_back_selection(self):
+        '''
+        bulk writes selection flags to target mesh with foreach_set.  flags
+        are read from BMesh itself (not the selection index), so mesh always
+        matches what to_mesh() wrote.
+        '''
+        me = self.obj.data
+        for bmelems,meelems in [
+                (self.bme.verts, me.vertices),
+                (self.bme.edges, me.edges),
+                (self.bme.faces, me.polygons),
+                ]:
+            flags = np.fromiter((bmelem.select for bmelem in bmelems), dtype=bool, count=len(bmelems))
+            meelems.foreach_set('select', flags)
+
     def enable_symmetry(self, axis): self.symmetry.add(axis)
     def disable_symmetry(self, axis): self.symmetry.discard(axis)
     def has_symmetry(self, axis): return axis in self.symmetry
@@ -1383,6 +2154,65 @@ class RFTarget(RFMesh):
         self.update_face_normal(bmf)
         return self._wrap_bmface(bmf)
 
+    @profiler.profile
+    def new_geometry(self, cos, norms, faces, verts=None):
+        '''
+        bulk creation of verts and faces (tris, quads, ngons), rather than
+        calling new_vert and new_face for each.  cos and norms are the world
+        space positions and normals of the new verts; rows with nan positions
+        are not created.  faces are tuples of indices into verts (existing
+        RFVerts) followed by the new verts, so index len(verts)+i refers to
+        new vert i.  each edge is created once (existing edges are reused),
+        faces that use a missing vert or that already exist are skipped, and
+        face normals are updated in a single pass at the end.
+        returns (new RFVerts (None if not created), new RFFaces)
+        '''
+        bme = self.bme
+        bmvs = [self._unwrap(v) for v in (verts or [])]
+
+        cos = np.asarray(cos, dtype=np.float64).reshape(-1, 3)
+        norms = np.asarray(norms, dtype=np.float64).reshape(-1, 3)
+        nbmvs = [None] * len(cos)
+        idx = np.nonzero(np.all(np.isfinite(cos), axis=1))[0]
+        if len(idx):
+            p_l = self.symmetry_real_points(self.xform.w2l_points(cos[idx]))
+            n_l = self.xform.w2l_normals(norms[idx])
+            new_vert = bme.verts.new
+            for i,co,norm in zip(idx.tolist(), p_l.tolist(), n_l.tolist()):
+                bmv = new_vert(co)
+                bmv.normal = norm
+                nbmvs[i] = bmv
+        bmvs += nbmvs
+
+        # create each unique edge once, keyed by its (sorted) vert indices
+        edges = {}
+        get_edge,new_edge = bme.edges.get,bme.edges.new
+        get_face,new_face = bme.faces.get,bme.faces.new
+        nbmfs = []
+        for face in faces:
+            if len(set(face)) < 3: continue
+            fbmvs = [bmvs[i] for i in face]
+            if any(bmv is None for bmv in fbmvs): continue
+            for i0,i1 in iter_pairs(face, True):
+                key = (i0,i1) if i0 < i1 else (i1,i0)
+                if key in edges: continue
+                pair = (bmvs[i0], bmvs[i1])
+                edges[key] = get_edge(pair) or new_edge(pair)
+            if get_face(fbmvs): continue
+            nbmfs.append(new_face(fbmvs))
+
+        # orient and update normals of new faces (see update_face_normal)
+        for bmf in nbmfs:
+            n = compute_normal(v.co for v in bmf.verts)
+            vnorm = sum((v.normal for v in bmf.verts), Vector())
+            if n.dot(vnorm) < 0: bmf.normal_flip()
+            bmf.normal_update()
+
+        return (
+            [self._wrap_bmvert(bmv) if bmv else None for bmv in nbmvs],
+            [self._wrap_bmface(bmf) for bmf in nbmfs],
+        )
+
     def holes_fill(self, edges, sides):
         edges = list(map(self._unwrap, edges))
         ret = holes_fill(self.bme, edges=edges, sides=sides)
@@ -1390,18 +2220,19 @@ class RFTarget(RFMesh):
 
     def delete_selection(self, del_empty_edges=True, del_empty_verts=True, del_verts=True, del_edges=True, del_faces=True):
         if del_faces:
-            faces = set(f for f in self.bme.faces if f.select)
+            faces = set(f for f in self._selection_index()[BMFace] if f.is_valid)
             self.delete_faces(faces, del_empty_edges=del_empty_edges, del_empty_verts=del_empty_verts)
         if del_edges:
-            edges = set(e for e in self.bme.edges if e.select)
+            edges = set(e for e in self._selection_index()[BMEdge] if e.is_valid)
             self.delete_edges(edges, del_empty_verts=del_empty_verts)
         if del_verts:
-            verts = set(v for v in self.bme.verts if v.select)
+            verts = set(v for v in self._selection_index()[BMVert] if v.is_valid)
             self.delete_verts(verts)
 
 
     def delete_verts(self, verts):
         for bmv in map(self._unwrap, verts): self.bme.verts.remove(bmv)
+        self._selection_prune()
 
     def delete_edges(self, edges, del_empty_verts=True):
         edges = set(self._unwrap(e) for e in edges)
@@ -1410,6 +2241,7 @@ class RFTarget(RFMesh):
         if del_empty_verts:
             for bmv in verts:
                 if len(bmv.link_edges) == 0: self.bme.verts.remove(bmv)
+        self._selection_prune()
 
     def delete_faces(self, faces, del_empty_edges=True, del_empty_verts=True):
         faces = set(self._unwrap(f) for f in faces)
@@ -1422,18 +2254,22 @@ class RFTarget(RFMesh):
         if del_empty_verts:
             for bmv in verts:
                 if len(bmv.link_faces) == 0: self.bme.verts.remove(bmv)
+        self._selection_prune()
 
     def dissolve_verts(self, verts, use_face_split=False, use_boundary_tear=False):
         verts = list(map(self._unwrap, verts))
         dissolve_verts(self.bme, verts=verts, use_face_split=use_face_split, use_boundary_tear=use_boundary_tear)
+        self.selection_invalidate()
 
     def dissolve_edges(self, edges, use_verts=False, use_face_split=False):
         edges = list(map(self._unwrap, edges))
         dissolve_edges(self.bme, edges=edges, use_verts=use_verts, use_face_split=use_face_split)
+        self.selection_invalidate()
 
     def dissolve_faces(self, faces, use_verts=False):
         faces = list(map(self._unwrap, faces))
         dissolve_faces(self.bme, faces=faces, use_verts=use_verts)
+        self.selection_invalidate()
 
     def update_verts_faces(self, verts):
         faces = set(f for v in verts for f in self._unwrap(v).link_faces)
@@ -1452,22 +2288,51 @@ class RFTarget(RFMesh):
             bmf.normal_flip()
         bmf.normal_update()
 
+    ###########################################################
+    # duplicate cleanup
+    #
+    # duplicates are found with hash maps keyed by the set of verts of each
+    # edge/face, so finding them is linear in the number of elements
+    # inspected.  the "dirty region" is a collection of verts: only edges and
+    # faces linked to those verts are inspected, so cleaning up after an
+    # operation does not need to visit the whole mesh.
+    # note: keys use the BMVerts themselves rather than vert indices, because
+    # indices are not kept up to date while editing.
+
+    def _region_bmverts(self, verts):
+        if verts is None: return list(self.bme.verts)
+        bmvs = [self._unwrap(v) for v in verts]
+        return [bmv for bmv in bmvs if bmv.is_valid]
+
+    def _find_duplicates(self, bmvs, link):
+        ''' returns list of (kept, duplicate) pairs of elements linked (link_edges or link_faces) to bmvs '''
+        keys,seen,dups = {},set(),[]
+        for bmv in bmvs:
+            for bmelem in getattr(bmv, link):
+                if bmelem in seen: continue
+                seen.add(bmelem)
+                key = frozenset(bmelem.verts)
+                bmelem0 = keys.get(key, None)
+                if bmelem0 is None: keys[key] = bmelem
+                else: dups.append((bmelem0, bmelem))
+        return dups
+
     def clean_duplicate_bmedges(self, vert):
-        bmv = self._unwrap(vert)
-        # search for two edges between the same pair of verts
-        lbme = list(bmv.link_edges)
-        lbme_dup = []
-        for i0,bme0 in enumerate(lbme):
-            for i1,bme1 in enumerate(lbme):
-                if i1 <= i0: continue
-                if bme0.other_vert(bmv) == bme1.other_vert(bmv):
-                    lbme_dup += [(bme0,bme1)]
+        return self.clean_duplicate_bmedges_region([vert])
+
+    def clean_duplicate_bmedges_region(self, verts=None):
+        '''
+        merges edges that connect same pair of verts.  returns mapping of
+        faces that needed to be recreated (old RFFace -> new RFFace)
+        '''
+        lbme_dup = self._find_duplicates(self._region_bmverts(verts), 'link_edges')
         mapping = {}
         for bme0,bme1 in lbme_dup:
-            #if not bme0.is_valid or bme1.is_valid: continue
+            if not bme0.is_valid or not bme1.is_valid: continue
             l0,l1 = len(bme0.link_faces), len(bme1.link_faces)
             bme0.select |= bme1.select
             bme1.select |= bme0.select
+            self.selection_invalidate()
             handled = False
             if l0 == 0:
                 self.bme.edges.remove(bme0)
@@ -1491,24 +2356,26 @@ class RFTarget(RFMesh):
         return mapping
 
     def remove_duplicate_bmfaces(self, vert):
-        bmv = self._unwrap(vert)
-        mapping = {}
-        check = True
-        while check:
-            check = False
-            bmfs = list(bmv.link_faces)
-            for i0,bmf0 in enumerate(bmfs):
-                for i1,bmf1 in enumerate(bmfs):
-                    if i1 <= i0: continue
-                    if set(bmf0.verts) ^ set(bmf1.verts): continue
-                    # bmf0 and bmf1 have exactly the same verts! delete one!
-                    mapping[bmf1] = bmf0
-                    self.delete_faces([bmf1])
-                    check = True
-                    break
-                if check: break
+        return self.remove_duplicate_bmfaces_region([vert])
+
+    def remove_duplicate_bmfaces_region(self, verts=None):
+        ''' deletes faces that have exactly the same verts as another face.  returns mapping (deleted -> kept) '''
+        dups = self._find_duplicates(self._region_bmverts(verts), 'link_faces')
+        if not dups: return {}
+        mapping = {bmf1:bmf0 for (bmf0,bmf1) in dups}
+        self.delete_faces(list(mapping.keys()))
         return mapping
 
+    def clean_duplicates(self, verts=None):
+        '''
+        removes duplicate faces then merges duplicate edges that are linked to
+        verts (dirty region), or in whole mesh if verts is None.
+        returns (face mapping, edge mapping); see above
+        '''
+        fmapping = self.remove_duplicate_bmfaces_region(verts)
+        emapping = self.clean_duplicate_bmedges_region(verts)
+        return (fmapping, emapping)
+
     def snap_all_verts(self, nearest):
         for v in self.get_verts():
             xyz,norm,_,_ = nearest(v.co)
@@ -1516,9 +2383,35 @@ class RFTarget(RFMesh):
             v.normal = norm
         self.dirty()
 
+    def set_cos(self, verts, points, normals=None, snap=None, symmetry=True):
+        '''
+        batched version of setting RFVert.co (and RFVert.normal), marking
+        target dirty once.  points and normals are world space (lists of
+        Point or (n,3) arrays).  rows with nan points are skipped, so misses
+        from batched raycasts leave their verts in place.  snap is an optional
+        batched nearest function (see RFContext.nearest_sources_Points) that
+        moves points onto the sources and provides the normals.  symmetry
+        clamps points to symmetry planes, like RFVert.co does.
+        '''
+        bmvs = [self._unwrap(v) for v in verts]
+        if not bmvs: return
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if snap: points,normals,_,_ = snap(points)
+        idx = np.nonzero(np.all(np.isfinite(points), axis=1))[0]
+        if not len(idx): return
+        p_l = self.xform.w2l_points(points[idx])
+        if symmetry: p_l = self.symmetry_real_points(p_l)
+        for i,co in zip(idx.tolist(), p_l.tolist()):
+            bmvs[i].co = co
+        if normals is not None:
+            normals = np.asarray(normals, dtype=np.float64).reshape(-1, 3)[idx]
+            n_l = self.xform.w2l_normals(normals)
+            for i,norm,ok in zip(idx.tolist(), n_l.tolist(), np.all(np.isfinite(normals), axis=1).tolist()):
+                if ok: bmvs[i].normal = norm
+        self.dirty()
+
     def snap_selected_verts(self, nearest):
-        for v in self.get_verts():
-            if not v.select: continue
+        for v in self.get_selected_verts():
             xyz,norm,_,_ = nearest(v.co)
             v.co = xyz
             v.normal = norm
@@ -1526,9 +2419,11 @@ class RFTarget(RFMesh):
 
     def remove_all_doubles(self, dist):
         remove_doubles(self.bme, verts=self.bme.verts, dist=dist)
+        self.selection_invalidate()
         self.dirty()
 
     def remove_selected_doubles(self, dist):
-        remove_doubles(self.bme, verts=[bmv for bmv in self.bme.verts if bmv.select], dist=dist)
+        remove_doubles(self.bme, verts=[bmv for bmv in self._selection_index()[BMVert] if bmv.is_valid], dist=dist)
+        self.selection_invalidate()
         self.dirty()
 
@@ -29,6 +29,8 @@ import random
 from queue import Queue
 from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
+
 import bpy
 import bgl
 import bmesh
@@ -105,7 +107,7 @@ class RFMeshRender():
     @profiler.profile
     def new(rfmesh, opts, always_dirty=False):
         ho = hash_object(rfmesh.obj)
-        hb = hash_bmesh(rfmesh.bme)
+        hb = hash_bmesh(rfmesh.bme) if rfmesh.bme is not None else None
         h = (ho, hb)
         if h not in RFMeshRender.cache:
             RFMeshRender.creating = True
@@ -195,7 +197,30 @@ class RFMeshRender():
                 # selection will bleed
                 pr = prstart('gathering')
 
-                if self.load_faces:
+                def push(gltype, data):
+                    if self.async_load:
+                        self.buf_data_queue.put((gltype, data))
+                    else:
+                        self.add_buffered_render(gltype, data)
+
+                if self.bmesh is None:
+                    # array-only mesh (RFSource), so gather straight from
+                    # numpy arrays.  nothing is selected
+                    vcos, vnos = self.rfmesh.verts, self.rfmesh.vnormals
+                    def gather_indices(gltype, indices, count):
+                        for i0 in range(0, len(indices), count):
+                            idx = indices[i0:i0 + count].reshape(-1)
+                            push(gltype, {
+                                'vco': vcos[idx].tolist(),
+                                'vno': vnos[idx].tolist(),
+                                'sel': [0.0] * len(idx),
+                                'idx': None,
+                            })
+                    if self.load_faces: gather_indices(bgl.GL_TRIANGLES, self.rfmesh.tris, face_count)
+                    if self.load_edges: gather_indices(bgl.GL_LINES, self.rfmesh.edges, edge_count)
+                    if self.load_verts: gather_indices(bgl.GL_POINTS, np.arange(len(vcos)), vert_count)
+
+                if self.bmesh is not None and self.load_faces:
                     tri_faces = [(bmf, list(bmvs))
                                  for bmf in self.bmesh.faces
                                  for bmvs in triangulateFace(bmf.verts)
@@ -221,12 +246,9 @@ class RFMeshRender():
                             ],
                             'idx': None,  # list(range(len(tri_faces)*3)),
                         }
-                        if self.async_load:
-                            self.buf_data_queue.put((bgl.GL_TRIANGLES, face_data))
-                        else:
-                            self.add_buffered_render(bgl.GL_TRIANGLES, face_data)
+                        push(bgl.GL_TRIANGLES, face_data)
 
-                if self.load_edges:
+                if self.bmesh is not None and self.load_edges:
                     edges = self.bmesh.edges
                     l = len(edges)
                     for i0 in range(0, l, edge_count):
@@ -249,12 +271,9 @@ class RFMeshRender():
                             ],
                             'idx': None,  # list(range(len(self.bmesh.edges)*2)),
                         }
-                        if self.async_load:
-                            self.buf_data_queue.put((bgl.GL_LINES, edge_data))
-                        else:
-                            self.add_buffered_render(bgl.GL_LINES, edge_data)
+                        push(bgl.GL_LINES, edge_data)
 
-                if self.load_verts:
+                if self.bmesh is not None and self.load_verts:
                     verts = self.bmesh.verts
                     l = len(verts)
                     for i0 in range(0, l, vert_count):
@@ -265,10 +284,7 @@ class RFMeshRender():
                             'sel': [sel(bmv) for bmv in verts[i0:i1]],
                             'idx': None,  # list(range(len(self.bmesh.verts))),
                         }
-                        if self.async_load:
-                            self.buf_data_queue.put((bgl.GL_POINTS, vert_data))
-                        else:
-                            self.add_buffered_render(bgl.GL_POINTS, vert_data)
+                        push(bgl.GL_POINTS, vert_data)
 
                 if self.async_load:
                     self.buf_data_queue.put('done')
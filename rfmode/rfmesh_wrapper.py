@@ -56,11 +56,25 @@ user-writable properties:
     BMFace: material_index, normal, smooth
     common: hide, index. select, tag
 
-NOTE: RFVert, RFEdge, RFFace do NOT mark RFMesh as dirty!
+NOTE: RFVert, RFEdge, RFFace do NOT mark RFMesh as dirty!  They do keep the
+RFTarget selection index up to date, though.
+
+Wrappers are interned: wrapping the same BMesh element returns the same
+wrapper object, so walking topology (link_edges, verts, other_vert, ...)
+does not allocate a new wrapper for every element touched.  Wrappers hold
+no state other than the wrapped element, which makes sharing them safe.
+BMesh elements cannot be weakly referenced, so the cache holds them; it is
+cleared when rewrapping (new BMesh) and pruned of removed elements after
+RFTarget marks it stale.
 '''
 
 
 class BMElemWrapper:
+    __slots__ = ('bmelem',)
+
+    interned = {}           # BMesh element -> wrapper
+    interned_stale = False  # True if elements might have been removed since last prune
+
     @staticmethod
     def wrap(rftarget):
         BMElemWrapper.rftarget = rftarget
@@ -70,6 +84,23 @@ class BMElemWrapper:
         BMElemWrapper.l2w_normal = rftarget.xform.l2w_normal
         BMElemWrapper.w2l_normal = rftarget.xform.w2l_normal
         BMElemWrapper.symmetry_real = rftarget.symmetry_real
+        BMElemWrapper.interned = {}
+        BMElemWrapper.interned_stale = False
+
+    @staticmethod
+    def mark_stale():
+        BMElemWrapper.interned_stale = True
+
+    @staticmethod
+    def prune():
+        ''' drops wrappers of removed elements (only if marked stale) '''
+        if not BMElemWrapper.interned_stale: return
+        BMElemWrapper.interned = {
+            bmelem:wrapper
+            for (bmelem,wrapper) in BMElemWrapper.interned.items()
+            if bmelem.is_valid
+        }
+        BMElemWrapper.interned_stale = False
 
     @staticmethod
     def _unwrap(bmelem):
@@ -79,8 +110,17 @@ class BMElemWrapper:
             return bmelem.bmelem
         return bmelem
 
+    def __new__(cls, bmelem):
+        wrapper = BMElemWrapper.interned.get(bmelem, None)
+        if wrapper is None:
+            wrapper = object.__new__(cls)
+            wrapper.bmelem = bmelem
+            BMElemWrapper.interned[bmelem] = wrapper
+        return wrapper
+
     def __init__(self, bmelem):
-        self.bmelem = bmelem
+        # bmelem is set in __new__, as wrapper might be interned
+        pass
 
     def __repr__(self):
         return '<BMElemWrapper: %s>' % repr(self.bmelem)
@@ -121,6 +161,7 @@ class BMElemWrapper:
     @select.setter
     def select(self, v):
         self.bmelem.select = v
+        self.rftarget._selection_track(self.bmelem, v)
 
     @property
     def tag(self):
@@ -131,12 +172,12 @@ class BMElemWrapper:
         self.bmelem.tag = v
 
     def __getattr__(self, k):
-        if k in self.__dict__:
-            return getattr(self, k)
         return getattr(self.bmelem, k)
 
 
 class RFVert(BMElemWrapper):
+    __slots__ = ()
+
     def __repr__(self):
         return '<RFVert: %s>' % repr(self.bmelem)
 
@@ -192,10 +233,12 @@ class RFVert(BMElemWrapper):
         bmv0 = BMElemWrapper._unwrap(self)
         bmv1 = BMElemWrapper._unwrap(other)
         vert_splice(bmv1, bmv0)
+        self.rftarget.selection_invalidate()
 
     def dissolve(self):
         bmv = BMElemWrapper._unwrap(self)
         vert_dissolve(bmv)
+        self.rftarget.selection_invalidate()
 
     def compute_normal(self):
         ''' computes normal as average of normals of all linked faces '''
@@ -203,6 +246,8 @@ class RFVert(BMElemWrapper):
 
 
 class RFEdge(BMElemWrapper):
+    __slots__ = ()
+
     def __repr__(self):
         return '<RFEdge: %s>' % repr(self.bmelem)
 
@@ -407,6 +452,7 @@ class RFEdge(BMElemWrapper):
         bme = BMElemWrapper._unwrap(self)
         bmv = BMElemWrapper._unwrap(vert) or bme.verts[0]
         bme_new, bmv_new = edge_split(bme, bmv, fac)
+        self.rftarget.selection_invalidate()
         return RFEdge(bme_new), RFVert(bmv_new)
 
     def collapse(self):
@@ -416,10 +462,13 @@ class RFEdge(BMElemWrapper):
         for bmf in del_faces:
             self.rftarget.bme.faces.remove(bmf)
         bmesh.ops.collapse(self.rftarget.bme, edges=[bme], uvs=True)
+        self.rftarget.selection_invalidate()
         return bmv0 if bmv0.is_valid else bmv1
 
 
 class RFFace(BMElemWrapper):
+    __slots__ = ()
+
     def __repr__(self):
         return '<RFFace: %s>' % repr(self.bmelem)
 
@@ -603,6 +652,7 @@ class RFFace(BMElemWrapper):
                 pass
             else:
                 vert_splice(verts1[i1], verts0[i0])
+        self.rftarget.selection_invalidate()
         # for v in verts0:
         #    self.rftarget.clean_duplicate_bmedges(v)
 
@@ -613,6 +663,7 @@ class RFFace(BMElemWrapper):
         bmva = BMElemWrapper._unwrap(vert_a)
         bmvb = BMElemWrapper._unwrap(vert_b)
         bmf_new, bml_new = face_split(bmf, bmva, bmvb)
+        self.rftarget.selection_invalidate()
         return RFFace(bmf_new)
 
 
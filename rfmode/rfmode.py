@@ -363,7 +363,7 @@ class RFMode(Operator):
         # hide meshes so we can render internally
         self.rfctx.rftarget.obj_hide()
         self.rfctx.rftarget.obj_unhide_render()
-        for rfsource in self.rfctx.rfsources:
+        for rfsource in self.rfctx.rfsources_all:
             rfsource.obj_set_select(False)
             rfsource.obj_unhide_render()
 
@@ -384,11 +384,13 @@ class RFMode(Operator):
         filepath = options.temp_filepath('blend')
         dprint('saving backup to %s' % filepath)
         if os.path.exists(filepath): os.remove(filepath)
+        if hasattr(self, 'rfctx'): self.rfctx.write_back_target()
         self.restore_window_state(ignore_panels=True)
         bpy.ops.wm.save_as_mainfile(filepath=filepath, check_existing=False, copy=True)
         self.overwrite_window_state()
 
     def save_normal(self):
+        if hasattr(self, 'rfctx'): self.rfctx.write_back_target()
         self.restore_window_state(ignore_panels=True)
         bpy.ops.wm.save_mainfile()
         self.overwrite_window_state()
@@ -568,7 +570,7 @@ class RFMode(Operator):
         if not hasattr(self, 'rfctx'): return
         # restore states of meshes
         self.rfctx.rftarget.restore_state()
-        for rfsource in self.rfctx.rfsources: rfsource.restore_state()
+        for rfsource in self.rfctx.rfsources_all: rfsource.restore_state()
 
         if self.rfctx.timer:
             bpy.context.window_manager.event_timer_remove(self.rfctx.timer)
@@ -0,0 +1,135 @@
+'''
+Copyright (C) 2018 CG Cookie
+http://cgcookie.com
+hello@cgcookie.com
+
+Created by Jonathan Denning, Jonathan Williamson
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+import time
+
+import bpy
+from bpy.app.handlers import persistent
+
+from .rfmesh import RFMesh, RFSource
+from .rfcontext import RFContext
+
+from ..common.debug import dprint
+from ..common.decorators import blender_version_wrapper
+from ..options import options
+
+
+class RFSourcePrewarmer:
+    '''
+    Prepares and caches RFSource data for the candidate sources while Blender
+    is idle, so starting a RetopoFlow tool does not have to wait on them.
+
+    RF_PT_Panel.draw reports the candidates (only when 'prewarm sources' is
+    enabled).  Idle work is driven by bpy.app.timers in 2.80+ and by the
+    scene_update_post handler in 2.79, which has no timers.  Each step checks
+    at most one source per recheck interval and extracts at most one source;
+    the rest of the preparation runs on RFMesh.get_executor().  Sources are
+    pre-warmed without validating the mesh, so user data is never changed in
+    the background; validation happens when RetopoFlow starts.
+    '''
+
+    candidates = []         # names of candidate source objects
+    recheck_interval = 2.0  # seconds between hash_object checks of a candidate
+    timer_interval = 0.5    # seconds between idle steps (2.80+)
+    time_checked = {}       # object name -> time of last check
+    running = False
+
+    @staticmethod
+    def update(objs):
+        if not options['prewarm sources']:
+            RFSourcePrewarmer.stop()
+            return
+        RFSourcePrewarmer.candidates = [obj.name for obj in objs]
+        RFSourcePrewarmer.start()
+
+    @staticmethod
+    def start():
+        if RFSourcePrewarmer.running: return
+        RFSourcePrewarmer.running = True
+        RFSourcePrewarmer.time_checked = {}
+        prewarm_register()
+
+    @staticmethod
+    def stop():
+        if not RFSourcePrewarmer.running: return
+        RFSourcePrewarmer.running = False
+        RFSourcePrewarmer.candidates = []
+        prewarm_unregister()
+
+    @staticmethod
+    def step():
+        ''' performs one budgeted piece of pre-warming work '''
+        if not options['prewarm sources']:
+            RFSourcePrewarmer.stop()
+            return
+        if RFContext.instance: return       # RetopoFlow is running; it manages its own sources
+
+        now = time.time()
+        time_checked = RFSourcePrewarmer.time_checked
+        for name in RFSourcePrewarmer.candidates:
+            if now - time_checked.get(name, 0) < RFSourcePrewarmer.recheck_interval: continue
+            time_checked[name] = now
+            obj = bpy.data.objects.get(name, None)
+            if not obj or type(obj.data) is not bpy.types.Mesh: continue
+            if not RFContext.is_valid_source(obj): continue
+            if RFSource.cache_is_valid(obj): continue
+            dprint('Pre-warming source "%s"' % name)
+            RFSource.cache_invalidate(obj.data.name)    # free stale data before building new
+            RFSource.new_async(obj, RFMesh.get_executor(), validate=False)
+            return      # extract at most one source per step
+
+
+def prewarm_step():
+    try:
+        RFSourcePrewarmer.step()
+    except Exception as e:
+        print('ERROR: caught exception while pre-warming sources ' + str(e))
+        RFSourcePrewarmer.stop()
+
+
+@persistent
+def prewarm_scene_update_post(scene):
+    prewarm_step()
+
+def prewarm_timer():
+    if not RFSourcePrewarmer.running: return None
+    prewarm_step()
+    return RFSourcePrewarmer.timer_interval if RFSourcePrewarmer.running else None
+
+
+@blender_version_wrapper('<', '2.80')
+def prewarm_register():
+    bpy.app.handlers.scene_update_post.append(prewarm_scene_update_post)
+
+@blender_version_wrapper('>=', '2.80')
+def prewarm_register():
+    bpy.app.timers.register(prewarm_timer, first_interval=RFSourcePrewarmer.timer_interval, persistent=True)
+
+
+@blender_version_wrapper('<', '2.80')
+def prewarm_unregister():
+    if prewarm_scene_update_post in bpy.app.handlers.scene_update_post:
+        bpy.app.handlers.scene_update_post.remove(prewarm_scene_update_post)
+
+@blender_version_wrapper('>=', '2.80')
+def prewarm_unregister():
+    if bpy.app.timers.is_registered(prewarm_timer):
+        bpy.app.timers.unregister(prewarm_timer)
@@ -54,6 +54,8 @@ class RFTool_Contours(RFTool, RFTool_Contours_Ops):
         self.FSM['move']  = self.modal_move
         self.FSM['shift'] = self.modal_shift
         self.FSM['rotate'] = self.modal_rotate
+        self.sel_loops_strings = None
+        self.sel_loops_strings_version = None
 
     def name(self): return "Contours"
     def icon(self): return "rf_contours_icon"
@@ -75,6 +77,25 @@ class RFTool_Contours(RFTool, RFTool_Contours_Ops):
         self.connected = False
         self.cuts = []
 
+    def get_selected_loops_strings(self, min_length=3):
+        '''
+        returns (loops, strings) of selected edges as lists of verts (see
+        find_loops and find_strings).  cached until target or selection changes
+        '''
+        version = self.rfcontext.get_target_version()
+        if self.sel_loops_strings_version != version:
+            sel_edges = self.rfcontext.get_selected_edges()
+            self.sel_loops_strings = (
+                find_loops(sel_edges),
+                find_strings(sel_edges, min_length=0),
+            )
+            self.sel_loops_strings_version = version
+        loops,strings = self.sel_loops_strings
+        return (
+            [list(loop) for loop in loops],
+            [list(string) for string in strings if len(string) >= min_length],
+        )
+
     def get_count(self): return options['contours count']
     def set_count(self, v): options['contours count'] = max(3, int(v))
     def get_ui_options(self):
@@ -102,12 +123,10 @@ class RFTool_Contours(RFTool, RFTool_Contours_Ops):
         return self.ui_icon
 
     def update(self):
-        sel_edges = self.rfcontext.get_selected_edges()
         #sel_faces = self.rfcontext.get_selected_faces()
 
         # find verts along selected loops and strings
-        sel_loops = find_loops(sel_edges)
-        sel_strings = find_strings(sel_edges)
+        sel_loops,sel_strings = self.get_selected_loops_strings()
 
         # filter out any loops or strings that are in the middle of a selected patch
         def in_middle(bmvs, is_loop):
@@ -201,8 +220,7 @@ class RFTool_Contours(RFTool, RFTool_Contours_Ops):
             return
 
     def prep_shift(self):
-        sel_edges = self.rfcontext.get_selected_edges()
-        sel_loops = find_loops(sel_edges)
+        sel_loops,_ = self.get_selected_loops_strings()
         if not sel_loops: return
 
         self.move_cloops = [Contours_Loop(loop, True) for loop in sel_loops]
@@ -214,10 +232,9 @@ class RFTool_Contours(RFTool, RFTool_Contours_Ops):
         self.move_proj_dists = [list(cloop.proj_dists) for cloop in self.move_cloops]
 
         self.move_cuts = []
-        for cloop in self.move_cloops:
-            xy = self.rfcontext.Point_to_Point2D(cloop.plane.o)
-            ray = self.rfcontext.Point2D_to_Ray(xy)
-            crawl = self.rfcontext.plane_intersection_crawl(ray, cloop.plane, walk=True)
+        rays = [self.rfcontext.Point2D_to_Ray(self.rfcontext.Point_to_Point2D(cloop.plane.o)) for cloop in self.move_cloops]
+        crawls = self.rfcontext.plane_intersection_crawls(rays, [cloop.plane for cloop in self.move_cloops], walk=True)
+        for cloop,crawl in zip(self.move_cloops, crawls):
             if not crawl:
                 dprint('could not crawl around sources for loop')
                 self.move_cuts += [None]
@@ -317,9 +334,7 @@ class RFTool_Contours(RFTool, RFTool_Contours_Ops):
             self.rfcontext.update_verts_faces(verts)
 
     def prep_move(self, after_action=False):
-        sel_edges = self.rfcontext.get_selected_edges()
-        sel_loops = find_loops(sel_edges)
-        sel_strings = find_strings(sel_edges, min_length=2)
+        sel_loops,sel_strings = self.get_selected_loops_strings(min_length=2)
         if not sel_loops and not sel_strings: return
 
         # prefer to move loops over strings
@@ -365,6 +380,17 @@ class RFTool_Contours(RFTool, RFTool_Contours_Ops):
         delta = Vec2D(self.rfcontext.actions.mouse - self.mousedown)
 
         raycast,project = self.rfcontext.raycast_sources_Point2D,self.rfcontext.Point_to_Point2D
+
+        # crawl all moved loops together
+        rays_new,planes_new = [],[]
+        for cloop,origin in zip(self.move_cloops, self.move_origins):
+            depth = self.rfcontext.Point_to_depth(origin)
+            origin2D_new = self.rfcontext.Point_to_Point2D(origin) + delta
+            origin_new = self.rfcontext.Point2D_to_Point(origin2D_new, depth)
+            planes_new.append(Plane(origin_new, cloop.plane.n))
+            rays_new.append(self.rfcontext.Point2D_to_Ray(origin2D_new))
+        crawls = self.rfcontext.plane_intersection_crawls(rays_new, planes_new, walk=True)
+
         for i_cloop in range(len(self.move_cloops)):
             cloop  = self.move_cloops[i_cloop]
             verts  = self.move_verts[i_cloop]
@@ -374,12 +400,7 @@ class RFTool_Contours(RFTool, RFTool_Contours_Ops):
             proj_dists = self.move_proj_dists[i_cloop]
             circumference = self.move_circumferences[i_cloop]
 
-            depth = self.rfcontext.Point_to_depth(origin)
-            origin2D_new = self.rfcontext.Point_to_Point2D(origin) + delta
-            origin_new = self.rfcontext.Point2D_to_Point(origin2D_new, depth)
-            plane_new = Plane(origin_new, cloop.plane.n)
-            ray_new = self.rfcontext.Point2D_to_Ray(origin2D_new)
-            crawl = self.rfcontext.plane_intersection_crawl(ray_new, plane_new, walk=True)
+            crawl = crawls[i_cloop]
             if not crawl: continue
             crawl_pts = [c for _,_,_,c in crawl]
             connected = crawl[0][0] is not None
@@ -408,9 +429,7 @@ class RFTool_Contours(RFTool, RFTool_Contours_Ops):
             self.rfcontext.update_verts_faces(verts)
 
     def prep_rotate(self):
-        sel_edges = self.rfcontext.get_selected_edges()
-        sel_loops = find_loops(sel_edges)
-        sel_strings = find_strings(sel_edges, min_length=2)
+        sel_loops,sel_strings = self.get_selected_loops_strings(min_length=2)
         if not sel_loops and not sel_strings: return
 
         # prefer to move loops over strings
@@ -457,6 +476,18 @@ class RFTool_Contours(RFTool, RFTool_Contours_Ops):
         rotate = (math.atan2(delta.y, delta.x) - self.rotate_start + math.pi) % (math.pi * 2)
 
         raycast,project = self.rfcontext.raycast_sources_Point2D,self.rfcontext.Point_to_Point2D
+
+        # crawl all rotated loops together
+        rays_new,planes_new = [],[]
+        for cloop,origin in zip(self.move_cloops, self.move_origins):
+            origin2D = self.rfcontext.Point_to_Point2D(origin)
+            ray = self.rfcontext.Point_to_Ray(origin)
+            rmat = Matrix.Rotation(rotate, 4, -ray.d)
+            normal = rmat * cloop.plane.n
+            planes_new.append(Plane(cloop.plane.o, normal))
+            rays_new.append(self.rfcontext.Point2D_to_Ray(origin2D))
+        crawls = self.rfcontext.plane_intersection_crawls(rays_new, planes_new, walk=True)
+
         for i_cloop in range(len(self.move_cloops)):
             cloop  = self.move_cloops[i_cloop]
             verts  = self.move_verts[i_cloop]
@@ -466,13 +497,7 @@ class RFTool_Contours(RFTool, RFTool_Contours_Ops):
             proj_dists = self.move_proj_dists[i_cloop]
             circumference = self.move_circumferences[i_cloop]
 
-            origin2D = self.rfcontext.Point_to_Point2D(origin)
-            ray = self.rfcontext.Point_to_Ray(origin)
-            rmat = Matrix.Rotation(rotate, 4, -ray.d)
-            normal = rmat * cloop.plane.n
-            plane = Plane(cloop.plane.o, normal)
-            ray = self.rfcontext.Point2D_to_Ray(origin2D)
-            crawl = self.rfcontext.plane_intersection_crawl(ray, plane, walk=True)
+            crawl = crawls[i_cloop]
             if not crawl: continue
             crawl_pts = [c for _,_,_,c in crawl]
             connected = crawl[0][0] is not None
@@ -46,8 +46,7 @@ class RFTool_Contours_Ops:
         self.new_cut(ray, plane, walk=False, check_hit=xy01)
 
     def change_count(self, delta):
-        sel_edges = self.rfcontext.get_selected_edges()
-        loops = find_loops(sel_edges)
+        loops,_ = self.get_selected_loops_strings()
         if len(loops) != 1: return
         loop = loops[0]
         count = len(loop)
@@ -63,8 +62,7 @@ class RFTool_Contours_Ops:
 
     @RFTool.dirty_when_done
     def fill(self):
-        sel_edges = self.rfcontext.get_selected_edges()
-        sel_loops = find_loops(sel_edges)
+        sel_loops,_ = self.get_selected_loops_strings()
 
         if len(sel_loops) != 2:
             self.rfcontext.alert_user('Contours', 'Select exactly 2 loops of the same edge count')
@@ -72,28 +72,46 @@ def next_edge_in_string(edge0, vert01, ignore_two_faced=False):
     edges1 = [edge for edge in edges1 if not faces0 or not any(f in faces0 for f in edge.link_faces)]
     return edges1[0] if len(edges1) == 1 else []
 
-def find_loops(edges):
+def selected_vert_edges(edges):
+    ''' returns dict mapping each vert of edges to its incident edges (only those in edges) '''
+    vert_edges = {}
+    for edge in edges:
+        v0,v1 = edge.verts
+        vert_edges.setdefault(v0, []).append(edge)
+        vert_edges.setdefault(v1, []).append(edge)
+    return vert_edges
+
+def find_loops(edges, vert_edges=None):
+    '''
+    returns closed loops (lists of verts) formed by edges.  at junctions
+    (verts with more than two edges), loop continues along the edge that does
+    not share a face with the previous edge.  each edge is crawled at most
+    once, so this is linear in the number of edges
+    '''
     if not edges: return []
+    if type(edges) not in {set, frozenset}: edges = set(edges)
+    if vert_edges is None: vert_edges = selected_vert_edges(edges)
     touched,loops = set(),[]
 
-    def crawl(v0, edge01, vert_list):
-        nonlocal edges, touched
+    def crawl(v0, edge01):
         # ... -- v0 -- edge01 -- v1 -- edge12 -- ...
         #  > came-^-from-^        ^-going-^-to >
-        vert_list.append(v0)
-        touched.add(edge01)
-        v1 = edge01.other_vert(v0)
-        if v1 == vert_list[0]: return vert_list
-        next_edges = [e for e in v1.link_edges if e in edges and e != edge01]
-        if not next_edges: return []
-        if len(next_edges) == 1: edge12 = next_edges[0]
-        else: edge12 = next_edge_in_string(edge01, v1)
-        if not edge12 or edge12 in touched or edge12 not in edges: return []
-        return crawl(v1, edge12, vert_list)
+        vert_list = []
+        while True:
+            vert_list.append(v0)
+            touched.add(edge01)
+            v1 = edge01.other_vert(v0)
+            if v1 == vert_list[0]: return vert_list
+            next_edges = [e for e in vert_edges[v1] if e != edge01]
+            if not next_edges: return []
+            if len(next_edges) == 1: edge12 = next_edges[0]
+            else: edge12 = next_edge_in_string(edge01, v1)
+            if not edge12 or edge12 in touched or edge12 not in edges: return []
+            v0,edge01 = v1,edge12
 
     for edge in edges:
         if edge in touched: continue
-        vert_list = crawl(edge.verts[0], edge, [])
+        vert_list = crawl(edge.verts[0], edge)
         if vert_list:
             loops.append(vert_list)
 
@@ -145,25 +163,34 @@ def find_parallel_loops(loop, wrap=True):
     return ploops
 
 def find_strings(edges, min_length=3):
+    '''
+    returns open strings (lists of verts) formed by edges, crawling in both
+    directions from each edge.  strings with fewer than min_length verts are
+    dropped.  each edge is crawled at most twice, so this is linear in the
+    number of edges
+    '''
     if not edges: return []
+    if type(edges) not in {set, frozenset}: edges = set(edges)
     touched,strings = set(),[]
 
-    def crawl(v0, edge01, vert_list):
-        nonlocal edges, touched
+    def crawl(v0, edge01):
         # ... -- v0 -- edge01 -- v1 -- edge12 -- ...
         #    came ^ from ^
-        vert_list.append(v0)
-        touched.add(edge01)
-        v1 = edge01.other_vert(v0)
-        if v1 == vert_list[0]: return []
-        edge12 = next_edge_in_string(edge01, v1)
-        if not edge12 or edge12 not in edges: return vert_list + [v1]
-        return crawl(v1, edge12, vert_list)
+        vert_list,crawled = [],set()
+        while True:
+            vert_list.append(v0)
+            touched.add(edge01)
+            crawled.add(edge01)
+            v1 = edge01.other_vert(v0)
+            if v1 == vert_list[0]: return []
+            edge12 = next_edge_in_string(edge01, v1)
+            if not edge12 or edge12 not in edges or edge12 in crawled: return vert_list + [v1]
+            v0,edge01 = v1,edge12
 
     for edge in edges:
         if edge in touched: continue
-        vert_list0 = crawl(edge.verts[0], edge, [])
-        vert_list1 = crawl(edge.verts[1], edge, [])
+        vert_list0 = crawl(edge.verts[0], edge)
+        vert_list1 = crawl(edge.verts[1], edge)
         vert_list = list(reversed(vert_list0)) + vert_list1[2:]
         if len(vert_list) >= min_length: strings.append(vert_list)
 
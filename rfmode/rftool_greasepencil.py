@@ -90,7 +90,8 @@ class RFTool_Stretch(RFTool):
         # called when artist finishes a stroke
 
         Point_to_Point2D = self.rfcontext.Point_to_Point2D
-        raycast_sources_Point2D = self.rfcontext.raycast_sources_Point2D
+        raycast_sources_Point2Ds = self.rfcontext.raycast_sources_Point2Ds
+        hits_to_Points = self.rfcontext.hits_to_Points
         accel_nearest2D_vert = self.rfcontext.accel_nearest2D_vert
 
         self.rfcontext.undo_push('grease mark')
@@ -118,8 +119,8 @@ class RFTool_Stretch(RFTool):
             return nstroke
 
         marks = process_stroke_filter(self.rfwidget.stroke2D)
-        marks = [raycast_sources_Point2D(s2d) for s2d in marks]
-        marks = [(p,n) for (p,n,_,_) in marks]
+        points,normals,_,_ = raycast_sources_Point2Ds(marks)
+        marks = hits_to_Points(points, normals)
         mark = []
         for (p,n) in marks:
             if not p or not n:
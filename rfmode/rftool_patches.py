@@ -649,14 +649,21 @@ class RFTool_Patches(RFTool):
     def fill_patch(self):
         if not self.previz: return
 
-        new_vert = self.rfcontext.new_vert_point
-        new_face = self.rfcontext.new_face
-
         self.rfcontext.undo_push('fill')
         for previz in self.previz:
             verts,faces = previz['verts'],previz['faces']
-            verts = [(new_vert(v) if type(v) is Point else v) for v in verts]
-            for face in faces: new_face([verts[iv] for iv in face])
+            # existing verts keep their index; new verts (Points) follow them
+            points = [v for v in verts if type(v) is Point]
+            remap,inew = [],len(verts)
+            for v in verts:
+                if type(v) is Point:
+                    remap.append(inew)
+                    inew += 1
+                else:
+                    remap.append(len(remap))
+            existing = [None if type(v) is Point else v for v in verts]
+            faces = [tuple(remap[iv] for iv in face) for face in faces]
+            self.rfcontext.new_verts_faces(points, faces, verts=existing)
 
         self.update()
 
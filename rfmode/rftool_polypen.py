@@ -92,9 +92,7 @@ class RFTool_PolyPen(RFTool):
         pr.done()
 
         pr = profiler.start('getting nearest geometry')
-        self.nearest_vert,_ = self.rfcontext.accel_nearest2D_vert(max_dist=options['polypen merge dist'])
-        self.nearest_edge,_ = self.rfcontext.accel_nearest2D_edge(max_dist=options['polypen merge dist'])
-        self.nearest_face = self.rfcontext.accel_nearest2D_face(max_dist=options['polypen merge dist'])
+        (self.nearest_vert,_),(self.nearest_edge,_),self.nearest_face = self.rfcontext.accel_nearest2D(max_dist=options['polypen merge dist'])
         pr.done()
 
         # determine next state based on current selection, hovered geometry
@@ -154,9 +152,7 @@ class RFTool_PolyPen(RFTool):
             return 'select'
 
         if self.rfcontext.actions.pressed('select add'):
-            bmv,_ = self.rfcontext.accel_nearest2D_vert(max_dist=options['select dist'])
-            bme,_ = self.rfcontext.accel_nearest2D_edge(max_dist=options['select dist'])
-            bmf = self.rfcontext.accel_nearest2D_face(max_dist=options['select dist'])
+            (bmv,_),(bme,_),bmf = self.rfcontext.accel_nearest2D(max_dist=options['select dist'])
             sel = bmv or bme or bmf
             if not sel: return
             if sel.select:
@@ -176,9 +172,7 @@ class RFTool_PolyPen(RFTool):
     def modal_selectadd_deselect(self):
         if not self.rfcontext.actions.using(['select','select add']):
             self.rfcontext.undo_push('deselect')
-            bmv,_ = self.rfcontext.accel_nearest2D_vert(max_dist=options['select dist'])
-            bme,_ = self.rfcontext.accel_nearest2D_edge(max_dist=options['select dist'])
-            bmf = self.rfcontext.accel_nearest2D_face(max_dist=options['select dist'])
+            (bmv,_),(bme,_),bmf = self.rfcontext.accel_nearest2D(max_dist=options['select dist'])
             sel = bmv or bme or bmf
             if sel and sel.select: self.rfcontext.deselect(sel)
             return 'main'
@@ -191,9 +185,7 @@ class RFTool_PolyPen(RFTool):
     def modal_select(self):
         if not self.rfcontext.actions.using(['select','select add']):
             return 'main'
-        bmv,_ = self.rfcontext.accel_nearest2D_vert(max_dist=options['select dist'])
-        bme,_ = self.rfcontext.accel_nearest2D_edge(max_dist=options['select dist'])
-        bmf = self.rfcontext.accel_nearest2D_face(max_dist=options['select dist'])
+        (bmv,_),(bme,_),bmf = self.rfcontext.accel_nearest2D(max_dist=options['select dist'])
         sel = bmv or bme or bmf
         if not sel or sel.select: return
         self.rfcontext.select(sel, supparts=False, only=False)
@@ -430,8 +422,7 @@ class RFTool_PolyPen(RFTool):
                         shared_faces = bmv.shared_faces(bmv1)
                         self.rfcontext.delete_faces(shared_faces, del_empty_edges=False, del_empty_verts=False)
                         bmv1.merge(bmv)
-                        self.rfcontext.remove_duplicate_bmfaces(bmv1)
-                        self.rfcontext.clean_duplicate_bmedges(bmv1)
+                        self.rfcontext.clean_duplicates([bmv1])
                     self.rfcontext.select(bmv1)
                     update_verts += [bmv1]
                     break
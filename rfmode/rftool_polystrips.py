@@ -34,6 +34,9 @@ from .rftool_polystrips_utils import (
     crawl_strip,
     is_boundaryvert,
     is_boundaryedge,
+    find_junctions,
+    find_strips,
+    recrawl_strip,
     )
 
 from ..common.debug import dprint
@@ -79,6 +82,12 @@ class RFTool_PolyStrips(RFTool, RFTool_PolyStrips_Ops):
         self.sel_cbpts = []
         self.strokes = []
         self.stroke_cbs = CubicBezierSpline()
+        self.strip_quads = None         # frozenset of selected quads that strips were found in
+        self.strip_junctions = set()
+        self.strip_face_map = {}        # face -> indices into self.strips of strips containing face
+        self.strip_target = None
+        self.strip_version = None
+        self.strip_max = None
 
         self.update()
 
@@ -126,56 +135,49 @@ class RFTool_PolyStrips(RFTool, RFTool_PolyStrips_Ops):
         ]
 
     @profiler.profile
-    def update(self):
-        self.strips = []
+    def update(self, changed_faces=None):
+        '''
+        finds strips of selected quads.  changed_faces are the faces known to
+        have moved since last update (ex: while dragging).  if the selected
+        quads are unchanged, only strips containing a changed face (including
+        strips sharing a changed junction face) are crawled again from their
+        junction and get their bezier fits and handles recomputed.  any other
+        target change (tracked by target version) finds all strips again.
+        '''
+        rftarget = self.rfcontext.rftarget
+        version = self.rfcontext.get_target_version(selection=False)
+        max_strips = options['polystrips max strips']
+        bmquads = frozenset(bmf for bmf in self.rfcontext.get_selected_faces() if len(bmf.verts) == 4)
+
+        incremental = (
+            rftarget is self.strip_target and
+            bmquads == self.strip_quads and
+            max_strips == self.strip_max and
+            (changed_faces is not None or version == self.strip_version)
+        )
+        self.strip_target = rftarget
+        self.strip_version = version
+        self.strip_quads = bmquads
+        self.strip_max = max_strips
+
+        if incremental:
+            strip_face_map = self.strip_face_map
+            redo = set(i for bmf in (changed_faces or []) for i in strip_face_map.get(bmf, []))
+            for i in redo:
+                bmf_strip = recrawl_strip(self.strips[i].bmf_strip, bmquads, self.strip_junctions)
+                self.strips[i] = RFTool_PolyStrips_Strip(bmf_strip)
+            if redo: self.update_strip_viz()
+            return
 
-        # get selected quads
-        bmquads = set(bmf for bmf in self.rfcontext.get_selected_faces() if len(bmf.verts) == 4)
-        if not bmquads: return
-
-        # find junctions at corners
-        junctions = set()
-        for bmf in bmquads:
-            # skip if in middle of a selection
-            if not any(is_boundaryvert(bmv, bmquads) for bmv in bmf.verts): continue
-            # skip if in middle of possible strip
-            edge0,edge1,edge2,edge3 = [is_boundaryedge(bme, bmquads) for bme in bmf.edges]
-            if (edge0 or edge2) and not (edge1 or edge3): continue
-            if (edge1 or edge3) and not (edge0 or edge2): continue
-            junctions.add(bmf)
-
-        # find junctions that might be in middle of strip but are ends to other strips
-        boundaries = set((bme,bmf) for bmf in bmquads for bme in bmf.edges if is_boundaryedge(bme, bmquads))
-        while boundaries:
-            bme,bmf = boundaries.pop()
-            for bme_ in bmf.neighbor_edges(bme):
-                strip = crawl_strip(bmf, bme_, bmquads, junctions)
-                if strip is None: continue
-                junctions.add(strip[-1])
-
-        # find strips between junctions
-        touched = set()
-        for bmf0 in junctions:
-            bme0,bme1,bme2,bme3 = bmf0.edges
-            edge0,edge1,edge2,edge3 = [is_boundaryedge(bme, bmquads) for bme in bmf0.edges]
-
-            def add_strip(bme):
-                strip = crawl_strip(bmf0, bme, bmquads, junctions)
-                if not strip:
-                    return
-                bmf1 = strip[-1]
-                if len(strip) > 1 and hash_face_pair(bmf0, bmf1) not in touched:
-                    touched.add(hash_face_pair(bmf0,bmf1))
-                    touched.add(hash_face_pair(bmf1,bmf0))
-                    self.strips.append(RFTool_PolyStrips_Strip(strip))
-
-            if not edge0: add_strip(bme0)
-            if not edge1: add_strip(bme1)
-            if not edge2: add_strip(bme2)
-            if not edge3: add_strip(bme3)
-            if options['polystrips max strips'] and len(self.strips) > options['polystrips max strips']:
-                self.strips = []
-                break
+        self.strips = []
+        self.strip_face_map = {}
+        self.strip_junctions = find_junctions(bmquads)
+        bmf_strips = find_strips(bmquads, self.strip_junctions, max_strips=max_strips)
+        if bmf_strips:
+            self.strips = [RFTool_PolyStrips_Strip(bmf_strip) for bmf_strip in bmf_strips]
+            for i,strip in enumerate(self.strips):
+                for bmf in strip:
+                    self.strip_face_map.setdefault(bmf, []).append(i)
 
         self.update_strip_viz()
 
@@ -354,7 +356,7 @@ class RFTool_PolyStrips(RFTool, RFTool_PolyStrips_Ops):
             if xyz: cbpt.xyz = xyz
 
         for strip in self.mod_strips:
-            strip.update(self.rfcontext.nearest_sources_Point, self.rfcontext.raycast_sources_Point, self.rfcontext.update_face_normal)
+            strip.update(self.rfcontext.nearest_sources_Points, self.rfcontext.raycast_sources_Points, self.rfcontext.set_verts_co, self.rfcontext.update_face_normal)
 
         self.update_strip_viz()
 
@@ -414,7 +416,7 @@ class RFTool_PolyStrips(RFTool, RFTool_PolyStrips_Ops):
                 cbpt.xyz = nr.eval(od / ov.dot(nr.d))
 
         for strip in self.hovering_strips:
-            strip.update(self.rfcontext.nearest_sources_Point, self.rfcontext.raycast_sources_Point, self.rfcontext.update_face_normal)
+            strip.update(self.rfcontext.nearest_sources_Points, self.rfcontext.raycast_sources_Points, self.rfcontext.set_verts_co, self.rfcontext.update_face_normal)
 
         self.update_strip_viz()
 
@@ -426,6 +428,7 @@ class RFTool_PolyStrips(RFTool, RFTool_PolyStrips_Ops):
         if not bmfaces: return
         bmverts = set(bmv for bmf in bmfaces for bmv in bmf.verts)
         self.bmverts = [(bmv, self.rfcontext.Point_to_Point2D(bmv.co)) for bmv in bmverts]
+        self.bmfaces = set(bmf for bmv in bmverts for bmf in bmv.link_faces)
         self.mousedown = self.rfcontext.actions.mouse
         self.rfwidget.set_widget('default')
         self.rfcontext.undo_push('move grabbed')
@@ -451,7 +454,7 @@ class RFTool_PolyStrips(RFTool, RFTool_PolyStrips_Ops):
             if not bmv.is_valid: continue
             set2D_vert(bmv, xy + delta)
         self.rfcontext.update_verts_faces(v for v,_ in self.bmverts)
-        self.update()
+        self.update(changed_faces=self.bmfaces)
 
     @profiler.profile
     def prep_scale(self):
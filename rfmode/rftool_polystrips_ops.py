@@ -153,7 +153,7 @@ class RFTool_PolyStrips_Ops:
         stroke = list(self.rfwidget.stroke2D)
         # filter stroke down where each pt is at least 1px away to eliminate local wiggling
         stroke = process_stroke_filter(stroke)
-        stroke = process_stroke_source(stroke, self.rfcontext.raycast_sources_Point2D, self.rfcontext.is_point_on_mirrored_side)
+        stroke = process_stroke_source(stroke, self.rfcontext.raycast_sources_Point2Ds_Points, self.rfcontext.is_point_on_mirrored_side)
 
         from_edge = None
         while len(stroke) > 2:
@@ -259,7 +259,8 @@ class RFTool_PolyStrips_Ops:
         vis_verts = self.rfcontext.visible_verts()
         vis_edges = self.rfcontext.visible_edges(verts=vis_verts)
         vis_faces = self.rfcontext.visible_faces(verts=vis_verts)
-        vis_faces2D = [(bmf, [Point_to_Point2D(bmv.co) for bmv in bmf.verts]) for bmf in vis_faces]
+        Verts_to_Point2Ds = self.rfcontext.Verts_to_Point2Ds
+        vis_faces2D = [(bmf, Verts_to_Point2Ds(bmf.verts)) for bmf in vis_faces]
 
         def get_state(point:Point2D):
             nonlocal vis_faces2D
@@ -446,8 +447,7 @@ class RFTool_PolyStrips_Ops:
                     bmf0 = all_bmfaces[max_i0]
                     bmf1 = all_bmfaces[max_i1]
                     bmf0.merge(bmf1)
-                    for vert in bmf0.verts:
-                        self.rfcontext.clean_duplicate_bmedges(vert)
+                    self.rfcontext.clean_duplicate_bmedges_region(bmf0.verts)
                     done = False
 
         try:
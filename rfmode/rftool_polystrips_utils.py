@@ -22,6 +22,7 @@ Created by Jonathan Denning, Jonathan Williamson
 import bgl
 import bpy
 import math
+import numpy as np
 from mathutils import Vector, Matrix
 from mathutils.geometry import intersect_line_line_2d
 from .rftool import RFTool
@@ -86,6 +87,67 @@ def strip_details(strip):
 def hash_face_pair(bmf0, bmf1):
     return str(bmf0.__hash__()) + str(bmf1.__hash__())
 
+def find_junctions(bmquads):
+    ''' finds faces of bmquads where strips end (corners, ends, and crossings) '''
+    # find junctions at corners
+    junctions = set()
+    for bmf in bmquads:
+        # skip if in middle of a selection
+        if not any(is_boundaryvert(bmv, bmquads) for bmv in bmf.verts): continue
+        # skip if in middle of possible strip
+        edge0,edge1,edge2,edge3 = [is_boundaryedge(bme, bmquads) for bme in bmf.edges]
+        if (edge0 or edge2) and not (edge1 or edge3): continue
+        if (edge1 or edge3) and not (edge0 or edge2): continue
+        junctions.add(bmf)
+
+    # find junctions that might be in middle of strip but are ends to other strips
+    boundaries = set((bme,bmf) for bmf in bmquads for bme in bmf.edges if is_boundaryedge(bme, bmquads))
+    while boundaries:
+        bme,bmf = boundaries.pop()
+        for bme_ in bmf.neighbor_edges(bme):
+            strip = crawl_strip(bmf, bme_, bmquads, junctions)
+            if strip is None: continue
+            junctions.add(strip[-1])
+
+    return junctions
+
+def find_strips(bmquads, junctions, max_strips=0):
+    '''
+    finds strips (lists of faces) of quads between junctions (see
+    find_junctions).  returns None if more than max_strips strips are found
+    (0=no max)
+    '''
+    strips = []
+
+    # find strips between junctions
+    touched = set()
+    for bmf0 in junctions:
+        bme0,bme1,bme2,bme3 = bmf0.edges
+        edge0,edge1,edge2,edge3 = [is_boundaryedge(bme, bmquads) for bme in bmf0.edges]
+
+        def add_strip(bme):
+            strip = crawl_strip(bmf0, bme, bmquads, junctions)
+            if not strip:
+                return
+            bmf1 = strip[-1]
+            if len(strip) > 1 and hash_face_pair(bmf0, bmf1) not in touched:
+                touched.add(hash_face_pair(bmf0,bmf1))
+                touched.add(hash_face_pair(bmf1,bmf0))
+                strips.append(strip)
+
+        if not edge0: add_strip(bme0)
+        if not edge1: add_strip(bme1)
+        if not edge2: add_strip(bme2)
+        if not edge3: add_strip(bme3)
+        if max_strips and len(strips) > max_strips: return None
+
+    return strips
+
+def recrawl_strip(bmf_strip, bmquads, junctions):
+    ''' crawls strip again from its starting junction, leaving through the same edge '''
+    bmf0,bmf1 = bmf_strip[0],bmf_strip[1]
+    return crawl_strip(bmf0, bmf0.shared_edge(bmf1), bmquads, junctions)
+
 
 def process_stroke_filter(stroke, min_distance=1.0, max_distance=2.0):
     ''' filter stroke to pts that are at least min_distance apart '''
@@ -101,9 +163,12 @@ def process_stroke_filter(stroke, min_distance=1.0, max_distance=2.0):
             l -= max_distance
     return nstroke
 
-def process_stroke_source(stroke, raycast, is_point_on_mirrored_side):
-    ''' filter out pts that don't hit source on non-mirrored side '''
-    pts = [(pt, raycast(pt)[0]) for pt in stroke]
+def process_stroke_source(stroke, raycast_batch, is_point_on_mirrored_side):
+    '''
+    filter out pts that don't hit source on non-mirrored side
+    raycast_batch takes a list of Point2D and returns a list of Point (None if ray missed)
+    '''
+    pts = zip(stroke, raycast_batch(stroke))
     return [pt for pt,p3d in pts if p3d and not is_point_on_mirrored_side(p3d)]
 
 def process_stroke_split_at_crossings(stroke):
@@ -284,15 +349,19 @@ class RFTool_PolyStrips_Strip:
         if any(not bme.is_valid for (bme,_) in bmes):
             # filter out invalid edges (see commit 88e4fde4)
             bmes = [(bme,norm) for (bme,norm) in bmes if bme.is_valid]
-        for bme,norm in bmes:
+
+        # tessellate curve once, then look up t for all edge centers together
+        self.curve.tessellate_uniform(lambda p,q:(p-q).length, split=10)
+        centers = [bme.verts[0].co + (bme.verts[1].co - bme.verts[0].co) / 2.0 for bme,_ in bmes]
+        ts = self.curve.approximate_ts_at_points_tessellation([tuple(c) for c in centers]).tolist()
+
+        for (bme,norm),center,t in zip(bmes, centers, ts):
             bmvs = bme.verts
             halfdiff = (bmvs[1].co - bmvs[0].co) / 2.0
             diffdir = halfdiff.normalized()
-            center = bmvs[0].co + halfdiff
-            
-            t = self.curve.approximate_t_at_point_tessellation(center, lambda p,q:(p-q).length)
+
             pos,der = self.curve.eval(t),self.curve.eval_derivative(t).normalized()
-            
+
             rad = halfdiff.length
             cross = der.cross(norm).normalized()
             off = center - pos
@@ -300,25 +369,42 @@ class RFTool_PolyStrips_Strip:
             rot = math.acos(clamp(diffdir.dot(cross), -0.9999999, 0.9999999))
             if diffdir.dot(der) < 0: rot = -rot
             self.bmes += [(bme, t, rad, rot, off_cross, off_der, off_norm)]
-    
-    def update(self, nearest_sources_Point, raycast_sources_Point, update_face_normal):
-        self.curve.tessellate_uniform(lambda p,q:(p-q).length, split=10)
-        length = self.curve.approximate_totlength_tessellation()
-        for bme,t,rad,rot,off_cross,off_der,off_norm in self.bmes:
-            pos,norm,_,_ = raycast_sources_Point(self.curve.eval(t))
-            if not norm: continue
-            der = self.curve.eval_derivative(t).normalized()
-            cross = der.cross(norm).normalized()
-            center = pos + der * off_der + cross * off_cross + norm * off_norm
-            rotcross = (Matrix.Rotation(rot, 3, norm) * cross).normalized()
-            p0 = center - rotcross * rad
-            p1 = center + rotcross * rad
-            bmv0,bmv1 = bme.verts
-            v0,_,_,_ = raycast_sources_Point(p0)
-            v1,_,_,_ = raycast_sources_Point(p1)
-            if not v0: v0,_,_,_ = nearest_sources_Point(p0)
-            if not v1: v1,_,_,_ = nearest_sources_Point(p1)
-            bmv0.co = v0
-            bmv1.co = v1
+
+        # (m,) arrays of the captured parameters for batched update
+        self.bmes_arrays = [np.array(a, dtype=np.float64) for a in zip(*[bme_[1:] for bme_ in self.bmes])] if self.bmes else None
+
+    def update(self, nearest_sources_Points, raycast_sources_Points, set_verts_co, update_face_normal):
+        '''
+        reconstructs edges of strip from its curve.  positions along curve are
+        evaluated for all edges together and snapped to the sources with one
+        batched raycast for the edge centers and one for the edge ends, so the
+        cost per handle move does not grow with python work per edge
+        '''
+        if not self.bmes_arrays: return
+        ts,rads,rots,offs_cross,offs_der,offs_norm = self.bmes_arrays
+
+        def normalized(vs):
+            l = np.linalg.norm(vs, axis=1)
+            l[l == 0] = 1
+            return vs / l[:,None]
+
+        pos,norm,_,_ = raycast_sources_Points(self.curve.eval_array(ts))
+        hit = np.nonzero(np.all(np.isfinite(norm), axis=1))[0]
+        if not len(hit): return
+        pos,norm = pos[hit],normalized(norm[hit])
+        der = normalized(self.curve.eval_derivative_array(ts[hit]))
+        cross = normalized(np.cross(der, norm))
+        center = pos + der * offs_der[hit,None] + cross * offs_cross[hit,None] + norm * offs_norm[hit,None]
+        # rotate cross about norm by rot (cross is perpendicular to norm)
+        rot = rots[hit,None]
+        rotcross = normalized(cross * np.cos(rot) + np.cross(norm, cross) * np.sin(rot))
+        ps = np.concatenate([center - rotcross * rads[hit,None], center + rotcross * rads[hit,None]])
+
+        vs,_,_,_ = raycast_sources_Points(ps)
+        miss = np.nonzero(~np.all(np.isfinite(vs), axis=1))[0]
+        if len(miss): vs[miss] = nearest_sources_Points(ps[miss])[0]
+
+        bmvs = [self.bmes[i][0].verts for i in hit.tolist()]
+        set_verts_co([bmv0 for bmv0,_ in bmvs] + [bmv1 for _,bmv1 in bmvs], vs, snap=False)
         for bmf in self.bmf_strip:
             update_face_normal(bmf)
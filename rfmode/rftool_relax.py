@@ -20,8 +20,10 @@ Created by Jonathan Denning, Jonathan Williamson
 '''
 
 import math
+import time
 
 import bpy
+import numpy as np
 
 from .rftool import RFTool
 
@@ -34,8 +36,10 @@ from ..common.maths import (
 from ..common.ui import (
     UI_Container, UI_Collapsible, UI_Frame,
     UI_Image, UI_Label,
-    UI_BoolValue, UI_Number, UI_Checkbox,
+    UI_BoolValue, UI_Number, UI_Checkbox, UI_Button,
 )
+from ..common import mesharrays
+from ..common.debug import dprint
 from ..common.profiler import profiler
 from ..keymaps import default_rf_keymaps
 from ..options import options
@@ -74,6 +78,8 @@ class RFTool_Relax(RFTool):
         ui_algorithm.add(UI_Checkbox('Face Radius', *options.gettersetter('relax face radius')))
         ui_algorithm.add(UI_Checkbox('Face Sides', *options.gettersetter('relax face sides')))
         ui_algorithm.add(UI_Checkbox('Face Angles', *options.gettersetter('relax face angles')))
+        ui_algorithm.add(UI_Number('Max Steps', *options.gettersetter('relax max steps', setwrap=lambda v: max(1, int(v))), tooltip='Maximum number of steps taken when relaxing whole mesh'))
+        ui_algorithm.add(UI_Button('Relax All', self.relax_all, tooltip='Relax whole target mesh until vertices stop moving (respects masking options, except hidden)'))
 
         return [
             ui_mask,
@@ -176,111 +182,119 @@ class RFTool_Relax(RFTool):
 
         self._relax(verts, edges, faces, vert_strength)
 
-    def _relax(self, verts, edges, faces, vert_strength=None, vistest=True):
-        if not verts or not edges: return
+    def _relax_arrays(self, verts, edges, faces, vert_strength=None, vistest=True):
+        '''
+        gathers the region affected by relaxing into arrays: the involved verts
+        (verts plus all verts of edges and faces), their world positions, the
+        edges and faces (in CSR form) as indices into them, and the weight of
+        each vert (0 for verts that are masked off or not in verts)
+        '''
         vert_strength = vert_strength or {}
 
         # gather options
-        opt_steps = options['relax steps']
         opt_mask_boundary = options['relax mask boundary']
         opt_mask_hidden = options['relax mask hidden']
         opt_mask_selected = options['relax mask selected']
-        opt_edge_length = options['relax edge length']
-        opt_face_radius = options['relax face radius']
-        opt_face_sides = options['relax face sides']
-        opt_face_angles = options['relax face angles']
         opt_mult = options['relax force multiplier']
 
-        is_visible = lambda bmv: self.rfcontext.is_visible(bmv.co, bmv.normal)
+        if vistest and opt_mask_hidden:
+            hidden = {bmv for (bmv,vis) in zip(verts, self.rfcontext.is_visible_verts(verts)) if not vis}
+        else:
+            hidden = set()
+
+        # capture all verts involved in relaxing
+        chk_verts = list(verts)
+        vert_index = {bmv:i for (i,bmv) in enumerate(chk_verts)}
+        def index(bmv):
+            i = vert_index.get(bmv, None)
+            if i is None:
+                i = vert_index[bmv] = len(chk_verts)
+                chk_verts.append(bmv)
+            return i
+        edge_idxs = np.array([[index(bmv) for bmv in bme.verts] for bme in edges], dtype=np.int64).reshape(-1, 2)
+        face_offsets,face_corners = mesharrays.face_csr([[index(bmv) for bmv in bmf.verts] for bmf in faces])
+        cos = np.array([tuple(bmv.co) for bmv in chk_verts], dtype=np.float64).reshape(-1, 3)
+
+        weights = np.zeros(len(chk_verts))
+        for i,bmv in enumerate(verts):
+            if vert_strength and bmv not in vert_strength: continue
+            if self.sel_only and not bmv.select: continue
+            if opt_mask_boundary and bmv.is_boundary: continue
+            if bmv in hidden: continue
+            if opt_mask_selected and bmv.select: continue
+            weights[i] = opt_mult * vert_strength.get(bmv, 1.0)
+
+        return (chk_verts, cos, edge_idxs, face_offsets, face_corners, weights)
+
+    def _relax_step(self, cos, edge_idxs, face_offsets, face_corners, weights, moving, strength):
+        '''
+        performs one relax step on cos (in place) and snaps the moving verts
+        to the sources in one batch.  returns normals of the moving verts
+        '''
+        displace = mesharrays.relax_displacements(
+            cos, edge_idxs, face_offsets, face_corners, strength,
+            edge_length=options['relax edge length'],
+            face_radius=options['relax face radius'],
+            face_sides=options['relax face sides'],
+            face_angles=options['relax face angles'],
+        )
+        points = cos[moving] + displace[moving] * weights[moving,None]
+        snapped,normals,_,_ = self.rfcontext.nearest_sources_Points(points)
+        hit = np.all(np.isfinite(snapped), axis=1)
+        points[hit] = snapped[hit]
+        cos[moving] = points
+        return normals
+
+    def _relax(self, verts, edges, faces, vert_strength=None, vistest=True):
+        if not verts or not edges: return
 
+        opt_steps = options['relax steps']
         time_delta = self.rfcontext.actions.time_delta
         strength = (5.0 / opt_steps) * self.rfwidget.strength * time_delta
-        radius = self.rfwidget.get_scaled_radius()
 
-        # capture all verts involved in relaxing
-        chk_verts = set(verts)
-        chk_verts |= {bmv for bme in edges for bmv in bme.verts}
-        chk_verts |= {bmv for bmf in faces for bmv in bmf.verts}
-        chk_edges = set(bme for bmv in chk_verts for bme in bmv.link_edges)
-        chk_faces = set(bmf for bmv in chk_verts for bmf in bmv.link_faces)
+        chk_verts,cos,edge_idxs,face_offsets,face_corners,weights = self._relax_arrays(verts, edges, faces, vert_strength=vert_strength, vistest=vistest)
+        moving = np.nonzero(weights)[0]
+        if not len(moving): return
 
         # perform smoothing
         for step in range(opt_steps):
-            # compute average edge length
-            avg_edge_len = sum(bme.calc_length() for bme in edges) / len(edges)
-            # gather coords
-            displace = {bmv:Vec((0,0,0)) for bmv in chk_verts}
-
-            # push edges closer to average edge length
-            if opt_edge_length:
-                for bme in chk_edges:
-                    if bme not in edges: continue
-                    bmv0,bmv1 = bme.verts
-                    vec = bme.vector()
-                    edge_len = vec.length
-                    f = vec * (0.1 * (avg_edge_len - edge_len) * strength) #/ edge_len
-                    displace[bmv0] -= f
-                    displace[bmv1] += f
-
-            # push verts if neighboring faces seem flipped (still WiP!)
-            if options['show experimental']:
-                for bmv in verts:
-                    vn,fn = bmv.normal,bmv.compute_normal()
-                    d = fn - vn * vn.dot(fn)
-                    print(vn, fn, d)
-                    displace[bmv] += d
-
-            # attempt to "square" up the faces
-            for bmf in chk_faces:
-                if bmf not in faces: continue
-                bmvs = bmf.verts
-                cnt = len(bmvs)
-                ctr = Point.average(bmv.co for bmv in bmvs)
-                rels = [bmv.co - ctr for bmv in bmvs]
-
-                # push verts toward average dist from verts to face center
-                if opt_face_radius:
-                    avg_rel_len = sum(rel.length for rel in rels) / cnt
-                    for rel, bmv in zip(rels, bmvs):
-                        rel_len = rel.length
-                        f = rel * ((avg_rel_len - rel_len) * strength) #/ rel_len
-                        displace[bmv] += f
-
-                # push verts toward equal edge lengths
-                if opt_face_sides:
-                    avg_face_edge_len = sum(bme.length for bme in bmf.edges) / cnt
-                    for bme in bmf.edges:
-                        bmv0, bmv1 = bme.verts
-                        vec = bme.vector()
-                        edge_len = vec.length
-                        f = vec * ((avg_face_edge_len - edge_len) * strength) #/ edge_len
-                        displace[bmv0] -= f
-                        displace[bmv1] += f
-
-                # push verts toward equal spread
-                if opt_face_angles:
-                    avg_angle = 2.0 * math.pi / cnt
-                    for i0 in range(cnt):
-                        i1 = (i0 + 1) % cnt
-                        rel0,bmv0 = rels[i0],bmvs[i0]
-                        rel1,bmv1 = rels[i1],bmvs[i1]
-                        vec = bmv1.co - bmv0.co
-                        fvec0 = rel0.cross(vec).cross(rel0).normalize()
-                        fvec1 = rel1.cross(rel1.cross(vec)).normalize()
-                        vec_len = vec.length
-                        angle = rel0.angle(rel1)
-                        f_mag = (0.1 * (avg_angle - angle) * strength) / cnt #/ vec_len
-                        displace[bmv0] -= fvec0 * f_mag
-                        displace[bmv1] -= fvec1 * f_mag
-
-            # update
-            for bmv in displace:
-                if bmv not in verts: continue
-                if bmv not in vert_strength: continue
-                if self.sel_only and not bmv.select: continue
-                if opt_mask_boundary and bmv.is_boundary: continue
-                if vistest and opt_mask_hidden and not is_visible(bmv): continue
-                if opt_mask_selected and bmv.select: continue
-                f = displace[bmv] * (opt_mult * vert_strength[bmv])
-                bmv.co += f
-                self.rfcontext.snap_vert(bmv)
+            normals = self._relax_step(cos, edge_idxs, face_offsets, face_corners, weights, moving, strength)
+
+        self.rfcontext.set_verts_co([chk_verts[i] for i in moving.tolist()], cos[moving], normals=normals, snap=False)
+
+    @RFTool.dirty_when_done
+    def relax_all(self):
+        '''
+        relaxes the whole target mesh, iterating until largest move of a step
+        is less than 'relax residual' (relative to average edge length) or
+        'relax max steps' steps are taken.  timing and residual of each step
+        are reported with dprint
+        '''
+        rftarget = self.rfcontext.rftarget
+        verts,edges,faces = rftarget.get_verts(), rftarget.get_edges(), rftarget.get_faces()
+        if not verts or not edges: return
+        self.rfcontext.undo_push('relax all')
+
+        opt_max_steps = options['relax max steps']
+        opt_residual = options['relax residual']
+        strength = 0.1 * self.rfwidget.strength
+
+        tstart = time.time()
+        chk_verts,cos,edge_idxs,face_offsets,face_corners,weights = self._relax_arrays(verts, edges, faces, vistest=False)
+        moving = np.nonzero(weights)[0]
+        if not len(moving): return
+        avg_edge_len = float(np.mean(np.linalg.norm(cos[edge_idxs[:,1]] - cos[edge_idxs[:,0]], axis=1)))
+        dprint('Relax all: %d verts (%d moving), %d edges, %d faces, setup %0.2fms' % (
+            len(chk_verts), len(moving), len(edge_idxs), len(face_offsets)-1, (time.time() - tstart) * 1000,
+        ))
+
+        for step in range(opt_max_steps):
+            tstep = time.time()
+            before = cos[moving]
+            normals = self._relax_step(cos, edge_idxs, face_offsets, face_corners, weights, moving, strength)
+            residual = mesharrays.relax_residual(before, cos[moving]) / max(avg_edge_len, 0.000001)
+            dprint('Relax all: step %d, %0.2fms, residual %f' % (step, (time.time() - tstep) * 1000, residual))
+            if residual < opt_residual: break
+
+        self.rfcontext.set_verts_co([chk_verts[i] for i in moving.tolist()], cos[moving], normals=normals, snap=False)
+        dprint('Relax all: %d steps, %0.2fms total' % (step+1, (time.time() - tstart) * 1000))
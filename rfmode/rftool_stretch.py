@@ -151,7 +151,7 @@ class RFTool_Stretch(RFTool):
         # called when artist finishes a stroke
 
         Point_to_Point2D = self.rfcontext.Point_to_Point2D
-        raycast_sources_Point2D = self.rfcontext.raycast_sources_Point2D
+        raycast_sources_Point2Ds_Points = self.rfcontext.raycast_sources_Point2Ds_Points
         accel_nearest2D_vert = self.rfcontext.accel_nearest2D_vert
 
         brushsize = self.rfwidget.size
@@ -163,12 +163,14 @@ class RFTool_Stretch(RFTool):
         if len(selverts) < 2:
             print('no selected verts')
             return
+        visverts_list = list(visverts)
+        vert2d = dict(zip(visverts_list, self.rfcontext.Verts_to_Point2Ds(visverts_list)))
 
         # filter stroke down where each pt is at least 1px away to eliminate local wiggling
         s2d = self.rfwidget.stroke2D
         s2d = process_stroke_filter(s2d)
-        s2d = process_stroke_source(s2d, raycast_sources_Point2D, Point_to_Point2D=Point_to_Point2D, clamp_point_to_symmetry=self.rfcontext.clamp_point_to_symmetry)
-        s3d = [raycast_sources_Point2D(s)[0] for s in s2d]
+        s2d = process_stroke_source(s2d, raycast_sources_Point2Ds_Points, Point_to_Point2D=Point_to_Point2D, clamp_point_to_symmetry=self.rfcontext.clamp_point_to_symmetry)
+        s3d = raycast_sources_Point2Ds_Points(s2d)
         stroke = [s3 for (s2, s3) in zip(s2d, s3d) if s3]
         if len(stroke) < 2:
             print('no stroke')
@@ -176,7 +178,7 @@ class RFTool_Stretch(RFTool):
         stroke_accel = Accel2D.simple_verts(stroke, Point_to_Point2D)
 
         def nearestdist(v):
-            return min((Point_to_Point2D(v.co) - Point_to_Point2D(sv.co)).length for sv in selverts)
+            return min((vert2d[v] - vert2d[sv]).length for sv in selverts)
         def get_neighbors(s, depth=0):
             if type(s) is not set: s = {s}
             os = set(s)
@@ -197,7 +199,7 @@ class RFTool_Stretch(RFTool):
         moveverts = {
             mv: {
                 'neighbors': [
-                    (ov, (Point_to_Point2D(ov.co) - Point_to_Point2D(mv.co)).length)
+                    (ov, (vert2d[ov] - vert2d[mv]).length)
                     for ov in get_neighbors(mv) if ov != mv and ov in visverts
                 ],
                 'effect': pow(mid(0.0, 1.0, 1.0 - nearestdist(mv) / brushsize), 1.0),
@@ -210,11 +212,10 @@ class RFTool_Stretch(RFTool):
         self.stroke3D = stroke
         self.moves3D = [(mv, moveverts[mv]['effect']) for mv in moveverts]
         # apply ICP
-        fn_move = icp([Point_to_Point2D(v.co) for v in selverts], [Point_to_Point2D(s) for s in stroke], stroke_accel.nearest_vert)
+        fn_move = icp([vert2d[v] for v in selverts], [Point_to_Point2D(s) for s in stroke], stroke_accel.nearest_vert)
         steps = 10
         iterations = 100
         force = 0.02
-        vert2d = {mv:Point_to_Point2D(mv.co) for mv in visverts}
         sv_pos = [
             [(sv, vert2d[sv] + (fn_move(vert2d[sv]) - vert2d[sv]) * i / steps) for sv in selverts]
             for i in range(steps+1)
@@ -248,7 +249,8 @@ class RFTool_Stretch(RFTool):
             for (sv, sv2d) in step: vert2d[sv] = sv2d
 
             # update
-            for mv in allverts: self.rfcontext.set2D_vert(mv, vert2d[mv])
+            updateverts = list(allverts)
+            self.rfcontext.set2D_verts(updateverts, [vert2d[mv] for mv in updateverts])
             self.rfcontext.dirty()
 
             istep += 1
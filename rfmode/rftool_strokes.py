@@ -206,17 +206,17 @@ class RFTool_Strokes(RFTool):
         # called when artist finishes a stroke
 
         Point_to_Point2D = self.rfcontext.Point_to_Point2D
-        raycast_sources_Point2D = self.rfcontext.raycast_sources_Point2D
+        raycast_sources_Point2Ds_Points = self.rfcontext.raycast_sources_Point2Ds_Points
         accel_nearest2D_vert = self.rfcontext.accel_nearest2D_vert
 
         # filter stroke down where each pt is at least 1px away to eliminate local wiggling
         size = self.rfwidget.size
         stroke = self.rfwidget.stroke2D
         stroke = process_stroke_filter(stroke)
-        #stroke = process_stroke_source(stroke, raycast_sources_Point2D, is_point_on_mirrored_side=self.rfcontext.is_point_on_mirrored_side)
-        #stroke = process_stroke_source(stroke, raycast_sources_Point2D, Point_to_Point2D=Point_to_Point2D, mirror_point=self.rfcontext.mirror_point)
-        stroke = process_stroke_source(stroke, raycast_sources_Point2D, Point_to_Point2D=Point_to_Point2D, clamp_point_to_symmetry=self.rfcontext.clamp_point_to_symmetry)
-        stroke3D = [raycast_sources_Point2D(s)[0] for s in stroke]
+        #stroke = process_stroke_source(stroke, raycast_sources_Point2Ds_Points, is_point_on_mirrored_side=self.rfcontext.is_point_on_mirrored_side)
+        #stroke = process_stroke_source(stroke, raycast_sources_Point2Ds_Points, Point_to_Point2D=Point_to_Point2D, mirror_point=self.rfcontext.mirror_point)
+        stroke = process_stroke_source(stroke, raycast_sources_Point2Ds_Points, Point_to_Point2D=Point_to_Point2D, clamp_point_to_symmetry=self.rfcontext.clamp_point_to_symmetry)
+        stroke3D = raycast_sources_Point2Ds_Points(stroke)
         stroke3D = [s for s in stroke3D if s]
 
         if len(stroke3D) < 2: return
@@ -355,7 +355,7 @@ class RFTool_Strokes(RFTool):
         best_score = None
         for edge_cycle in find_edge_cycles(edges):
             verts = get_strip_verts(edge_cycle)
-            vctr = Point2D.average([Point_to_Point2D(v.co) for v in verts])
+            vctr = Point2D.average(self.rfcontext.Verts_to_Point2Ds(verts))
             score = (sctr - vctr).length
             if not best or score < best_score:
                 best = edge_cycle
@@ -369,8 +369,9 @@ class RFTool_Strokes(RFTool):
 
         edge_cycle = best
         vert_cycle = get_strip_verts(edge_cycle)[:-1]   # first and last verts are same---loop!
-        vctr = Point2D.average([Point_to_Point2D(v.co) for v in vert_cycle])
-        verts_centered = [(Point_to_Point2D(v.co) - vctr) for v in vert_cycle]
+        vert_cycle2D = self.rfcontext.Verts_to_Point2Ds(vert_cycle)
+        vctr = Point2D.average(vert_cycle2D)
+        verts_centered = [(p2d - vctr) for p2d in vert_cycle2D]
 
         # make sure edge cycle is counter-clockwise
         winding = sum((v0.x * v1.y - v1.x * v0.y) for (v0, v1) in iter_pairs(verts_centered, wrap=False))
@@ -401,24 +402,28 @@ class RFTool_Strokes(RFTool):
 
         self.defer_recomputing = True
 
-        patch = []
+        # patch[i][j] is index of vert: vert_cycle[i] for j == 0, otherwise new vert
+        xys,patch = [],[]
         for i in range(crosses):
             v = Point_to_Point2D(vert_cycle[i].co)
             s = nstroke[i]
-            cur_line = [vert_cycle[i]]
+            cur_line = [i]
             for j in range(1, loops+1):
                 pj = j / loops
-                cur_line.append(self.rfcontext.new2D_vert_point(Point2D.weighted_average([
+                cur_line.append(crosses + len(xys))
+                xys.append(Point2D.weighted_average([
                     (pj, s),
                     (1 - pj, v)
-                ])))
+                ]))
             patch.append(cur_line)
+        faces = []
         for i0 in range(crosses):
             i1 = (i0 + 1) % crosses
             for j0 in range(loops):
                 j1 = j0 + 1
-                self.rfcontext.new_face([patch[i0][j0], patch[i0][j1], patch[i1][j1], patch[i1][j0]])
-        end_verts = [l[-1] for l in patch]
+                faces.append((patch[i0][j0], patch[i0][j1], patch[i1][j1], patch[i1][j0]))
+        nverts,_ = self.rfcontext.new2D_verts_faces(xys, faces, verts=vert_cycle[:crosses])
+        end_verts = [nverts[l[-1] - crosses] for l in patch]
         edges = [v0.shared_edge(v1) for (v0, v1) in iter_pairs(end_verts, wrap=True)]
 
         self.just_created = True
@@ -698,7 +703,7 @@ class RFTool_Strokes(RFTool):
                 co = a.co
                 b.merge(a)
                 b.co = co
-                self.rfcontext.clean_duplicate_bmedges(b)
+            self.rfcontext.clean_duplicate_bmedges_region(patch[0][1:])
         if edges1:
             if len(edges1) == 1:
                 side_verts = list(edges1[0].verts)
@@ -709,7 +714,7 @@ class RFTool_Strokes(RFTool):
                 co = a.co
                 b.merge(a)
                 b.co = co
-                self.rfcontext.clean_duplicate_bmedges(b)
+            self.rfcontext.clean_duplicate_bmedges_region(patch[-1][1:])
 
         nedges = [v0.shared_edge(v1) for (v0, v1) in iter_pairs(last, wrap=False)]
 
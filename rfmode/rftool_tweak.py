@@ -20,10 +20,13 @@ Created by Jonathan Denning, Jonathan Williamson
 '''
 
 import math
+import time
 import bpy
+import numpy as np
 from .rftool import RFTool
 from ..common.maths import Point,Point2D,Vec2D,Vec,Accel2D
 from ..common.ui import UI_Image, UI_BoolValue, UI_Label, UI_Container, UI_Number, UI_Frame
+from ..common.debug import dprint
 from ..common.profiler import profiler
 from ..keymaps import default_rf_keymaps
 from ..options import options
@@ -36,6 +39,7 @@ class RFTool_Tweak(RFTool):
         self.FSM['selectadd/deselect'] = self.modal_selectadd_deselect
         self.FSM['select'] = self.modal_select
         self.FSM['move'] = self.modal_move
+        self.move_timings = {}      # scaled brush radius -> [drags, frames, total time, max time]
 
     def name(self): return "Tweak"
     def icon(self): return "rf_tweak_icon"
@@ -139,34 +143,67 @@ class RFTool_Tweak(RFTool):
         opt_mask_selected = options['tweak mask selected']
 
         self.rfcontext.undo_push('tweak move')
-        Point_to_Point2D = self.rfcontext.Point_to_Point2D
-        get_strength_dist = self.rfwidget.get_strength_dist
-        def is_visible(bmv): return self.rfcontext.is_visible(bmv.co, bmv.normal)
-        self.bmverts = [(bmv, Point_to_Point2D(bmv.co), get_strength_dist(d3d)) for bmv,d3d in nearest]
-        if self.sel_only: self.bmverts = [(bmv,p2d,s) for bmv,p2d,s in self.bmverts if bmv.select]
-        if opt_mask_boundary: self.bmverts = [(bmv,p2d,s) for bmv,p2d,s in self.bmverts if not bmv.is_boundary]
-        if opt_mask_hidden:   self.bmverts = [(bmv,p2d,s) for bmv,p2d,s in self.bmverts if is_visible(bmv)]
-        if opt_mask_selected: self.bmverts = [(bmv,p2d,s) for bmv,p2d,s in self.bmverts if not bmv.select]
+
+        # affected verts, their original screen positions and falloff weights are stored
+        # as arrays, so each mousemove is a single vectorized offset and batched raycast
+        bmvs = [bmv for bmv,_ in nearest]
+        p2ds = self.rfcontext.Verts_to_Point2Ds(bmvs)
+        keep = np.array([p2d is not None for p2d in p2ds], dtype=bool)
+        if self.sel_only: keep &= np.array([bmv.select for bmv in bmvs], dtype=bool)
+        if opt_mask_boundary: keep &= np.array([not bmv.is_boundary for bmv in bmvs], dtype=bool)
+        if opt_mask_selected: keep &= np.array([not bmv.select for bmv in bmvs], dtype=bool)
+        idx = np.nonzero(keep)[0].tolist()
+        if opt_mask_hidden:
+            vis = self.rfcontext.is_visible_verts([bmvs[i] for i in idx])
+            idx = [i for i,v in zip(idx, vis) if v]
+        self.move_verts = [bmvs[i] for i in idx]
+        self.move_xys = np.array([tuple(p2ds[i]) for i in idx], dtype=np.float64).reshape(-1, 2)
+        self.move_strengths = self.rfwidget.get_strength_dists([nearest[i][1] for i in idx])
+        self.move_delta = None
+        self.move_frames = []
+        self.move_radius = radius
+
         self.bmfaces = set([f for bmv,_ in nearest for f in bmv.link_faces])
         self.mousedown = self.rfcontext.actions.mousedown
         return 'move'
 
+    def done_move(self):
+        ''' reports frame times of the drag, accumulated per brush size '''
+        if not self.move_frames: return
+        radius = int(round(self.move_radius))
+        timing = self.move_timings.setdefault(radius, [0, 0, 0.0, 0.0])
+        timing[0] += 1
+        timing[1] += len(self.move_frames)
+        timing[2] += sum(self.move_frames)
+        timing[3] = max(timing[3], max(self.move_frames))
+        dprint('Tweak: radius %d, %d verts, %d frames, avg %0.2fms, max %0.2fms (all drags at radius: %d, avg %0.2fms, max %0.2fms)' % (
+            radius, len(self.move_verts), len(self.move_frames),
+            1000 * sum(self.move_frames) / len(self.move_frames), 1000 * max(self.move_frames),
+            timing[0], 1000 * timing[2] / timing[1], 1000 * timing[3],
+        ))
+
     @RFTool.dirty_when_done
     def modal_move(self):
         if self.rfcontext.actions.released(['action','action alt0']):
+            self.done_move()
             return 'main'
         if self.rfcontext.actions.pressed('cancel'):
+            self.done_move()
             self.rfcontext.undo_cancel()
             return 'main'
 
         delta = Vec2D(self.rfcontext.actions.mouse - self.mousedown)
-        set2D_vert = self.rfcontext.set2D_vert
-        update_face_normal = self.rfcontext.update_face_normal
+        if self.move_delta is not None and delta == self.move_delta: return
+        self.move_delta = delta
+        if not self.move_verts: return
 
-        for bmv,xy,strength in self.bmverts:
-            set2D_vert(bmv, xy + delta*strength)
+        tstart = time.time()
+        update_face_normal = self.rfcontext.update_face_normal
+        xys = self.move_xys + np.array(delta) * self.move_strengths[:,None]
+        self.rfcontext.set2D_verts(self.move_verts, xys)
         for bmf in self.bmfaces:
             update_face_normal(bmf)
+        self.move_frames.append(time.time() - tstart)
 
     def draw_postview(self): pass
     def draw_postpixel(self): pass
@@ -24,6 +24,7 @@ https://github.com/CGCookie/retopoflow
 import math
 import bgl
 import random
+import numpy as np
 from mathutils import Matrix, Vector
 from ..common.maths import Vec, Vec2D, Point, Point2D, Direction
 from ..common.ui import Drawing
@@ -209,6 +210,11 @@ class RFWidget(RFWidget_Registry, RFWidget_Default, RFWidget_BrushFalloff, RFWid
     def get_strength_dist(self, dist:float):
         return max(0.0, min(1.0, (1.0 - math.pow(dist / self.get_scaled_radius(), self.falloff)))) * self.strength
 
+    def get_strength_dists(self, dists):
+        ''' vectorized get_strength_dist; returns (n,) array '''
+        dists = np.asarray(dists, dtype=np.float64)
+        return np.clip(1.0 - np.power(dists / self.get_scaled_radius(), self.falloff), 0.0, 1.0) * self.strength
+
     def get_strength_Point(self, point:Point):
         if not self.hit_p: return 0.0
         return self.get_strength_dist((point - self.hit_p).length)
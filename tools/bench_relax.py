@@ -0,0 +1,136 @@
+'''
+Copyright (C) 2018 CG Cookie
+http://cgcookie.com
+hello@cgcookie.com
+
+Created by Jonathan Denning, Jonathan Williamson
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+
+
+'''
+Checks and times the vectorized Relax kernel (common/mesharrays.py) on
+synthetic jittered grids.  The kernel does not need Blender, so this runs
+with plain Python + NumPy:
+
+    python tools/bench_relax.py [grid size] [max steps]
+
+For a small grid, one step of relax_displacements is compared against a
+straightforward per-face/per-edge loop, written the way RFTool_Relax._relax
+used to accumulate forces.  Then the whole grid (except its boundary) is
+relaxed until the residual (largest move relative to average edge length)
+drops below 0.001, reporting timing and residual of each step.  Exits
+non-zero if the kernel does not match the reference, or if relaxing does
+not converge below the residual within max steps (defaults match the
+'relax residual' and 'relax max steps' options).
+'''
+
+import os
+import sys
+import time
+import importlib.util
+
+import numpy as np
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common', 'mesharrays.py')
+spec = importlib.util.spec_from_file_location('mesharrays', path)
+mesharrays = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mesharrays)
+
+args = sys.argv[1:]
+size      = int(args[0]) if len(args) > 0 else 100
+max_steps = int(args[1]) if len(args) > 1 else 100    # options['relax max steps']
+max_residual = 0.001                                    # options['relax residual']
+
+
+def grid(n, jitter=0.3, seed=0):
+    ''' returns (verts, edges, faces, boundary) of n x n quads with jittered interior verts '''
+    rng = np.random.RandomState(seed)
+    idx = np.arange((n+1)*(n+1)).reshape(n+1, n+1)
+    ys, xs = np.mgrid[0:n+1, 0:n+1].astype(np.float64)
+    verts = np.stack([xs, ys, np.zeros(xs.shape)], axis=2).reshape(-1, 3)
+    boundary = np.zeros((n+1, n+1), dtype=bool)
+    boundary[0,:] = boundary[-1,:] = boundary[:,0] = boundary[:,-1] = True
+    boundary = boundary.reshape(-1)
+    verts[~boundary,:2] += rng.uniform(-jitter, jitter, size=(np.count_nonzero(~boundary), 2))
+    faces = np.stack([idx[:-1,:-1], idx[:-1,1:], idx[1:,1:], idx[1:,:-1]], axis=2).reshape(-1, 4)
+    edges = np.concatenate([
+        np.stack([idx[:,:-1], idx[:,1:]], axis=2).reshape(-1, 2),
+        np.stack([idx[:-1,:], idx[1:,:]], axis=2).reshape(-1, 2),
+    ])
+    return (verts, edges, faces, boundary)
+
+
+def reference_displacements(verts, edges, faces, strength):
+    displace = np.zeros(verts.shape)
+    lens = [np.linalg.norm(verts[i1] - verts[i0]) for i0,i1 in edges]
+    avg_edge_len = sum(lens) / len(lens)
+    for (i0,i1),edge_len in zip(edges, lens):
+        f = (verts[i1] - verts[i0]) * (0.1 * (avg_edge_len - edge_len) * strength)
+        displace[i0] -= f
+        displace[i1] += f
+    for face in faces:
+        cnt = len(face)
+        ctr = sum(verts[i] for i in face) / cnt
+        rels = [verts[i] - ctr for i in face]
+        avg_rel_len = sum(np.linalg.norm(rel) for rel in rels) / cnt
+        for rel,i in zip(rels, face):
+            displace[i] += rel * ((avg_rel_len - np.linalg.norm(rel)) * strength)
+        sides = [(face[k], face[(k+1)%cnt]) for k in range(cnt)]
+        avg_side_len = sum(np.linalg.norm(verts[i1] - verts[i0]) for i0,i1 in sides) / cnt
+        for i0,i1 in sides:
+            vec = verts[i1] - verts[i0]
+            f = vec * ((avg_side_len - np.linalg.norm(vec)) * strength)
+            displace[i0] -= f
+            displace[i1] += f
+    return displace
+
+
+def edge_length_spread(verts, edges):
+    lens = np.linalg.norm(verts[edges[:,1]] - verts[edges[:,0]], axis=1)
+    return float(np.std(lens) / np.mean(lens))
+
+
+# compare against reference on small grid
+verts, edges, faces, boundary = grid(8)
+offsets, corners = mesharrays.face_csr(faces.tolist())
+d_vec = mesharrays.relax_displacements(verts, edges, offsets, corners, 0.1)
+d_ref = reference_displacements(verts, edges, faces.tolist(), 0.1)
+err = float(np.max(np.abs(d_vec - d_ref)))
+print('reference check: max abs difference %g' % err)
+assert err < 1e-9, 'vectorized relax does not match reference'
+
+# relax whole grid until converged
+verts, edges, faces, boundary = grid(size)
+tstart = time.time()
+offsets, corners = mesharrays.face_csr(faces.tolist())
+moving = np.nonzero(~boundary)[0]
+print('%d verts, %d edges, %d faces, setup %0.2fms' % (len(verts), len(edges), len(faces), (time.time() - tstart) * 1000))
+avg_edge_len = float(np.mean(np.linalg.norm(verts[edges[:,1]] - verts[edges[:,0]], axis=1)))
+spread_before = edge_length_spread(verts, edges)
+for step in range(max_steps):
+    tstep = time.time()
+    before = verts[moving]
+    displace = mesharrays.relax_displacements(verts, edges, offsets, corners, 0.05)
+    verts[moving] += displace[moving] * 1.5
+    residual = mesharrays.relax_residual(before, verts[moving]) / avg_edge_len
+    if step % 10 == 0: print('step %4d: %7.2fms, residual %f' % (step, (time.time() - tstep) * 1000, residual))
+    if residual < max_residual: break
+spread_after = edge_length_spread(verts, edges)
+print('%d steps, %0.2fms total, residual %f' % (step+1, (time.time() - tstart) * 1000, residual))
+print('edge length spread (std/mean): %f -> %f' % (spread_before, spread_after))
+assert spread_after < spread_before, 'relaxing did not even out edge lengths'
+assert residual < max_residual, 'relaxing did not converge below residual %g within %d steps' % (max_residual, max_steps)
@@ -0,0 +1,107 @@
+'''
+Copyright (C) 2018 CG Cookie
+http://cgcookie.com
+hello@cgcookie.com
+
+Created by Jonathan Denning, Jonathan Williamson
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+
+'''
+Micro-benchmark of RFVert/RFEdge/RFFace wrapper allocations, comparing
+interned wrappers against allocating a new wrapper every time an element is
+wrapped (the previous behavior).  Each iteration walks the topology around
+a brush-sized set of verts the same way RFTool_Relax._relax does.
+
+Must be run inside Blender with RetopoFlow installed:
+
+    blender -b --factory-startup --python tools/bench_wrappers.py
+
+Optional arguments (after --): addon module name, iterations, sphere segments
+
+    blender -b --python tools/bench_wrappers.py -- retopoflow 50 128
+'''
+
+import sys
+import time
+import importlib
+
+import bmesh
+
+args = sys.argv[sys.argv.index('--')+1:] if '--' in sys.argv else []
+addon_name = args[0] if len(args) > 0 else 'retopoflow'
+iterations = int(args[1]) if len(args) > 1 else 20
+segments   = int(args[2]) if len(args) > 2 else 64
+
+wrapper = importlib.import_module('%s.rfmode.rfmesh_wrapper' % addon_name)
+BMElemWrapper, RFVert = wrapper.BMElemWrapper, wrapper.RFVert
+
+allocations = 0
+
+def new_interned(cls, bmelem):
+    global allocations
+    w = BMElemWrapper.interned.get(bmelem, None)
+    if w is None:
+        allocations += 1
+        w = object.__new__(cls)
+        w.bmelem = bmelem
+        BMElemWrapper.interned[bmelem] = w
+    return w
+
+def new_uninterned(cls, bmelem):
+    global allocations
+    allocations += 1
+    w = object.__new__(cls)
+    w.bmelem = bmelem
+    return w
+
+def relax_walk(verts):
+    # mirrors how RFTool_Relax._relax touches topology each step
+    edges,faces = set(),set()
+    for rfv in verts:
+        edges.update(rfv.link_edges)
+        faces.update(rfv.link_faces)
+    chk_verts = set(verts)
+    chk_verts |= {rfv for rfe in edges for rfv in rfe.verts}
+    chk_verts |= {rfv for rff in faces for rfv in rff.verts}
+    chk_edges = set(rfe for rfv in chk_verts for rfe in rfv.link_edges)
+    chk_faces = set(rff for rfv in chk_verts for rff in rfv.link_faces)
+    for rfe in chk_edges:
+        rfv0 = rfe.verts[0]
+        rfe.other_vert(rfv0)
+    for rff in chk_faces:
+        for rfe in rff.edges:
+            rfe.verts
+
+def run(label, fn_new):
+    global allocations
+    BMElemWrapper.__new__ = staticmethod(fn_new)
+    BMElemWrapper.interned = {}
+    allocations = 0
+    bme = bmesh.new()
+    bmesh.ops.create_uvsphere(bme, u_segments=segments, v_segments=segments//2, diameter=1.0)
+    bme.verts.ensure_lookup_table()
+    brush = [RFVert(bme.verts[i]) for i in range(0, len(bme.verts), 4)]
+    tstart = time.time()
+    for _ in range(iterations): relax_walk(brush)
+    delta = time.time() - tstart
+    print('%-10s  %8d verts  %12d allocations  %8.2f ms per iteration' % (
+        label, len(brush), allocations, 1000 * delta / iterations,
+    ))
+    bme.free()
+
+run('allocating', new_uninterned)
+run('interned', new_interned)
@@ -0,0 +1,116 @@
+'''
+Copyright (C) 2018 CG Cookie
+http://cgcookie.com
+hello@cgcookie.com
+
+Created by Jonathan Denning, Jonathan Williamson
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+
+
+'''
+Checks the pick buffer (common/pickbuffer.py) on a synthetic scene: a small
+quad floating in front of a larger quad, seen by a camera looking down -Z,
+with both a perspective and an orthographic projection matrix.  The module
+does not need Blender, so this runs with plain Python + NumPy and exits
+non-zero on the first failed check:
+
+    python tools/check_pickbuffer.py
+'''
+
+import os
+import importlib.util
+
+import numpy as np
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common', 'pickbuffer.py')
+spec = importlib.util.spec_from_file_location('pickbuffer', path)
+pickbuffer = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(pickbuffer)
+
+width, height = 200, 160
+near, far = 0.1, 100.0
+eye = 5.0       # camera at (0,0,eye), looking down -Z
+
+
+def view_matrix():
+    m = np.identity(4)
+    m[2,3] = -eye
+    return m
+
+def perspective_matrix(fov=0.8):
+    f = 1.0 / np.tan(fov / 2.0)
+    m = np.zeros((4,4))
+    m[0,0] = f * height / width
+    m[1,1] = f
+    m[2,2] = (far + near) / (near - far)
+    m[2,3] = 2.0 * far * near / (near - far)
+    m[3,2] = -1.0
+    return np.dot(m, view_matrix())
+
+def ortho_matrix(extent=2.5):
+    m = np.identity(4)
+    m[0,0] = height / (width * extent)
+    m[1,1] = 1.0 / extent
+    m[2,2] = -2.0 / (far - near)
+    m[2,3] = -(far + near) / (far - near)
+    return np.dot(m, view_matrix())
+
+def quad(size, z):
+    return [(-size,-size,z), (size,-size,z), (size,size,z), (-size,size,z)]
+
+# small quad (z=1) in front of large quad (z=0)
+points = np.array(quad(0.5, 1.0) + quad(1.5, 0.0), dtype=np.float64)
+front_face, back_face = [0,1,2,3], [4,5,6,7]
+
+
+def check(label, persmat):
+    xys, depths = pickbuffer.project_points(persmat, width, height, points)
+    assert xys.shape == (8,2) and depths.shape == (8,), label
+    assert np.all(np.isfinite(xys)) and np.all(np.isfinite(depths)), label
+    assert np.all(depths[:4] < depths[4:]), '%s: front quad must be closer: %s' % (label, depths)
+
+    center, _ = pickbuffer.project_points(persmat, width, height, [(0,0,0)])
+    assert np.allclose(center[0], (width/2, height/2)), '%s: origin must project to center' % label
+    behind, behind_depths = pickbuffer.project_points(persmat, width, height, [(0,0,eye+1)])
+    if persmat[3,2] != 0:
+        assert np.all(np.isnan(behind)) and np.isnan(behind_depths[0]), '%s: point behind view must be nan' % label
+
+    # rasterize both face orders, so a depth tie cannot pass by luck of order
+    for faces,ids in [([front_face, back_face], (0,1)), ([back_face, front_face], (1,0))]:
+        id_front, id_back = ids
+        tris, tri_faces = pickbuffer.fan_triangulate(faces)
+        idbuf = pickbuffer.rasterize_ids(xys, depths, tris, tri_faces, width, height)
+        assert idbuf.shape == (height, width), label
+        assert idbuf[height//2, width//2] == id_front, '%s: rasterize_ids center' % label
+        assert idbuf[0, 0] == -1, '%s: rasterize_ids corner must be empty' % label
+
+        pb = pickbuffer.PickBuffer(xys, depths, faces, width, height, scale=0.5)
+        xy_front, xy_back = xys[2] * 0.5 + center[0] * 0.5, (xys[6] + xys[2]) / 2.0
+        assert pb.get(center[0]) == id_front, '%s: get center' % label
+        assert pb.get(xy_front) == id_front, '%s: get inside front quad' % label
+        assert pb.get(xy_back) == id_back, '%s: get outside front quad' % label
+        assert pb.get((1,1)) == -1, '%s: get empty' % label
+        assert pb.get((-10,-10)) == -1 and pb.get((width+10,height+10)) == -1, '%s: get outside region' % label
+        assert sorted(pb.get_near(xys[2], radius=2)) == [0, 1], '%s: get_near at front corner' % label
+        assert pb.get_near(center[0], radius=2) == [id_front], '%s: get_near center' % label
+        assert pb.get_near((1,1), radius=2) == [], '%s: get_near empty' % label
+
+    print('ok    %s' % label)
+
+
+check('perspective', perspective_matrix())
+check('orthographic', ortho_matrix())
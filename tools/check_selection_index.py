@@ -0,0 +1,124 @@
+'''
+Copyright (C) 2018 CG Cookie
+http://cgcookie.com
+hello@cgcookie.com
+
+Created by Jonathan Denning, Jonathan Williamson
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+
+
+'''
+Checks that RFTarget's selection index agrees with a full scan of the BMesh
+selection flags after the selection operations PolyPen performs (selecting
+edges without subparts, setting RFEdge.select directly, splitting edges,
+deselecting faces).  BMesh flushes edge and face selection down to verts and
+edges, so these are the cases where the index can drift.  Exits non-zero if
+the index ever disagrees.
+
+Must be run inside Blender with RetopoFlow installed:
+
+    blender -b --factory-startup --python tools/check_selection_index.py
+
+Optional arguments (after --): addon module name, grid size
+
+    blender -b --python tools/check_selection_index.py -- retopoflow 8
+'''
+
+import sys
+import importlib
+
+import bpy
+import bmesh
+
+args = sys.argv[sys.argv.index('--')+1:] if '--' in sys.argv else []
+addon_name = args[0] if len(args) > 0 else 'retopoflow'
+size       = int(args[1]) if len(args) > 1 else 6
+
+rfmesh = importlib.import_module('%s.rfmode.rfmesh' % addon_name)
+RFTarget = rfmesh.RFTarget
+
+def create_grid():
+    bme = bmesh.new()
+    bmesh.ops.create_grid(bme, x_segments=size, y_segments=size, size=1.0)
+    for bmelem in list(bme.verts) + list(bme.edges) + list(bme.faces):
+        bmelem.select = False
+    mesh = bpy.data.meshes.new('check_selection_index')
+    bme.to_mesh(mesh)
+    bme.free()
+    obj = bpy.data.objects.new('check_selection_index', mesh)
+    bpy.context.scene.objects.link(obj)
+    return obj
+
+failures = []
+def check(label, rftarget):
+    ok = rftarget.selection_index_matches()
+    counts = rftarget.get_selection_counts()
+    scan = (
+        sum(1 for bmv in rftarget.bme.verts if bmv.select),
+        sum(1 for bme in rftarget.bme.edges if bme.select),
+        sum(1 for bmf in rftarget.bme.faces if bmf.select),
+    )
+    ok &= counts == scan
+    print('%-4s  %-40s  index %-16s  scan %-16s' % ('ok' if ok else 'FAIL', label, counts, scan))
+    if not ok: failures.append(label)
+
+rftarget = RFTarget.new(create_grid(), 1.0)
+bm = rftarget.bme
+bm.verts.ensure_lookup_table()
+bm.edges.ensure_lookup_table()
+bm.faces.ensure_lookup_table()
+rftarget.get_selection_counts()     # build index, so the checks below exercise tracking
+
+# edge-quad: select edges without subparts (flushes to verts)
+bmes = [bme for bme in bm.edges if bme.is_boundary][:3]
+rftarget.select(bmes, subparts=False)
+check('select edges, subparts=False', rftarget)
+
+# tri-quad: set edge selection directly, then split and merge
+rfe0 = rftarget._wrap_bmedge(bmes[0])
+rfe0.select = False
+check('RFEdge.select = False', rftarget)
+rfe0.select = True
+check('RFEdge.select = True', rftarget)
+rfe1,rfv1 = rfe0.split()
+rfe0.select = True
+rfe1.select = True
+rftarget.select(rfv1.link_edges)
+check('split edge, select new edges', rftarget)
+for rfe in rfv1.link_edges: rfe.select &= len(rfe.link_faces) == 0
+check('RFEdge.select &= ...', rftarget)
+
+# face selection and deselection
+bmfs = list(bm.faces)[:4]
+rftarget.select(bmfs, subparts=False)
+check('select faces, subparts=False', rftarget)
+for bmf in bmfs[:2]: rftarget._wrap_bmface(bmf).select = False
+check('RFFace.select = False', rftarget)
+rftarget.select(bmfs, only=False)
+rftarget.deselect(bmfs[0])
+check('deselect face', rftarget)
+rftarget.deselect(bmfs[1:], subparts=False)
+check('deselect faces, subparts=False', rftarget)
+
+# removed elements must not be counted
+rftarget.select(bmfs)
+rftarget.delete_selection()
+check('delete selection', rftarget)
+
+if failures:
+    print('selection index disagrees with BMesh scan: ' + ', '.join(failures))
+    sys.exit(1)